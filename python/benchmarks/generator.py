@@ -0,0 +1,123 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+PROVINCES = ("SP", "RJ", "MG", "ES", "BA", "GO", "DF", "PR", "SC", "RS")
+FIRST_NAMES = ("Kip", "Dong", "Kathline", "Merle", "Ramiro", "Eddy", "Darleen", "Erin", "Valerie", "Roland")
+LAST_NAMES = ("Beer", "McDermott", "Ferry", "Leuschke", "Satterfield", "Denesik", "Stanton", "Shields")
+START_TIMESTAMP = datetime(2019, 11, 11, tzinfo=timezone.utc)
+
+
+class EventStreamGenerator:
+    def __init__(
+        self,
+        proposals=1000,
+        proponents_per_proposal=2,
+        warranties_per_proposal=2,
+        updates_per_proposal=1,
+        duplicate_rate=0.01,
+        late_event_rate=0.01,
+        delete_rate=0.05,
+        seed=None,
+    ):
+        self.proposals = proposals
+        self.proponents_per_proposal = proponents_per_proposal
+        self.warranties_per_proposal = warranties_per_proposal
+        self.updates_per_proposal = updates_per_proposal
+        self.duplicate_rate = duplicate_rate
+        self.late_event_rate = late_event_rate
+        self.delete_rate = delete_rate
+        self.random = random.Random(seed)
+        self.timestamp = START_TIMESTAMP
+
+    def _uuid(self):
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def _event(self, schema, action, timestamp, *fields):
+        timestamp = timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return ",".join((self._uuid(), schema, action, timestamp, *map(str, fields)))
+
+    def _tick(self):
+        self.timestamp += timedelta(seconds=self.random.randint(1, 5))
+        return self.timestamp
+
+    def _proposal_fields(self, proposal_id):
+        return (
+            proposal_id,
+            round(self.random.uniform(20000, 3500000), 2),
+            self.random.randint(12, 200),
+        )
+
+    def _proponent_fields(self, proposal_id, proponent_id, is_main):
+        return (
+            proposal_id,
+            proponent_id,
+            f"{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}",
+            self.random.randint(16, 70),
+            round(self.random.uniform(1000, 200000), 2),
+            "true" if is_main else "false",
+        )
+
+    def _warranty_fields(self, proposal_id, warranty_id):
+        return (
+            proposal_id,
+            warranty_id,
+            round(self.random.uniform(50000, 9000000), 2),
+            self.random.choice(PROVINCES),
+        )
+
+    def _generate_proposal_events(self):
+        proposal_id = self._uuid()
+        proponent_ids = [self._uuid() for _ in range(self.proponents_per_proposal)]
+        warranty_ids = [self._uuid() for _ in range(self.warranties_per_proposal)]
+        events = [self._event("proposal", "created", self._tick(), *self._proposal_fields(proposal_id))]
+
+        for warranty_id in warranty_ids:
+            fields = self._warranty_fields(proposal_id, warranty_id)
+            events.append(self._event("warranty", "added", self._tick(), *fields))
+        for index, proponent_id in enumerate(proponent_ids):
+            fields = self._proponent_fields(proposal_id, proponent_id, is_main=index == 0)
+            events.append(self._event("proponent", "added", self._tick(), *fields))
+
+        for _ in range(self.updates_per_proposal):
+            schema = self.random.choice(("proposal", "proponent", "warranty"))
+            if schema == "proposal":
+                fields = self._proposal_fields(proposal_id)
+            elif schema == "proponent" and proponent_ids:
+                proponent_id = self.random.choice(proponent_ids)
+                fields = self._proponent_fields(proposal_id, proponent_id, proponent_id == proponent_ids[0])
+            elif warranty_ids:
+                schema = "warranty"
+                fields = self._warranty_fields(proposal_id, self.random.choice(warranty_ids))
+            else:
+                continue
+
+            events.append(self._event(schema, "updated", self._tick(), *fields))
+            # late events carry an older timestamp than the last applied one
+            if self.random.random() < self.late_event_rate:
+                late_timestamp = self.timestamp - timedelta(minutes=1)
+                events.append(self._event(schema, "updated", late_timestamp, *fields))
+
+        if self.random.random() < self.delete_rate:
+            action = self.random.choice(("deleted", "removed"))
+            if action == "deleted":
+                events.append(self._event("proposal", "deleted", self._tick(), proposal_id))
+            elif proponent_ids:
+                removed_id = proponent_ids[-1]
+                events.append(self._event("proponent", "removed", self._tick(), proposal_id, removed_id))
+            elif warranty_ids:
+                removed_id = warranty_ids[-1]
+                events.append(self._event("warranty", "removed", self._tick(), proposal_id, removed_id))
+
+        return events
+
+    def __iter__(self):
+        for _ in range(self.proposals):
+            for event in self._generate_proposal_events():
+                yield event
+                # duplicated events have the same event id
+                if self.random.random() < self.duplicate_rate:
+                    yield event
+
+    def generate(self):
+        return list(self)
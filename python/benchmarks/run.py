@@ -0,0 +1,161 @@
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from solution.core import Dispatcher, read_events
+
+from .generator import EventStreamGenerator
+
+
+def get_percentile(sorted_values, percentile):
+    if not sorted_values:
+        return 0
+
+    index = min(len(sorted_values) - 1, int(round(percentile / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies_ns):
+    latencies_ns = sorted(latencies_ns)
+    total_seconds = sum(latencies_ns) / 1e9
+
+    return {
+        "count": len(latencies_ns),
+        "total_seconds": total_seconds,
+        "events_per_second": len(latencies_ns) / total_seconds if total_seconds else 0,
+        "p50_us": get_percentile(latencies_ns, 50) / 1000,
+        "p99_us": get_percentile(latencies_ns, 99) / 1000,
+    }
+
+
+def get_peak_rss_kb():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes while linux reports kilobytes
+    return peak_rss // 1024 if sys.platform == "darwin" else peak_rss
+
+
+def get_commit():
+    try:
+        return (
+            subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_read_events(raw_events, trusted):
+    raw_events_string = "\n".join(raw_events)
+
+    started_at = time.perf_counter()
+    read_events(raw_events_string, trusted=trusted)
+    elapsed = time.perf_counter() - started_at
+
+    return {"total_seconds": elapsed, "events_per_second": len(raw_events) / elapsed}
+
+
+def benchmark_dispatch(raw_events, trusted):
+    dispatcher = Dispatcher(trusted=trusted)
+    latencies = defaultdict(list)
+    perf_counter_ns = time.perf_counter_ns
+
+    for raw_event in raw_events:
+        _, event_schema, event_action, _ = raw_event.split(",", 4)[:4]
+        started_at = perf_counter_ns()
+        dispatcher.dispatch(raw_event)
+        latencies[f"{event_schema}.{event_action}"].append(perf_counter_ns() - started_at)
+
+    all_latencies = [latency for schema_latencies in latencies.values() for latency in schema_latencies]
+    result = {
+        "all": summarize_latencies(all_latencies),
+        "by_schema": {key: summarize_latencies(value) for key, value in sorted(latencies.items())},
+    }
+    return dispatcher, result
+
+
+def benchmark_is_valid(dispatcher):
+    latencies = []
+    perf_counter_ns = time.perf_counter_ns
+
+    for proposal in dispatcher.stored_proposals.values():
+        started_at = perf_counter_ns()
+        proposal.is_valid()
+        latencies.append(perf_counter_ns() - started_at)
+
+    return summarize_latencies(latencies)
+
+
+def run_benchmark(generator, trusted=False):
+    raw_events = generator.generate()
+    dispatcher, dispatch_result = benchmark_dispatch(raw_events, trusted)
+
+    return {
+        "commit": get_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "trusted": trusted,
+        "parameters": {
+            "proposals": generator.proposals,
+            "proponents_per_proposal": generator.proponents_per_proposal,
+            "warranties_per_proposal": generator.warranties_per_proposal,
+            "updates_per_proposal": generator.updates_per_proposal,
+            "duplicate_rate": generator.duplicate_rate,
+            "late_event_rate": generator.late_event_rate,
+            "delete_rate": generator.delete_rate,
+        },
+        "events": len(raw_events),
+        "read_events": benchmark_read_events(raw_events, trusted),
+        "dispatch": dispatch_result,
+        "is_valid": benchmark_is_valid(dispatcher),
+        "peak_rss_kb": get_peak_rss_kb(),
+    }
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Benchmark events processing with a synthetic stream")
+    parser.add_argument("--proposals", type=int, default=10000)
+    parser.add_argument("--proponents", type=int, default=2, help="proponents per proposal")
+    parser.add_argument("--warranties", type=int, default=2, help="warranties per proposal")
+    parser.add_argument("--updates", type=int, default=1, help="update events per proposal")
+    parser.add_argument("--duplicate-rate", type=float, default=0.01)
+    parser.add_argument("--late-event-rate", type=float, default=0.01)
+    parser.add_argument(
+        "--delete-rate", type=float, default=0.05, help="share of proposals deleted or removed"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--trusted", action="store_true", help="skip pydantic validation")
+    parser.add_argument("--output", help="path of the JSON results file")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    generator = EventStreamGenerator(
+        proposals=args.proposals,
+        proponents_per_proposal=args.proponents,
+        warranties_per_proposal=args.warranties,
+        updates_per_proposal=args.updates,
+        duplicate_rate=args.duplicate_rate,
+        late_event_rate=args.late_event_rate,
+        delete_rate=args.delete_rate,
+        seed=args.seed,
+    )
+    result = run_benchmark(generator, trusted=args.trusted)
+    output = json.dumps(result, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from .generator import EventStreamGenerator
+from .run import get_commit
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_commands(input_path):
+    # name -> (python arguments, extra environment), each run in a new
+    # interpreter so nothing is imported beforehand
+    return {
+        "interpreter": (["-c", "pass"], {}),
+        "import_core": (["-c", "import solution.core"], {}),
+        "import_schemas": (["-c", "import solution.schemas"], {}),
+        "cli_strict": (["main.py", "-i", input_path], {"TRUSTED_INPUT": "false"}),
+        "cli_trusted": (["main.py", "-i", input_path], {"TRUSTED_INPUT": "true"}),
+    }
+
+
+def run_python(args, env=None, importtime=False):
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), *args]
+    return subprocess.run(
+        command, cwd=PROJECT_DIR, env={**os.environ, **(env or {})}, capture_output=True, check=True
+    )
+
+
+def benchmark_command(args, env, runs):
+    timings = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        run_python(args, env)
+        timings.append(time.perf_counter() - started_at)
+
+    # the best run is the least disturbed by the machine noise
+    return {"best_ms": min(timings) * 1000, "median_ms": statistics.median(timings) * 1000}
+
+
+def parse_import_times(importtime_output):
+    # "import time: <self us> | <cumulative us> | <nested name>" lines of -X importtime
+    import_times = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        _, cumulative_us, name = line.split("|")
+        # skips the header line
+        if cumulative_us.strip().isdigit():
+            import_times[name.strip()] = int(cumulative_us)
+
+    return import_times
+
+
+def get_slowest_imports(args, env, limit=10):
+    output = run_python(args, env, importtime=True).stderr.decode("utf-8")
+    import_times = parse_import_times(output)
+    slowest = sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"module": name, "cumulative_us": cumulative_us} for name, cumulative_us in slowest]
+
+
+def run_startup_benchmark(runs=20, proposals=10):
+    raw_events = EventStreamGenerator(proposals=proposals, seed=1).generate()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, "input.txt")
+        with open(input_path, "w") as input_file:
+            input_file.write("\n".join(raw_events))
+
+        commands = get_commands(input_path)
+        timings = {name: benchmark_command(args, env, runs) for name, (args, env) in commands.items()}
+        slowest_imports = {
+            name: get_slowest_imports(*commands[name]) for name in ("cli_strict", "cli_trusted")
+        }
+
+    return {
+        "commit": get_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "runs": runs,
+        "events": len(raw_events),
+        "timings": timings,
+        "slowest_imports": slowest_imports,
+    }
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of imports and the CLI")
+    parser.add_argument("--runs", type=int, default=20, help="new interpreters started per command")
+    parser.add_argument("--proposals", type=int, default=10, help="proposals of the CLI input file")
+    parser.add_argument("--output", help="path of the JSON results file")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    result = run_startup_benchmark(runs=args.runs, proposals=args.proposals)
+    output = json.dumps(result, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+    return result
+
+
+if __name__ == "__main__":
+    main()
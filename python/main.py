@@ -1,12 +1,33 @@
 import sys
 
-from solution.core import read_events
+from prettyconf import config
+
+# trusted input skips pydantic, whose import and models building take most
+# of the startup when evaluating small files
+TRUSTED_INPUT = config("TRUSTED_INPUT", default="false", cast=config.boolean)
 
 if __name__ == "__main__":
-    if sys.argv[1] == "-i":
-        with open(sys.argv[2], "r") as input_file:
-            events = input_file.read()
+    # each command imports only the modules it uses
+    if len(sys.argv) < 2 or sys.argv[1] == "-":
+        from solution.core import read_events_iter
+
+        print(read_events_iter(sys.stdin, trusted=TRUSTED_INPUT))
+    elif sys.argv[1] == "-i":
+        from solution.inputs import read_events_files
+
+        # many paths and globs, plain or gzip/zstd compressed
+        print(read_events_files(sys.argv[2:], trusted=TRUSTED_INPUT))
+    elif sys.argv[1] == "-b":
+        from solution.encoding import read_binary_events
+
+        print(read_binary_events(sys.argv[2], trusted=TRUSTED_INPUT))
+    elif sys.argv[1] == "-c":
+        from solution.encoding import convert_text_to_binary
+        from solution.inputs import iter_input_lines
+
+        # converts text events to the binary format, output path first
+        convert_text_to_binary(iter_input_lines(sys.argv[3:]), sys.argv[2])
     else:
-        events = sys.argv[1]
+        from solution.core import read_events
 
-    print(read_events(events))
+        print(read_events(sys.argv[1], trusted=TRUSTED_INPUT))
@@ -0,0 +1,74 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .core import Dispatcher, iter_raw_events
+
+END_OF_EVENTS = object()
+
+
+class AsyncDispatcher:
+    def __init__(self, dispatcher=None, queue_size=10000, batch_size=500):
+        self.dispatcher = dispatcher if dispatcher is not None else Dispatcher()
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.committed_batches = 0
+        self.committed_events = 0
+        # a single thread keeps batches and snapshots serialized out of the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def consume(self, raw_events):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        producer = asyncio.ensure_future(self._produce(raw_events, queue))
+
+        try:
+            await self._commit_batches(queue)
+        except BaseException:
+            producer.cancel()
+            raise
+
+        await producer
+
+    async def _produce(self, raw_events, queue):
+        try:
+            async for raw_event in raw_events:
+                await queue.put(raw_event)
+        except Exception as error:
+            await queue.put(error)
+        else:
+            await queue.put(END_OF_EVENTS)
+
+    async def _commit_batches(self, queue):
+        while True:
+            batch = []
+            item = await queue.get()
+            while item is not END_OF_EVENTS and not isinstance(item, Exception):
+                batch.append(item)
+                if len(batch) >= self.batch_size or queue.empty():
+                    break
+                item = queue.get_nowait()
+
+            if batch:
+                await self.commit(batch)
+
+            if isinstance(item, Exception):
+                raise item
+            if item is END_OF_EVENTS:
+                return
+
+    async def commit(self, batch):
+        # batches from any number of sources are applied one at a time
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._commit, batch)
+
+    def _commit(self, batch):
+        self.dispatcher.dispatch_many(iter_raw_events(batch))
+
+        self.committed_batches += 1
+        self.committed_events += len(batch)
+
+    async def get_valid_proposals(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.dispatcher.get_valid_proposals)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,155 @@
+import uuid
+from itertools import compress
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+from .stores import ColumnarProposalStore
+from .validations import (
+    LIMIT_MAIN_PROPONENTS,
+    MAX_LOAN_INSTALLMENTS,
+    MAX_LOAN_VALUE,
+    MIN_LOAN_INSTALLMENTS,
+    MIN_LOAN_VALUE,
+    MIN_MAIN_PROPONENT_INCOME,
+    MIN_PROPONENTS_QUANTITY,
+    MIN_WARRANTIES_QUANTITY,
+    covers_warranted_value,
+)
+
+COLUMNS_DTYPES = {
+    "loan_values": "float64",
+    "installments": "int64",
+    "proponents_counts": "int64",
+    "main_proponents_counts": "int64",
+    "underage_counts": "int64",
+    "accepted_counts": "int64",
+    # exact sums are python ints, see validations.to_exact_units
+    "accepted_units": "object",
+    "main_ages": "int64",
+    "main_monthly_incomes": "float64",
+}
+
+
+def _get_proposal_values(proposal):
+    main_proponents_ids = proposal.main_proponents_ids
+    main_age, main_monthly_income = 0, 0.0
+    # income is only checked with exactly one main proponent
+    if len(main_proponents_ids) == LIMIT_MAIN_PROPONENTS:
+        main_proponent = proposal.proponents[next(iter(main_proponents_ids))]
+        main_age, main_monthly_income = main_proponent.proponent_age, main_proponent.proponent_monthly_income
+
+    return (
+        proposal.proposal_loan_value,
+        proposal.proposal_number_of_monthly_installments,
+        len(proposal.proponents),
+        len(main_proponents_ids),
+        proposal.underage_proponents_count,
+        proposal.accepted_warranties_count,
+        proposal.accepted_warranties_units,
+        main_age,
+        main_monthly_income,
+    )
+
+
+def _get_proposals_columns(stored_proposals):
+    proposals = list(stored_proposals.values())
+    rows = [_get_proposal_values(proposal) for proposal in proposals]
+    values = zip(*rows) if rows else ([] for _ in COLUMNS_DTYPES)
+
+    columns = {
+        name: np.array(column_values, dtype=dtype)
+        for (name, dtype), column_values in zip(COLUMNS_DTYPES.items(), values)
+    }
+    return [proposal.proposal_id for proposal in proposals], columns
+
+
+def _get_columnar_store_columns(store):
+    # typed arrays are read through the buffer protocol without copying each value
+    proposals_rows = np.fromiter(store.proposals_index.values(), dtype="int64", count=len(store))
+    proponents_rows = np.fromiter(
+        store.proponents_index.values(), dtype="int64", count=len(store.proponents_index)
+    )
+    proposals = store.proposals
+    proponents = store.proponents
+    proposals_rows_count = proposals.rows_count
+
+    main_rows = proponents_rows[np.asarray(proponents.is_main)[proponents_rows] != 0]
+    main_owners = np.asarray(proponents.proposal_rows)[main_rows]
+    main_proponents_counts = np.bincount(main_owners, minlength=proposals_rows_count)
+    main_ages = np.zeros(proposals_rows_count, dtype="int64")
+    main_ages[main_owners] = np.asarray(proponents.ages)[main_rows]
+    main_monthly_incomes = np.zeros(proposals_rows_count, dtype="float64")
+    main_monthly_incomes[main_owners] = np.asarray(proponents.monthly_incomes)[main_rows]
+
+    columns = {
+        "loan_values": np.asarray(proposals.loan_values)[proposals_rows],
+        "installments": np.asarray(proposals.installments)[proposals_rows],
+        "proponents_counts": np.asarray(proposals.proponents_counts)[proposals_rows],
+        "main_proponents_counts": main_proponents_counts[proposals_rows],
+        "underage_counts": np.asarray(proposals.underage_counts)[proposals_rows],
+        "accepted_counts": np.asarray(proposals.accepted_counts)[proposals_rows],
+        "accepted_units": np.array(proposals.accepted_units, dtype="object")[proposals_rows],
+        "main_ages": main_ages[proposals_rows],
+        "main_monthly_incomes": main_monthly_incomes[proposals_rows],
+    }
+    return list(store.proposals_index), columns
+
+
+def _covers_warranted_values(accepted_units, loan_values):
+    # exact sums don't fit numpy numbers, they are compared row by row
+    return np.fromiter(
+        map(covers_warranted_value, accepted_units.tolist(), loan_values.tolist()),
+        dtype="bool",
+        count=len(loan_values),
+    )
+
+
+def get_valid_proposals_mask(columns):
+    loan_values = columns["loan_values"]
+    installments = columns["installments"]
+    main_ages = columns["main_ages"]
+
+    # first matching age band wins, as in the scalar validation, and main
+    # proponents younger than every band are rejected
+    multipliers = np.select(
+        [main_ages >= age_limit for age_limit in MIN_MAIN_PROPONENT_INCOME],
+        list(MIN_MAIN_PROPONENT_INCOME.values()),
+        default=0,
+    )
+    has_income_band = main_ages >= min(MIN_MAIN_PROPONENT_INCOME, default=np.inf)
+    # rows without installments are rejected below, whatever the configured limits
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loan_monthly_portions = loan_values / installments
+
+    return (
+        (MIN_LOAN_VALUE <= loan_values)
+        & (loan_values <= MAX_LOAN_VALUE)
+        & (MIN_LOAN_INSTALLMENTS <= installments)
+        & (installments <= MAX_LOAN_INSTALLMENTS)
+        & (columns["proponents_counts"] >= MIN_PROPONENTS_QUANTITY)
+        & (columns["main_proponents_counts"] == LIMIT_MAIN_PROPONENTS)
+        & (columns["underage_counts"] == 0)
+        & (columns["accepted_counts"] >= MIN_WARRANTIES_QUANTITY)
+        & _covers_warranted_values(columns["accepted_units"], loan_values)
+        & (installments > 0)
+        & has_income_band
+        & (columns["main_monthly_incomes"] >= loan_monthly_portions * multipliers)
+    )
+
+
+def get_valid_proposals(stored_proposals):
+    if np is None:
+        raise ImportError("Vectorized validation requires numpy!")
+
+    if isinstance(stored_proposals, ColumnarProposalStore):
+        proposals_ids, columns = _get_columnar_store_columns(stored_proposals)
+        valid_ids = compress(proposals_ids, get_valid_proposals_mask(columns).tolist())
+        # the store keeps ids as ints, only the valid ones become uuids
+        return [str(uuid.UUID(int=proposal_id)) for proposal_id in valid_ids]
+
+    proposals_ids, columns = _get_proposals_columns(stored_proposals)
+    valid_ids = compress(proposals_ids, get_valid_proposals_mask(columns).tolist())
+    return [str(proposal_id) for proposal_id in valid_ids]
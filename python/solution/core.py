@@ -1,56 +1,501 @@
-from .handlers import ProponentHandler, ProposalHandler, WarrantyHandler
-from .schemas import EventMetadata
+import time
+import uuid
+from array import array
+from itertools import chain, repeat
+
+from prettyconf import config
+
+from .deduplication import ProcessedEventsSet
+from .exceptions import ReferenceDoesNotExist
+from .handlers import (
+    LazyProponentHandler,
+    LazyProposalHandler,
+    LazyWarrantyHandler,
+    ProponentHandler,
+    ProposalHandler,
+    TrustedProponentHandler,
+    TrustedProposalHandler,
+    TrustedWarrantyHandler,
+    WarrantyHandler,
+)
+from .rules import RuleEngine
+from .snapshots import read_snapshot, write_snapshot
+from .trusted_schemas import TrustedEventMetadata
+
+# events read at once by read_events_iter and given to dispatch_many
+DISPATCH_CHUNK_SIZE = config("DISPATCH_CHUNK_SIZE", default="1024", cast=int)
 
 
 class Dispatcher:
-    def __init__(self):
-        self.handlers = {
-            "proponent": ProponentHandler,
-            "proposal": ProposalHandler,
-            "warranty": WarrantyHandler,
-        }
-        self.processed_events = []
-        self.stored_proposals = {}
+    def __init__(
+        self,
+        processed_events=None,
+        trusted=False,
+        wal=None,
+        stored_proposals=None,
+        rule_engine=None,
+        instrumentation=None,
+        pending_events=None,
+        validity_feed=None,
+        indexes=None,
+        lazy=False,
+    ):
+        # trusted input skips pydantic validation using slotted schemas, the
+        # lazy ones are trusted too and parse only ids until a field is read
+        if lazy:
+            self.metadata_class = TrustedEventMetadata
+            self._handlers = {
+                "proponent": LazyProponentHandler,
+                "proposal": LazyProposalHandler,
+                "warranty": LazyWarrantyHandler,
+            }
+        elif trusted:
+            self.metadata_class = TrustedEventMetadata
+            self._handlers = {
+                "proponent": TrustedProponentHandler,
+                "proposal": TrustedProposalHandler,
+                "warranty": TrustedWarrantyHandler,
+            }
+        else:
+            # pydantic is imported only by the strict mode, keeping it out of
+            # the startup of trusted and lazy runs
+            from .schemas import EventMetadata
+
+            self.metadata_class = EventMetadata
+            self._handlers = {
+                "proponent": ProponentHandler,
+                "proposal": ProposalHandler,
+                "warranty": WarrantyHandler,
+            }
+        self.registered_actions = {}
+        self._indexes = indexes
+        self.processed_events = processed_events if processed_events is not None else ProcessedEventsSet()
+        self.stored_proposals = stored_proposals if stored_proposals is not None else {}
+        self.wal = wal
+        self.rule_engine = rule_engine if rule_engine is not None else RuleEngine()
+        self.instrumentation = instrumentation
+        self.pending_events = pending_events
+        self.validity_feed = validity_feed
+        # the plain dispatch stays free of any measuring when disabled
+        if instrumentation is not None:
+            self.dispatch = self._dispatch_instrumented
+
+    # handlers are bound to the storage, so the table is compiled again when
+    # any of them is replaced
+
+    @property
+    def handlers(self):
+        return self._handlers
+
+    @handlers.setter
+    def handlers(self, handlers):
+        self._handlers = handlers
+        self.compile_dispatch_table()
+
+    @property
+    def stored_proposals(self):
+        return self._stored_proposals
+
+    @stored_proposals.setter
+    def stored_proposals(self, stored_proposals):
+        self._stored_proposals = stored_proposals
+        self.compile_dispatch_table()
+
+    @property
+    def indexes(self):
+        return self._indexes
+
+    @indexes.setter
+    def indexes(self, indexes):
+        # filled with what is already stored, then kept by the handlers
+        if indexes is not None:
+            indexes.rebuild(self._stored_proposals)
+        self._indexes = indexes
+        self.compile_dispatch_table()
+
+    def compile_dispatch_table(self):
+        dispatch_table = {}
+        for event_schema, SchemaHandler in self._handlers.items():
+            handler = SchemaHandler(self._stored_proposals, self._indexes)
+            dispatch_table.update(handler.get_dispatch_table(event_schema))
+
+        dispatch_table.update(self.registered_actions)
+        self.dispatch_table = dispatch_table
+
+    def register_handler(self, event_schema, handler_class):
+        # every process_<action> method of the handler becomes dispatchable
+        self._handlers[event_schema] = handler_class
+        self.compile_dispatch_table()
+
+    def register_action(self, event_schema, event_action, action_method, decode_message):
+        # action_method is called with metadata followed by the arguments
+        # returned by decode_message(message), the first one being the
+        # proposal_id or an object carrying it
+        self.registered_actions[(event_schema, event_action)] = (action_method, decode_message)
+        self.dispatch_table[(event_schema, event_action)] = (action_method, decode_message)
+
+    def _get_missing_action_error(self, event_schema):
+        if any(schema == event_schema for schema, _ in self.dispatch_table):
+            return NotImplementedError()
+
+        return ValueError(f"Handler for {event_schema} not found!")
 
     def dispatch(self, raw_event):
         event_id, event_schema, event_action, event_timestamp, *message = raw_event.split(",")
-        event_metadata = EventMetadata(
+        event_metadata = self.metadata_class(
             event_id=event_id,
             event_schema=event_schema,
             event_action=event_action,
             event_timestamp=event_timestamp,
         )
 
-        if event_id not in self.processed_events:
+        if event_metadata.event_id not in self.processed_events:
             try:
-                SchemaHandler = self.handlers[event_schema]
+                action_method, decode_message = self.dispatch_table[(event_schema, event_action)]
             except KeyError:
-                raise ValueError(f"Handler for {event_schema} not found!")
-            else:
-                SchemaHandler(self.stored_proposals).handle(event_metadata, message)
-                self.processed_events.append(event_id)
+                raise self._get_missing_action_error(event_schema)
 
+            self._apply_event(event_metadata, action_method, decode_message(message))
+            self.processed_events.add(event_metadata.event_id, event_metadata.event_timestamp)
 
-def read_events(raw_events_string):
-    dispatcher = Dispatcher()
+            if self.wal is not None:
+                self.wal.append(raw_event)
+                if self.wal.needs_checkpoint():
+                    self.wal.checkpoint(self)
 
-    for raw_event in raw_events_string.split("\n"):
-        if raw_event.strip() == "":
-            continue
+    def dispatch_many(self, raw_events):
+        # same result as dispatch on each event in order, with the lookups
+        # done once for the chunk, repeated timestamps parsed once and the
+        # exact dedup set used directly
+        if not self._can_dispatch_many():
+            for raw_event in raw_events:
+                self.dispatch(raw_event)
+            return
+
+        processed_event_ids = self.processed_events.event_ids
+        dispatch_table = self.dispatch_table
+        apply_event = self._apply_event
+
+        for message, event_metadata in self.metadata_class.iter_from_raw_events(raw_events):
+            event_key = event_metadata.event_id.int
+            if event_key in processed_event_ids:
+                continue
+
+            event_schema = event_metadata.event_schema
+            try:
+                action_method, decode_message = dispatch_table[(event_schema, event_metadata.event_action)]
+            except KeyError:
+                raise self._get_missing_action_error(event_schema)
+
+            apply_event(event_metadata, action_method, decode_message(message))
+            processed_event_ids.add(event_key)
+
+    def _can_dispatch_many(self):
+        # the write-ahead log, the instrumentation and the approximate dedup
+        # stores work event by event
+        return (
+            self.wal is None
+            and self.instrumentation is None
+            and type(self.processed_events) is ProcessedEventsSet
+        )
+
+    def dispatch_decoded(self, event_metadata, action_args):
+        # events already parsed (e.g. read from binary events) skip the split
+        # and the message parsing, but there is no raw event to log
+        if self.wal is not None:
+            raise ValueError("Can't log decoded events to the write-ahead log!")
+
+        if event_metadata.event_id in self.processed_events:
+            return
+
+        try:
+            action_method, _ = self.dispatch_table[(event_metadata.event_schema, event_metadata.event_action)]
+        except KeyError:
+            raise self._get_missing_action_error(event_metadata.event_schema)
+
+        self._apply_event(event_metadata, action_method, action_args)
+        self.processed_events.add(event_metadata.event_id, event_metadata.event_timestamp)
+
+    def dispatch_decoded_many(self, decoded_events):
+        # same result as dispatch_decoded on each (metadata, action_args) in
+        # order, with the lookups done once for the chunk as dispatch_many
+        if not self._can_dispatch_many():
+            for event_metadata, action_args in decoded_events:
+                self.dispatch_decoded(event_metadata, action_args)
+            return
+
+        processed_event_ids = self.processed_events.event_ids
+        dispatch_table = self.dispatch_table
+        apply_event = self._apply_event
+
+        for event_metadata, action_args in decoded_events:
+            event_key = event_metadata.event_id.int
+            if event_key in processed_event_ids:
+                continue
+
+            event_schema = event_metadata.event_schema
+            try:
+                action_method, _ = dispatch_table[(event_schema, event_metadata.event_action)]
+            except KeyError:
+                raise self._get_missing_action_error(event_schema)
+
+            apply_event(event_metadata, action_method, action_args)
+            processed_event_ids.add(event_key)
+
+    def _apply_event(self, event_metadata, action_method, action_args):
+        # shared by every dispatch path once the event is known to be new,
+        # orphan events are parked with their action arguments
+        try:
+            action_method(event_metadata, *action_args)
+        except ReferenceDoesNotExist as error:
+            if self.instrumentation is not None:
+                self.instrumentation.record_reference_miss()
+            if self.pending_events is None:
+                raise
+            self.pending_events.park(error.proposal_id, event_metadata, action_args)
+        else:
+            # only proposals are created, children events use added
+            if self.pending_events is not None and event_metadata.event_action == "created":
+                self._drain_pending_events(get_action_proposal_id(action_args))
+
+        if self.validity_feed is not None:
+            self._update_validity(event_metadata, get_action_proposal_id(action_args))
+
+        if self.pending_events is not None:
+            self.pending_events.expire(event_metadata.event_timestamp)
+
+    def _update_validity(self, event_metadata, proposal_id):
+        proposal = self.stored_proposals.get(proposal_id)
+        is_valid = proposal is not None and self.rule_engine.evaluate(proposal)
+        self.validity_feed.update(proposal_id, is_valid, event_metadata)
+
+    def _drain_pending_events(self, proposal_id):
+        if proposal_id not in self.pending_events:
+            return
+
+        for pending_metadata, action_args in self.pending_events.drain(proposal_id):
+            action_method, _ = self.dispatch_table[
+                (pending_metadata.event_schema, pending_metadata.event_action)
+            ]
+            action_method(pending_metadata, *action_args)
+
+    def _dispatch_instrumented(self, raw_event):
+        instrumentation = self.instrumentation
+        record_stage = instrumentation.record_stage
+        perf_counter_ns = time.perf_counter_ns
+
+        started_at = perf_counter_ns()
+        event_id, event_schema, event_action, event_timestamp, *message = raw_event.split(",")
+        finished_at = perf_counter_ns()
+        record_stage("split", finished_at - started_at)
 
-        # avoid events count line
+        started_at = finished_at
+        event_metadata = self.metadata_class(
+            event_id=event_id,
+            event_schema=event_schema,
+            event_action=event_action,
+            event_timestamp=event_timestamp,
+        )
+        finished_at = perf_counter_ns()
+        record_stage("metadata", finished_at - started_at)
+
+        started_at = finished_at
+        is_duplicated = event_metadata.event_id in self.processed_events
+        finished_at = perf_counter_ns()
+        record_stage("dedup", finished_at - started_at)
+        instrumentation.record_dedup(is_duplicated)
+        if is_duplicated:
+            return
+
+        started_at = finished_at
         try:
-            int(raw_event)
+            action_method, decode_message = self.dispatch_table[(event_schema, event_action)]
+        except KeyError:
+            raise self._get_missing_action_error(event_schema)
+        finished_at = perf_counter_ns()
+        record_stage("handler_lookup", finished_at - started_at)
+
+        started_at = finished_at
+        action_args = decode_message(message)
+        finished_at = perf_counter_ns()
+        record_stage("build", finished_at - started_at)
+
+        started_at = finished_at
+        self._apply_event(event_metadata, action_method, action_args)
+        finished_at = perf_counter_ns()
+        record_stage("apply", finished_at - started_at)
+        instrumentation.record_event(event_schema, event_action)
+
+        started_at = finished_at
+        self.processed_events.add(event_metadata.event_id, event_metadata.event_timestamp)
+        finished_at = perf_counter_ns()
+        record_stage("dedup_add", finished_at - started_at)
+
+        if self.wal is not None:
+            started_at = finished_at
+            self.wal.append(raw_event)
+            if self.wal.needs_checkpoint():
+                self.wal.checkpoint(self)
+            record_stage("wal", perf_counter_ns() - started_at)
+
+    def snapshot(self, path):
+        write_snapshot(self, path)
+
+    def restore(self, path):
+        read_snapshot(self, path)
+        # snapshots fill the storage without the handlers
+        if self.indexes is not None:
+            self.indexes.rebuild(self.stored_proposals)
+
+    def get_valid_proposals(self, vectorized=False):
+        started_at = time.perf_counter_ns()
+        if vectorized:
+            # imported here since numpy is optional
+            from .batch_validations import get_valid_proposals
+
+            valid_proposals = get_valid_proposals(self.stored_proposals)
+        else:
+            is_valid = self.rule_engine.is_valid
+            valid_proposals = [
+                str(proposal.proposal_id) for proposal in self.stored_proposals.values() if is_valid(proposal)
+            ]
+
+        if self.instrumentation is not None:
+            self.instrumentation.record_validation(time.perf_counter_ns() - started_at)
+
+        return valid_proposals
+
+
+def get_action_proposal_id(action_args):
+    # deleted and removed actions start with the proposal_id, the others
+    # carry the schema object
+    first_arg = action_args[0]
+    if isinstance(first_arg, uuid.UUID):
+        return first_arg
+
+    return first_arg.proposal_id
+
+
+def iter_raw_events(raw_events):
+    for raw_event in raw_events:
+        raw_event = raw_event.rstrip("\n")
+        if raw_event.strip() == "":
             continue
-        except ValueError:
-            pass
 
-        dispatcher.dispatch(raw_event)
+        # avoid events count line, events always have commas and never parse
+        if "," not in raw_event:
+            try:
+                int(raw_event)
+                continue
+            except ValueError:
+                pass
+
+        yield raw_event
 
-    valid_proposals = [
-        str(proposal.proposal_id)
-        for _, proposal in dispatcher.stored_proposals.items()
-        if proposal.is_valid()
+
+def iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def _process_shard(raw_events, indexes, trusted, vectorized, lazy):
+    dispatcher = Dispatcher(trusted=trusted, lazy=lazy)
+    stored_proposals = dispatcher.stored_proposals
+    # input index of the event that placed each proposal in the dict order
+    insertion_indexes = {}
+    # proposals created or deleted by the pending chunk, and the index of the
+    # created events that will store their proposal
+    chunk_proposal_ids = set()
+    chunk_insertion_indexes = {}
+    raw_events_chunk = []
+
+    def flush():
+        dispatcher.dispatch_many(raw_events_chunk)
+        for proposal_id, index in chunk_insertion_indexes.items():
+            # unless the event was a duplicate
+            if proposal_id in stored_proposals:
+                insertion_indexes[proposal_id] = index
+
+        raw_events_chunk.clear()
+        chunk_proposal_ids.clear()
+        chunk_insertion_indexes.clear()
+
+    for index, raw_event in zip(indexes, raw_events):
+        # a substring check is much cheaper than splitting every event
+        is_created = ",proposal,created," in raw_event
+        if is_created or ",proposal,deleted," in raw_event:
+            proposal_id = uuid.UUID(raw_event.split(",", 5)[4])
+            # the chunk must not change whether the proposal is stored before
+            # this event is applied
+            if proposal_id in chunk_proposal_ids:
+                flush()
+
+            chunk_proposal_ids.add(proposal_id)
+            if is_created and proposal_id not in stored_proposals:
+                chunk_insertion_indexes[proposal_id] = index
+
+        raw_events_chunk.append(raw_event)
+        if len(raw_events_chunk) >= DISPATCH_CHUNK_SIZE:
+            flush()
+
+    flush()
+
+    return [
+        (insertion_indexes[uuid.UUID(proposal_id)], proposal_id)
+        for proposal_id in dispatcher.get_valid_proposals(vectorized=vectorized)
     ]
 
-    return ",".join(valid_proposals)
+
+def _read_events_sharded(raw_events, trusted, workers, vectorized, lazy):
+    shards_raw_events = [[] for _ in range(workers)]
+    # indexes in a typed array pickle as a single buffer
+    shards_indexes = [array("q") for _ in range(workers)]
+    for index, raw_event in enumerate(iter_raw_events(raw_events)):
+        # all events carry proposal_id right after the metadata
+        shard = hash(raw_event.split(",", 5)[4].lower()) % workers
+        shards_raw_events[shard].append(raw_event)
+        shards_indexes[shard].append(index)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shards_results = executor.map(
+            _process_shard,
+            shards_raw_events,
+            shards_indexes,
+            repeat(trusted),
+            repeat(vectorized),
+            repeat(lazy),
+        )
+        valid_proposals = sorted(chain.from_iterable(shards_results))
+
+    return ",".join(proposal_id for _, proposal_id in valid_proposals)
+
+
+def read_events_iter(raw_events, dispatcher=None, trusted=False, workers=1, vectorized=False, lazy=False):
+    if workers > 1:
+        if dispatcher is not None:
+            raise ValueError("Can't use a given dispatcher with multiple workers!")
+
+        return _read_events_sharded(raw_events, trusted, workers, vectorized, lazy)
+
+    if dispatcher is None:
+        dispatcher = Dispatcher(trusted=trusted, lazy=lazy)
+
+    for raw_events_chunk in iter_chunks(iter_raw_events(raw_events), DISPATCH_CHUNK_SIZE):
+        dispatcher.dispatch_many(raw_events_chunk)
+
+    return ",".join(dispatcher.get_valid_proposals(vectorized=vectorized))
+
+
+def read_events(raw_events_string, trusted=False, workers=1, vectorized=False, lazy=False):
+    return read_events_iter(
+        raw_events_string.split("\n"), trusted=trusted, workers=workers, vectorized=vectorized, lazy=lazy
+    )
@@ -0,0 +1,107 @@
+import hashlib
+import math
+from collections import deque
+from datetime import timedelta
+
+
+class ProcessedEventsSet:
+    # exact store keyed by the 128-bit int value of event ids
+
+    def __init__(self):
+        self.event_ids = set()
+
+    def __contains__(self, event_id):
+        return event_id.int in self.event_ids
+
+    def __len__(self):
+        return len(self.event_ids)
+
+    def add(self, event_id, event_timestamp):
+        self.event_ids.add(event_id.int)
+
+
+class TimeWindowProcessedEvents:
+    # only remembers events newer than `window` from the newest timestamp seen
+
+    def __init__(self, window=timedelta(hours=1)):
+        self.window = window
+        self.newest_timestamp = None
+        self.event_ids = {}
+        self.expiration_queue = deque()
+
+    def __contains__(self, event_id):
+        return event_id.int in self.event_ids
+
+    def __len__(self):
+        return len(self.event_ids)
+
+    def add(self, event_id, event_timestamp):
+        key = event_id.int
+        self.event_ids[key] = event_timestamp
+        self.expiration_queue.append((event_timestamp, key))
+
+        if self.newest_timestamp is None or event_timestamp > self.newest_timestamp:
+            self.newest_timestamp = event_timestamp
+
+        self._expire()
+
+    def _expire(self):
+        watermark = self.newest_timestamp - self.window
+        queue = self.expiration_queue
+
+        while queue and queue[0][0] < watermark:
+            event_timestamp, key = queue.popleft()
+            # late events may have been re-added after the expired entry
+            if self.event_ids.get(key) == event_timestamp:
+                del self.event_ids[key]
+
+
+class BloomFilterProcessedEvents:
+    # keeps two filter generations sized to `capacity` events each, dropping
+    # the oldest one when the current is full to keep memory flat
+
+    def __init__(self, capacity=1000000, false_positive_rate=0.001):
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.bits_count = max(8, int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.hashes_count = max(1, round(self.bits_count / capacity * math.log(2)))
+        self.current = bytearray((self.bits_count + 7) // 8)
+        self.previous = None
+        self.current_count = 0
+
+    def __contains__(self, event_id):
+        positions = self._get_positions(event_id)
+        if self._has_all(self.current, positions):
+            return True
+
+        return self.previous is not None and self._has_all(self.previous, positions)
+
+    def __len__(self):
+        return self.current_count
+
+    def add(self, event_id, event_timestamp):
+        if self.current_count >= self.capacity:
+            self.previous = self.current
+            self.current = bytearray(len(self.current))
+            self.current_count = 0
+
+        bits = self.current
+        for position in self._get_positions(event_id):
+            bits[position >> 3] |= 1 << (position & 7)
+
+        self.current_count += 1
+
+    def _get_positions(self, event_id):
+        # double hashing over the two 64-bit halves of a uniform digest
+        digest = hashlib.blake2b(event_id.bytes, digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "little")
+        second_hash = int.from_bytes(digest[8:], "little") | 1
+
+        return [(first_hash + i * second_hash) % self.bits_count for i in range(self.hashes_count)]
+
+    @staticmethod
+    def _has_all(bits, positions):
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in positions)
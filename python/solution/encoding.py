@@ -0,0 +1,231 @@
+import mmap
+import os
+import struct
+import uuid
+
+from .core import Dispatcher, iter_raw_events
+from .interning import build_uuid_from_bytes, intern_string, uuid_from_bytes
+from .snapshots import micros_to_timestamp, timestamp_to_micros
+from .trusted_schemas import parse_bool, parse_timestamp
+
+MAGIC = b"BCEVTS"
+VERSION = 1
+
+# all values are little endian; every event starts with its kind code, the
+# event_id as 16 raw bytes and the timestamp as int64 microseconds since
+# epoch, followed by the kind layout; names and provinces come right after
+# their layout, prefixed by their size
+HEADER = struct.Struct("<6sH")
+EVENT_HEADER = struct.Struct("<B16sq")
+PROPOSAL = struct.Struct("<16sdi")
+PROPOSAL_DELETED = struct.Struct("<16s")
+PROPONENT = struct.Struct("<16s16sidBH")
+WARRANTY = struct.Struct("<16s16sdH")
+RELATED_REMOVED = struct.Struct("<16s16s")
+
+EVENT_KINDS = (
+    ("proposal", "created"),
+    ("proposal", "updated"),
+    ("proposal", "deleted"),
+    ("proponent", "added"),
+    ("proponent", "updated"),
+    ("proponent", "removed"),
+    ("warranty", "added"),
+    ("warranty", "updated"),
+    ("warranty", "removed"),
+)
+EVENT_KINDS_CODES = {event_kind: code for code, event_kind in enumerate(EVENT_KINDS)}
+
+
+def encode_event(raw_event):
+    event_id, event_schema, event_action, event_timestamp, *message = raw_event.split(",")
+    code = _get_event_kind_code(event_schema, event_action)
+
+    if event_action in ("deleted", "removed"):
+        values = [uuid.UUID(related_id).bytes for related_id in message[:2]]
+    elif event_schema == "proposal":
+        values = [uuid.UUID(message[0]).bytes, float(message[1]), int(message[2])]
+    elif event_schema == "proponent":
+        values = [
+            uuid.UUID(message[0]).bytes,
+            uuid.UUID(message[1]).bytes,
+            int(message[3]),
+            float(message[4]),
+            parse_bool(message[5]),
+            message[2],
+        ]
+    else:
+        values = [uuid.UUID(message[0]).bytes, uuid.UUID(message[1]).bytes, float(message[2]), message[3]]
+
+    return _pack_event(code, uuid.UUID(event_id), parse_timestamp(event_timestamp), values)
+
+
+def encode_decoded_event(metadata, action_args):
+    # same bytes as encode_event, from the (metadata, action_args) of a
+    # decoded event, as the ones parked waiting for their proposal
+    event_schema = metadata.event_schema
+    event_action = metadata.event_action
+    code = _get_event_kind_code(event_schema, event_action)
+
+    if event_action in ("deleted", "removed"):
+        values = [related_id.bytes for related_id in action_args]
+    elif event_schema == "proposal":
+        proposal = action_args[0]
+        values = [
+            proposal.proposal_id.bytes,
+            proposal.proposal_loan_value,
+            proposal.proposal_number_of_monthly_installments,
+        ]
+    elif event_schema == "proponent":
+        proponent = action_args[0]
+        values = [
+            proponent.proposal_id.bytes,
+            proponent.proponent_id.bytes,
+            proponent.proponent_age,
+            proponent.proponent_monthly_income,
+            proponent.proponent_is_main,
+            proponent.proponent_name,
+        ]
+    else:
+        warranty = action_args[0]
+        values = [
+            warranty.proposal_id.bytes,
+            warranty.warranty_id.bytes,
+            warranty.warranty_value,
+            warranty.warranty_province,
+        ]
+
+    return _pack_event(code, metadata.event_id, metadata.event_timestamp, values)
+
+
+def _get_event_kind_code(event_schema, event_action):
+    try:
+        return EVENT_KINDS_CODES[(event_schema, event_action)]
+    except KeyError:
+        raise ValueError(f"Can't encode {event_schema} {event_action} events!")
+
+
+def _pack_event(code, event_id, event_timestamp, values):
+    # values follow the kind layout, with the name or province last
+    header = EVENT_HEADER.pack(code, event_id.bytes, timestamp_to_micros(event_timestamp))
+    event_schema, event_action = EVENT_KINDS[code]
+
+    if event_action == "deleted":
+        return header + PROPOSAL_DELETED.pack(*values)
+
+    if event_action == "removed":
+        return header + RELATED_REMOVED.pack(*values)
+
+    if event_schema == "proposal":
+        return header + PROPOSAL.pack(*values)
+
+    *values, text = values
+    text = text.encode("utf-8")
+    layout = PROPONENT if event_schema == "proponent" else WARRANTY
+    return header + layout.pack(*values, len(text)) + text
+
+
+def convert_text_to_binary(raw_events, path):
+    temporary_path = f"{path}.tmp"
+    events_count = 0
+
+    with open(temporary_path, "wb") as events_file:
+        events_file.write(HEADER.pack(MAGIC, VERSION))
+        for raw_event in iter_raw_events(raw_events):
+            events_file.write(encode_event(raw_event))
+            events_count += 1
+
+    # readers never see a partially converted file
+    os.replace(temporary_path, path)
+    return events_count
+
+
+def iter_decoded_events(buffer, dispatcher):
+    magic, version = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Invalid binary events!")
+
+    return iter_decoded_events_between(buffer, dispatcher, HEADER.size, len(buffer))
+
+
+def iter_decoded_events_between(buffer, dispatcher, offset, end):
+    # objects are built with the dispatcher classes, strict or trusted, from
+    # the values already typed by the encoding
+    build_metadata = dispatcher.metadata_class.build_from_values
+    build_proposal = dispatcher.handlers["proposal"].schema_class.build_from_values
+    build_proponent = dispatcher.handlers["proponent"].schema_class.build_from_values
+    build_warranty = dispatcher.handlers["warranty"].schema_class.build_from_values
+
+    last_micros = None
+    while offset < end:
+        code, event_id, event_micros = EVENT_HEADER.unpack_from(buffer, offset)
+        offset += EVENT_HEADER.size
+        # the kinds are constants, already shared by all the events
+        event_schema, event_action = EVENT_KINDS[code]
+
+        # events of the same batch usually share the timestamp
+        if event_micros != last_micros:
+            last_micros = event_micros
+            event_timestamp = micros_to_timestamp(event_micros)
+
+        metadata = build_metadata(
+            build_uuid_from_bytes(event_id), event_schema, event_action, event_timestamp
+        )
+
+        # same process_<action> arguments following metadata returned by the
+        # dispatch table decoders
+        if event_action == "deleted":
+            (proposal_id,) = PROPOSAL_DELETED.unpack_from(buffer, offset)
+            offset += PROPOSAL_DELETED.size
+            action_args = (uuid_from_bytes(proposal_id),)
+        elif event_action == "removed":
+            proposal_id, related_id = RELATED_REMOVED.unpack_from(buffer, offset)
+            offset += RELATED_REMOVED.size
+            action_args = (uuid_from_bytes(proposal_id), build_uuid_from_bytes(related_id))
+        elif event_schema == "proposal":
+            proposal_id, loan_value, installments = PROPOSAL.unpack_from(buffer, offset)
+            offset += PROPOSAL.size
+            action_args = (build_proposal(uuid_from_bytes(proposal_id), loan_value, installments),)
+        elif event_schema == "proponent":
+            proposal_id, proponent_id, age, monthly_income, is_main, name_size = PROPONENT.unpack_from(
+                buffer, offset
+            )
+            offset += PROPONENT.size
+            name = buffer[offset : offset + name_size].decode("utf-8")
+            offset += name_size
+            action_args = (
+                build_proponent(
+                    uuid_from_bytes(proposal_id),
+                    build_uuid_from_bytes(proponent_id),
+                    name,
+                    age,
+                    monthly_income,
+                    bool(is_main),
+                ),
+            )
+        else:
+            proposal_id, warranty_id, value, province_size = WARRANTY.unpack_from(buffer, offset)
+            offset += WARRANTY.size
+            province = intern_string(buffer[offset : offset + province_size].decode("utf-8"))
+            offset += province_size
+            action_args = (
+                build_warranty(
+                    uuid_from_bytes(proposal_id), build_uuid_from_bytes(warranty_id), value, province
+                ),
+            )
+
+        yield metadata, action_args
+
+
+def read_binary_events(path, dispatcher=None, trusted=False, vectorized=False):
+    if dispatcher is None:
+        dispatcher = Dispatcher(trusted=trusted)
+
+    with open(path, "rb") as events_file, mmap.mmap(
+        events_file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        # streamed rather than chunked, decoded objects held by a chunk live
+        # long enough to be promoted and scanned by the older gc generations
+        dispatcher.dispatch_decoded_many(iter_decoded_events(buffer, dispatcher))
+
+    return ",".join(dispatcher.get_valid_proposals(vectorized=vectorized))
@@ -1,2 +1,4 @@
 class ReferenceDoesNotExist(Exception):
-    pass
+    def __init__(self, message, proposal_id=None):
+        super().__init__(message)
+        self.proposal_id = proposal_id
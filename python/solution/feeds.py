@@ -0,0 +1,116 @@
+import json
+from collections import deque
+
+BECAME_VALID = "became_valid"
+BECAME_INVALID = "became_invalid"
+
+
+class ValidityChange:
+    __slots__ = ("proposal_id", "change", "event_id", "event_timestamp")
+
+    def __init__(self, proposal_id, change, event_id, event_timestamp):
+        self.proposal_id = proposal_id
+        self.change = change
+        # event that triggered the change
+        self.event_id = event_id
+        self.event_timestamp = event_timestamp
+
+    def __eq__(self, other):
+        if not isinstance(other, ValidityChange):
+            return NotImplemented
+
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"ValidityChange(proposal_id={self.proposal_id}, change={self.change})"
+
+    def to_dict(self):
+        return {
+            "proposal_id": str(self.proposal_id),
+            "change": self.change,
+            "event_id": str(self.event_id),
+            "event_timestamp": self.event_timestamp.isoformat(),
+        }
+
+
+class ValidityFeed:
+    # publishes to every sink, any callable taking a ValidityChange, when a
+    # proposal validity changes after one of its events is handled
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.valid_proposals_ids = set()
+        self.published_count = 0
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def update(self, proposal_id, is_valid, metadata):
+        key = proposal_id.int
+        if is_valid == (key in self.valid_proposals_ids):
+            return None
+
+        if is_valid:
+            self.valid_proposals_ids.add(key)
+            change = BECAME_VALID
+        else:
+            self.valid_proposals_ids.discard(key)
+            change = BECAME_INVALID
+
+        validity_change = ValidityChange(proposal_id, change, metadata.event_id, metadata.event_timestamp)
+        for sink in self.sinks:
+            sink(validity_change)
+
+        self.published_count += 1
+        return validity_change
+
+
+class BufferSink:
+    # keeps the changes until a generator consumes them
+
+    def __init__(self, max_changes=None):
+        self.changes = deque(maxlen=max_changes)
+
+    def __call__(self, validity_change):
+        self.changes.append(validity_change)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __iter__(self):
+        # yields the changes published so far, new ones are picked up by
+        # iterating again
+        changes = self.changes
+        while changes:
+            yield changes.popleft()
+
+
+class FileSink:
+    # append-only json lines file
+
+    def __init__(self, path, flush_every=1):
+        self.flush_every = flush_every
+        self.pending_count = 0
+        self.changes_file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, validity_change):
+        self.changes_file.write(json.dumps(validity_change.to_dict()) + "\n")
+        self.pending_count += 1
+        if self.pending_count >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self.changes_file.flush()
+        self.pending_count = 0
+
+    def close(self):
+        if not self.changes_file.closed:
+            self.flush()
+            self.changes_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,46 +1,81 @@
 import uuid
 
 from .exceptions import ReferenceDoesNotExist
-from .schemas import Proponent, Proposal, Warranty
+from .interning import parse_uuid
+from .lazy_schemas import LazyProponent, LazyProposal, LazyWarranty
+from .trusted_schemas import TrustedProponent, TrustedProposal, TrustedWarranty
+
+
+class PydanticSchemaClass:
+    # resolves to the pydantic model of solution.schemas on the first read and
+    # replaces itself in the class, so trusted and lazy handlers, subclasses
+    # overriding schema_class, never import pydantic
+
+    def __init__(self, name):
+        self.name = name
+
+    def __set_name__(self, owner, attr_name):
+        self.owner = owner
+        self.attr_name = attr_name
+
+    def __get__(self, instance, owner=None):
+        from . import schemas
+
+        schema_class = getattr(schemas, self.name)
+        setattr(self.owner, self.attr_name, schema_class)
+        return schema_class
 
 
 class BaseHandler:
     schema_class = None
 
-    def __init__(self, stored_proposals):
+    def __init__(self, stored_proposals, indexes=None):
         self.stored_proposals = stored_proposals
+        # optional ProposalIndexes updated along with the storage
+        self.indexes = indexes
 
     def _get_stored_proposal(self, proposal_id):
         try:
             return self.stored_proposals[proposal_id]
         except KeyError:
-            raise ReferenceDoesNotExist(f"proposal_id={proposal_id}")
+            raise ReferenceDoesNotExist(f"proposal_id={proposal_id}", proposal_id=proposal_id)
 
-    def _build_action_kwargs(self, metadata, message):
-        kwargs = {"metadata": metadata}
-        schema_name = metadata.event_schema
+    @staticmethod
+    def _is_late_event(metadata, stored_obj):
+        # late events older than the last one applied to the obj are discarded
+        if stored_obj is None or stored_obj.last_event_timestamp is None:
+            return False
 
-        if metadata.event_action == "deleted":
-            kwargs[f"{schema_name}_id"] = uuid.UUID(message[0])
-        elif metadata.event_action == "removed":
-            kwargs["parent_id"] = uuid.UUID(message[0])
-            kwargs[f"{schema_name}_id"] = uuid.UUID(message[1])
-        else:
-            kwargs[schema_name] = self.schema_class.build_from_message(message)
+        return metadata.event_timestamp < stored_obj.last_event_timestamp
 
-        return kwargs
+    def get_message_decoder(self, event_action):
+        # builds the process_<action> arguments following metadata, with the
+        # action resolved beforehand
+        if event_action == "deleted":
+            return lambda message: (parse_uuid(message[0]),)
 
-    def handle(self, metadata, message):
-        try:
-            action_method = getattr(self, f"process_{metadata.event_action}")
-        except AttributeError:
-            raise NotImplementedError()
+        if event_action == "removed":
+            return lambda message: (parse_uuid(message[0]), uuid.UUID(message[1]))
+
+        build_from_message = self.schema_class.build_from_message
+        return lambda message: (build_from_message(message),)
+
+    def get_dispatch_table(self, event_schema):
+        # maps each (schema, action) to the bound process method and its decoder
+        dispatch_table = {}
+        for name in dir(self):
+            if name.startswith("process_"):
+                event_action = name[len("process_") :]
+                dispatch_table[(event_schema, event_action)] = (
+                    getattr(self, name),
+                    self.get_message_decoder(event_action),
+                )
 
-        return action_method(**self._build_action_kwargs(metadata, message))
+        return dispatch_table
 
 
 class ProposalHandler(BaseHandler):
-    schema_class = Proposal
+    schema_class = PydanticSchemaClass("Proposal")
 
     def process_created(self, metadata, proposal):
         proposal_id = proposal.proposal_id
@@ -49,7 +84,10 @@ class ProposalHandler(BaseHandler):
             return
 
         # store proposal
+        proposal.last_event_timestamp = metadata.event_timestamp
         self.stored_proposals[proposal_id] = proposal
+        if self.indexes is not None:
+            self.indexes.put_proposal(proposal)
 
     def process_updated(self, metadata, proposal):
         proposal_id = proposal.proposal_id
@@ -58,20 +96,30 @@ class ProposalHandler(BaseHandler):
         if not current_proposal:
             return
 
+        if self._is_late_event(metadata, current_proposal):
+            return
+
         # avoid overwrite relateds
-        proposal.warranties = current_proposal.warranties
-        proposal.proponents = current_proposal.proponents
+        proposal.inherit_relateds(current_proposal)
+        proposal.last_event_timestamp = metadata.event_timestamp
 
         # update reference to updated obj
         self.stored_proposals[proposal_id] = proposal
+        if self.indexes is not None:
+            self.indexes.put_proposal(proposal)
 
     def process_deleted(self, metadata, proposal_id):
+        if self._is_late_event(metadata, self.stored_proposals.get(proposal_id)):
+            return
+
         # pop reference if exists
-        self.stored_proposals.pop(proposal_id, None)
+        proposal = self.stored_proposals.pop(proposal_id, None)
+        if self.indexes is not None and proposal is not None:
+            self.indexes.pop_proposal(proposal)
 
 
 class ProponentHandler(BaseHandler):
-    schema_class = Proponent
+    schema_class = PydanticSchemaClass("Proponent")
 
     def process_added(self, metadata, proponent):
         proponent_id = proponent.proponent_id
@@ -81,23 +129,34 @@ class ProponentHandler(BaseHandler):
             return
 
         # store proponent
-        proposal.proponents[proponent_id] = proponent
+        proponent.last_event_timestamp = metadata.event_timestamp
+        proposal.put_proponent(proponent)
+        if self.indexes is not None:
+            self.indexes.put_proponent(proponent)
 
     def process_updated(self, metadata, proponent):
-        proponent_id = proponent.proponent_id
         proposal = self._get_stored_proposal(proponent.proposal_id)
+        if self._is_late_event(metadata, proposal.proponents.get(proponent.proponent_id)):
+            return
 
         # update reference to updated obj
-        proposal.proponents.update({proponent_id: proponent})
+        proponent.last_event_timestamp = metadata.event_timestamp
+        proposal.put_proponent(proponent)
+        if self.indexes is not None:
+            self.indexes.put_proponent(proponent)
 
     def process_removed(self, metadata, parent_id, proponent_id):
         proposal = self._get_stored_proposal(parent_id)
+        if self._is_late_event(metadata, proposal.proponents.get(proponent_id)):
+            return
+
         # pop reference if exist
-        proposal.proponents.pop(proponent_id, None)
+        if proposal.pop_proponent(proponent_id) is not None and self.indexes is not None:
+            self.indexes.pop_proponent(parent_id, proponent_id)
 
 
 class WarrantyHandler(BaseHandler):
-    schema_class = Warranty
+    schema_class = PydanticSchemaClass("Warranty")
 
     def process_added(self, metadata, warranty):
         warranty_id = warranty.warranty_id
@@ -107,16 +166,59 @@ class WarrantyHandler(BaseHandler):
             return
 
         # store warranty
-        proposal.warranties[warranty_id] = warranty
+        warranty.last_event_timestamp = metadata.event_timestamp
+        proposal.put_warranty(warranty)
+        if self.indexes is not None:
+            self.indexes.put_warranty(proposal, warranty)
 
     def process_updated(self, metadata, warranty):
-        warranty_id = warranty.warranty_id
         proposal = self._get_stored_proposal(warranty.proposal_id)
+        current_warranty = proposal.warranties.get(warranty.warranty_id)
+        if self._is_late_event(metadata, current_warranty):
+            return
+
+        # read before the put, stored warranties may be views of the storage,
+        # and only with indexes to keep lazy warranties unparsed
+        previous_province = None
+        if self.indexes is not None and current_warranty is not None:
+            previous_province = current_warranty.warranty_province
 
         # update reference to updated obj
-        proposal.warranties.update({warranty_id: warranty})
+        warranty.last_event_timestamp = metadata.event_timestamp
+        proposal.put_warranty(warranty)
+        if self.indexes is not None:
+            self.indexes.put_warranty(proposal, warranty, previous_province)
 
     def process_removed(self, metadata, parent_id, warranty_id):
         proposal = self._get_stored_proposal(parent_id)
+        if self._is_late_event(metadata, proposal.warranties.get(warranty_id)):
+            return
+
         # pop reference if exist
-        proposal.warranties.pop(warranty_id, None)
+        warranty = proposal.pop_warranty(warranty_id)
+        if self.indexes is not None and warranty is not None:
+            self.indexes.pop_warranty(proposal, warranty)
+
+
+class TrustedProposalHandler(ProposalHandler):
+    schema_class = TrustedProposal
+
+
+class TrustedProponentHandler(ProponentHandler):
+    schema_class = TrustedProponent
+
+
+class TrustedWarrantyHandler(WarrantyHandler):
+    schema_class = TrustedWarranty
+
+
+class LazyProposalHandler(ProposalHandler):
+    schema_class = LazyProposal
+
+
+class LazyProponentHandler(ProponentHandler):
+    schema_class = LazyProponent
+
+
+class LazyWarrantyHandler(WarrantyHandler):
+    schema_class = LazyWarranty
@@ -0,0 +1,128 @@
+import uuid
+from bisect import bisect_left, bisect_right, insort
+
+# the warranties accepted value must cover the loan value this many times
+COVERAGE_MULTIPLIER = 2
+# sorts after any proposal_id with the same loan value
+MAX_ID = uuid.UUID(int=(1 << 128) - 1)
+
+
+class ProposalIndexes:
+    # secondary indexes kept up to date by the handlers, all of them map
+    # to proposal ids
+
+    def __init__(self, coverage_multiplier=COVERAGE_MULTIPLIER):
+        self.coverage_multiplier = coverage_multiplier
+        # province -> {proposal_id: warranties count}
+        self.provinces = {}
+        self.under_covered_proposals_ids = set()
+        self.proponents = {}
+        # (loan value, proposal_id) sorted for range lookups
+        self.loan_values = {}
+        self.sorted_loans = []
+
+    def clear(self):
+        self.__init__(self.coverage_multiplier)
+
+    def rebuild(self, stored_proposals):
+        self.clear()
+        for proposal in stored_proposals.values():
+            self.put_proposal(proposal)
+            for proponent in proposal.proponents.values():
+                self.put_proponent(proponent)
+            for warranty in proposal.warranties.values():
+                self._count_province(warranty.warranty_province, proposal.proposal_id)
+
+    # updates
+
+    def put_proposal(self, proposal):
+        proposal_id = proposal.proposal_id
+        loan_value = proposal.proposal_loan_value
+        current_loan_value = self.loan_values.get(proposal_id)
+        if current_loan_value != loan_value:
+            if current_loan_value is not None:
+                self._remove_loan(current_loan_value, proposal_id)
+            insort(self.sorted_loans, (loan_value, proposal_id))
+            self.loan_values[proposal_id] = loan_value
+
+        self.refresh_coverage(proposal)
+
+    def pop_proposal(self, proposal):
+        proposal_id = proposal.proposal_id
+        loan_value = self.loan_values.pop(proposal_id, None)
+        if loan_value is not None:
+            self._remove_loan(loan_value, proposal_id)
+
+        self.under_covered_proposals_ids.discard(proposal_id)
+        for warranty in proposal.warranties.values():
+            self._discount_province(warranty.warranty_province, proposal_id)
+        for proponent_id in proposal.proponents:
+            self.pop_proponent(proposal_id, proponent_id)
+
+    def refresh_coverage(self, proposal):
+        proposal_id = proposal.proposal_id
+        covered_value = proposal.proposal_loan_value * self.coverage_multiplier
+        if proposal.accepted_warranties_value < covered_value:
+            self.under_covered_proposals_ids.add(proposal_id)
+        else:
+            self.under_covered_proposals_ids.discard(proposal_id)
+
+    def put_proponent(self, proponent):
+        self.proponents[proponent.proponent_id] = proponent.proposal_id
+
+    def pop_proponent(self, proposal_id, proponent_id):
+        if self.proponents.get(proponent_id) == proposal_id:
+            del self.proponents[proponent_id]
+
+    def put_warranty(self, proposal, warranty, previous_province=None):
+        # previous_province is given when the warranty was already stored
+        if previous_province is not None:
+            self._discount_province(previous_province, proposal.proposal_id)
+
+        self._count_province(warranty.warranty_province, proposal.proposal_id)
+        self.refresh_coverage(proposal)
+
+    def pop_warranty(self, proposal, warranty):
+        self._discount_province(warranty.warranty_province, proposal.proposal_id)
+        self.refresh_coverage(proposal)
+
+    def _remove_loan(self, loan_value, proposal_id):
+        sorted_loans = self.sorted_loans
+        del sorted_loans[bisect_left(sorted_loans, (loan_value, proposal_id))]
+
+    def _count_province(self, province, proposal_id):
+        proposals_ids = self.provinces.setdefault(province, {})
+        proposals_ids[proposal_id] = proposals_ids.get(proposal_id, 0) + 1
+
+    def _discount_province(self, province, proposal_id):
+        proposals_ids = self.provinces.get(province)
+        if proposals_ids is None or proposal_id not in proposals_ids:
+            return
+
+        proposals_ids[proposal_id] -= 1
+        if not proposals_ids[proposal_id]:
+            del proposals_ids[proposal_id]
+            if not proposals_ids:
+                del self.provinces[province]
+
+    # queries
+
+    def get_proposals_by_province(self, province):
+        return list(self.provinces.get(province, ()))
+
+    def get_under_covered_proposals(self):
+        return list(self.under_covered_proposals_ids)
+
+    def get_proposal_by_proponent(self, proponent_id):
+        return self.proponents.get(proponent_id)
+
+    def get_proposals_by_loan_range(self, min_value=None, max_value=None):
+        # both limits are inclusive, None means unbounded
+        sorted_loans = self.sorted_loans
+        start = 0 if min_value is None else bisect_left(sorted_loans, (min_value,))
+        if max_value is None:
+            end = len(sorted_loans)
+        else:
+            end = bisect_right(sorted_loans, (max_value, MAX_ID))
+
+        return [proposal_id for _, proposal_id in sorted_loans[start:end]]
@@ -0,0 +1,112 @@
+import glob
+import gzip
+import io
+import queue
+import threading
+import types
+
+from .core import read_events_iter
+
+BUFFER_SIZE = 1024 * 1024
+END_OF_LINES = object()
+
+
+def expand_paths(paths):
+    expanded_paths = []
+    for path in paths:
+        matched_paths = sorted(glob.glob(path)) if glob.has_magic(path) else [path]
+        if not matched_paths:
+            raise FileNotFoundError(f"No files match {path}!")
+
+        for matched_path in matched_paths:
+            if matched_path not in expanded_paths:
+                expanded_paths.append(matched_path)
+
+    return expanded_paths
+
+
+def open_input(path, buffer_size=BUFFER_SIZE):
+    if path.endswith(".gz"):
+        binary_file = gzip.open(path, "rb")
+    elif path.endswith((".zst", ".zstd")):
+        # imported on the first compressed file, it's optional and slow to import
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"Reading {path} requires zstandard!") from None
+
+        binary_file = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    else:
+        return open(path, "r", encoding="utf-8", buffering=buffer_size)
+
+    # decompressed streams are read in large chunks too
+    return io.TextIOWrapper(io.BufferedReader(binary_file, buffer_size), encoding="utf-8")
+
+
+def iter_input_lines(paths, buffer_size=BUFFER_SIZE):
+    for path in expand_paths(paths):
+        with open_input(path, buffer_size) as input_file:
+            yield from input_file
+
+
+def iter_lines_in_background(lines, queue_size=64, chunk_size=10000):
+    # reading and decompressing run in a thread, mostly out of the GIL,
+    # while the caller parses the previous chunks
+    lines_queue = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                lines_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def read():
+        try:
+            chunk = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) >= chunk_size:
+                    if not put(chunk):
+                        return
+                    chunk = []
+
+            if chunk and not put(chunk):
+                return
+        except Exception as error:
+            put(error)
+        else:
+            put(END_OF_LINES)
+        finally:
+            # closes the files of a generator left unfinished
+            if isinstance(lines, types.GeneratorType):
+                lines.close()
+
+    reader = threading.Thread(target=read, name="input-reader", daemon=True)
+    reader.start()
+
+    try:
+        while True:
+            item = lines_queue.get()
+            if item is END_OF_LINES:
+                return
+            if isinstance(item, Exception):
+                raise item
+
+            yield from item
+    finally:
+        # lets the reader finish when the caller stops early
+        stopped.set()
+        reader.join()
+
+
+def read_events_files(paths, dispatcher=None, trusted=False, background=True, buffer_size=BUFFER_SIZE):
+    lines = iter_input_lines(paths, buffer_size)
+    if background:
+        lines = iter_lines_in_background(lines)
+
+    return read_events_iter(lines, dispatcher=dispatcher, trusted=trusted)
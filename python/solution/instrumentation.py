@@ -0,0 +1,110 @@
+import json
+from collections import Counter
+
+STAGES = ("split", "metadata", "dedup", "handler_lookup", "build", "apply", "dedup_add", "wal")
+METRICS_PREFIX = "events"
+
+
+class Instrumentation:
+    # record_* methods are the hook points, override them to forward the
+    # measures somewhere else
+    def __init__(self):
+        self.stages_ns = dict.fromkeys(STAGES, 0)
+        self.events = Counter()
+        self.dedup_checks = 0
+        self.dedup_hits = 0
+        self.reference_misses = 0
+        self.validations = 0
+        self.validation_ns = 0
+
+    def record_stage(self, stage, elapsed_ns):
+        self.stages_ns[stage] += elapsed_ns
+
+    def record_event(self, event_schema, event_action):
+        self.events[(event_schema, event_action)] += 1
+
+    def record_dedup(self, is_duplicated):
+        self.dedup_checks += 1
+        if is_duplicated:
+            self.dedup_hits += 1
+
+    def record_reference_miss(self):
+        self.reference_misses += 1
+
+    def record_validation(self, elapsed_ns):
+        self.validations += 1
+        self.validation_ns += elapsed_ns
+
+    def get_dedup_hit_rate(self):
+        return self.dedup_hits / self.dedup_checks if self.dedup_checks else 0.0
+
+    def to_dict(self):
+        return {
+            "stages_seconds": {stage: elapsed_ns / 1e9 for stage, elapsed_ns in self.stages_ns.items()},
+            "events": [
+                {"schema": event_schema, "action": event_action, "count": count}
+                for (event_schema, event_action), count in sorted(self.events.items())
+            ],
+            "dedup_checks": self.dedup_checks,
+            "dedup_hits": self.dedup_hits,
+            "dedup_hit_rate": self.get_dedup_hit_rate(),
+            "reference_misses": self.reference_misses,
+            "validations": self.validations,
+            "validation_seconds": self.validation_ns / 1e9,
+        }
+
+    def to_prometheus(self):
+        lines = []
+
+        def add_metric(name, metric_type, description, samples):
+            name = f"{METRICS_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                labels = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+        add_metric(
+            "stage_seconds_total",
+            "counter",
+            "Time spent in each dispatch stage.",
+            [((("stage", stage),), elapsed_ns / 1e9) for stage, elapsed_ns in self.stages_ns.items()],
+        )
+        add_metric(
+            "processed_total",
+            "counter",
+            "Events dispatched by schema and action.",
+            [
+                ((("schema", event_schema), ("action", event_action)), count)
+                for (event_schema, event_action), count in sorted(self.events.items())
+            ],
+        )
+        add_metric(
+            "dedup_checks_total", "counter", "Events checked for duplication.", [((), self.dedup_checks)]
+        )
+        add_metric("dedup_hits_total", "counter", "Duplicated events discarded.", [((), self.dedup_hits)])
+        add_metric(
+            "reference_misses_total",
+            "counter",
+            "Events referencing a proposal that does not exist.",
+            [((), self.reference_misses)],
+        )
+        add_metric("validations_total", "counter", "Final validation passes.", [((), self.validations)])
+        add_metric(
+            "validation_seconds_total",
+            "counter",
+            "Time spent in final validation passes.",
+            [((), self.validation_ns / 1e9)],
+        )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, output_format="json"):
+        if output_format == "json":
+            content = json.dumps(self.to_dict(), indent=2)
+        elif output_format == "prometheus":
+            content = self.to_prometheus()
+        else:
+            raise ValueError(f"Invalid metrics format {output_format}!")
+
+        with open(path, "w") as metrics_file:
+            metrics_file.write(content)
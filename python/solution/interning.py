@@ -0,0 +1,59 @@
+import uuid
+from functools import lru_cache
+
+from prettyconf import config
+
+# the same proposal_id shows up in dozens of events, parsing it once and
+# sharing the object saves the parsing and the allocation of the others;
+# event, proponent and warranty ids rarely repeat and are not interned
+INTERNED_UUIDS_MAX_SIZE = config("INTERNED_UUIDS_MAX_SIZE", default="65536", cast=int)
+INTERNED_STRINGS_MAX_SIZE = config("INTERNED_STRINGS_MAX_SIZE", default="1024", cast=int)
+
+
+# looked up once, the enum member access is slow for every built uuid
+_new_object = object.__new__
+_set_attribute = object.__setattr__
+_UUID = uuid.UUID
+_UNKNOWN_SAFETY = uuid.SafeUUID.unknown
+
+
+def build_uuid_from_bytes(value):
+    # skips the UUID.__init__ checks, 16 bytes are always a valid uuid
+    uuid_obj = _new_object(_UUID)
+    _set_attribute(uuid_obj, "int", int.from_bytes(value, "big"))
+    _set_attribute(uuid_obj, "is_safe", _UNKNOWN_SAFETY)
+    return uuid_obj
+
+
+def _keep_string(value):
+    return value
+
+
+# lru_cache keeps the first object built for each key, so equal values
+# come back as the same object
+parse_uuid = lru_cache(maxsize=INTERNED_UUIDS_MAX_SIZE)(uuid.UUID)
+uuid_from_bytes = lru_cache(maxsize=INTERNED_UUIDS_MAX_SIZE)(build_uuid_from_bytes)
+intern_string = lru_cache(maxsize=INTERNED_STRINGS_MAX_SIZE)(_keep_string)
+
+CACHES = {"uuids": parse_uuid, "uuids_bytes": uuid_from_bytes, "strings": intern_string}
+
+
+def get_stats():
+    stats = {}
+    for name, cache in CACHES.items():
+        cache_info = cache.cache_info()
+        lookups = cache_info.hits + cache_info.misses
+        stats[name] = {
+            "hits": cache_info.hits,
+            "misses": cache_info.misses,
+            "size": cache_info.currsize,
+            "max_size": cache_info.maxsize,
+            "hit_rate": cache_info.hits / lookups if lookups else 0.0,
+        }
+
+    return stats
+
+
+def clear():
+    for cache in CACHES.values():
+        cache.cache_clear()
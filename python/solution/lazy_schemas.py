@@ -0,0 +1,191 @@
+import uuid
+
+from .interning import intern_string, parse_uuid
+from .trusted_schemas import TrustedProponent, TrustedProposal, TrustedWarranty, parse_bool
+from .validations import is_accepted_warranty, is_underage_proponent, to_exact_units
+
+# only the ids are parsed when the event is applied, the other fields keep
+# the raw message slice until something reads them, so objects replaced by
+# later updates or deleted before any query never pay the parsing
+
+
+class LazyMessageMixin:
+    __slots__ = ()
+    # field name -> function filling it, and its siblings, on the first read
+    lazy_fields = {}
+
+    def __getattr__(self, name):
+        # only called for unset slots, loaded fields are plain slot reads
+        try:
+            load = self.lazy_fields[name]
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}") from None
+
+        load(self)
+        return object.__getattribute__(self, name)
+
+    @property
+    def is_materialized(self):
+        return self._message is None
+
+    def materialize(self):
+        # parses the message fields at once, skipping __getattr__
+        if self._message is not None:
+            self._parse_message()
+
+        return self
+
+
+class LazyWarranty(LazyMessageMixin, TrustedWarranty):
+    __slots__ = ("_message",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._message = None
+
+    @classmethod
+    def build_from_message(cls, message):
+        warranty = cls.__new__(cls)
+        warranty.proposal_id = parse_uuid(message[0])
+        warranty.warranty_id = uuid.UUID(message[1])
+        warranty.last_event_timestamp = None
+        warranty._message = message
+        return warranty
+
+    def _parse_message(self):
+        message = self._message
+        self.warranty_value = float(message[2])
+        self.warranty_province = intern_string(message[3])
+        self._message = None
+
+    lazy_fields = dict.fromkeys(("warranty_value", "warranty_province"), _parse_message)
+
+
+class LazyProponent(LazyMessageMixin, TrustedProponent):
+    __slots__ = ("_message",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._message = None
+
+    @classmethod
+    def build_from_message(cls, message):
+        proponent = cls.__new__(cls)
+        proponent.proposal_id = parse_uuid(message[0])
+        proponent.proponent_id = uuid.UUID(message[1])
+        proponent.last_event_timestamp = None
+        proponent._message = message
+        return proponent
+
+    def _parse_message(self):
+        message = self._message
+        self.proponent_name = message[2]
+        self.proponent_age = int(message[3])
+        self.proponent_monthly_income = float(message[4])
+        self.proponent_is_main = parse_bool(message[5])
+        self._message = None
+
+    lazy_fields = dict.fromkeys(
+        ("proponent_name", "proponent_age", "proponent_monthly_income", "proponent_is_main"), _parse_message
+    )
+
+
+class LazyProposal(LazyMessageMixin, TrustedProposal):
+    # relateds are stored without reading them, the aggregates of proponents
+    # and warranties are computed apart on the first read after a change, so
+    # rules rejecting a proposal by its proponents never parse its warranties
+    __slots__ = ("_message", "_has_proponents_aggregates", "_has_warranties_aggregates")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._message = None
+        self._has_proponents_aggregates = True
+        self._has_warranties_aggregates = True
+
+    @classmethod
+    def build_from_message(cls, message):
+        proposal = cls.__new__(cls)
+        proposal.proposal_id = parse_uuid(message[0])
+        proposal.last_event_timestamp = None
+        proposal.warranties = {}
+        proposal.proponents = {}
+        proposal._message = message
+        proposal._has_proponents_aggregates = False
+        proposal._has_warranties_aggregates = False
+        return proposal
+
+    def _parse_message(self):
+        message = self._message
+        self.proposal_loan_value = float(message[1])
+        self.proposal_number_of_monthly_installments = int(message[2])
+        self._message = None
+
+    def _refresh_proponents_aggregates(self):
+        proponents = [proponent.materialize() for proponent in self.proponents.values()]
+        self.main_proponents_ids = {
+            proponent.proponent_id for proponent in proponents if proponent.proponent_is_main
+        }
+        self.underage_proponents_count = sum(
+            1 for proponent in proponents if is_underage_proponent(proponent)
+        )
+        self._has_proponents_aggregates = True
+
+    def _refresh_warranties_aggregates(self):
+        warranties = [warranty.materialize() for warranty in self.warranties.values()]
+        accepted_units = [
+            to_exact_units(warranty.warranty_value)
+            for warranty in warranties
+            if is_accepted_warranty(warranty)
+        ]
+        self.accepted_warranties_count = len(accepted_units)
+        self.accepted_warranties_units = sum(accepted_units)
+        self._has_warranties_aggregates = True
+
+    lazy_fields = {
+        "proposal_loan_value": _parse_message,
+        "proposal_number_of_monthly_installments": _parse_message,
+        "main_proponents_ids": _refresh_proponents_aggregates,
+        "underage_proponents_count": _refresh_proponents_aggregates,
+        "accepted_warranties_count": _refresh_warranties_aggregates,
+        "accepted_warranties_units": _refresh_warranties_aggregates,
+    }
+
+    def _reset_proponents_aggregates(self):
+        if self._has_proponents_aggregates:
+            del self.main_proponents_ids
+            del self.underage_proponents_count
+            self._has_proponents_aggregates = False
+
+    def _reset_warranties_aggregates(self):
+        if self._has_warranties_aggregates:
+            del self.accepted_warranties_count
+            del self.accepted_warranties_units
+            self._has_warranties_aggregates = False
+
+    def put_proponent(self, proponent):
+        self.proponents[proponent.proponent_id] = proponent
+        self._reset_proponents_aggregates()
+
+    def pop_proponent(self, proponent_id):
+        proponent = self.proponents.pop(proponent_id, None)
+        if proponent is not None:
+            self._reset_proponents_aggregates()
+
+        return proponent
+
+    def put_warranty(self, warranty):
+        self.warranties[warranty.warranty_id] = warranty
+        self._reset_warranties_aggregates()
+
+    def pop_warranty(self, warranty_id):
+        warranty = self.warranties.pop(warranty_id, None)
+        if warranty is not None:
+            self._reset_warranties_aggregates()
+
+        return warranty
+
+    def inherit_relateds(self, proposal):
+        self.proponents = proposal.proponents
+        self.warranties = proposal.warranties
+        self._reset_proponents_aggregates()
+        self._reset_warranties_aggregates()
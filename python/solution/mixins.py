@@ -0,0 +1,84 @@
+from .validations import (
+    VALIDATIONS,
+    from_exact_units,
+    is_accepted_warranty,
+    is_underage_proponent,
+    to_exact_units,
+)
+
+
+class ProposalMixin:
+    __slots__ = ()
+
+    # relateds must be changed through these methods to keep aggregates updated
+
+    def put_proponent(self, proponent):
+        proponent_id = proponent.proponent_id
+        current_proponent = self.proponents.get(proponent_id)
+        if current_proponent is not None:
+            self._discount_proponent(current_proponent)
+
+        self.proponents[proponent_id] = proponent
+
+        if proponent.proponent_is_main:
+            self.main_proponents_ids.add(proponent_id)
+        if is_underage_proponent(proponent):
+            self.underage_proponents_count += 1
+
+    def pop_proponent(self, proponent_id):
+        proponent = self.proponents.pop(proponent_id, None)
+        if proponent is not None:
+            self._discount_proponent(proponent)
+
+        return proponent
+
+    def _discount_proponent(self, proponent):
+        self.main_proponents_ids.discard(proponent.proponent_id)
+        if is_underage_proponent(proponent):
+            self.underage_proponents_count -= 1
+
+    def put_warranty(self, warranty):
+        warranty_id = warranty.warranty_id
+        current_warranty = self.warranties.get(warranty_id)
+        if current_warranty is not None:
+            self._discount_warranty(current_warranty)
+
+        self.warranties[warranty_id] = warranty
+
+        if is_accepted_warranty(warranty):
+            self.accepted_warranties_count += 1
+            self.accepted_warranties_units += to_exact_units(warranty.warranty_value)
+
+    def pop_warranty(self, warranty_id):
+        warranty = self.warranties.pop(warranty_id, None)
+        if warranty is not None:
+            self._discount_warranty(warranty)
+
+        return warranty
+
+    def _discount_warranty(self, warranty):
+        if is_accepted_warranty(warranty):
+            self.accepted_warranties_count -= 1
+            self.accepted_warranties_units -= to_exact_units(warranty.warranty_value)
+
+    @property
+    def accepted_warranties_value(self):
+        return from_exact_units(self.accepted_warranties_units)
+
+    def inherit_relateds(self, proposal):
+        self.proponents = proposal.proponents
+        self.warranties = proposal.warranties
+        self.main_proponents_ids = proposal.main_proponents_ids
+        self.underage_proponents_count = proposal.underage_proponents_count
+        self.accepted_warranties_count = proposal.accepted_warranties_count
+        self.accepted_warranties_units = proposal.accepted_warranties_units
+
+    def get_validations(self):
+        return VALIDATIONS
+
+    def is_valid(self):
+        for validate in self.get_validations():
+            if not validate(proposal=self):
+                return False
+
+        return True
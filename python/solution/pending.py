@@ -0,0 +1,88 @@
+from collections import deque
+from datetime import timedelta
+from itertools import count
+
+
+class PendingEventsBuffer:
+    # parks child events that arrive before their proposal, keyed by the
+    # int value of proposal_id, until the proposal is created
+
+    def __init__(self, max_events=100000, max_age=timedelta(hours=1)):
+        self.max_events = max_events
+        self.max_age = max_age
+        self.newest_timestamp = None
+        self.pending_events = {}
+        # parking order, used for eviction
+        self.parking_queue = deque()
+        self.sequence = count()
+        self.pending_count = 0
+        self.parked_count = 0
+        self.drained_count = 0
+        self.expired_count = 0
+
+    def __len__(self):
+        return self.pending_count
+
+    def __contains__(self, proposal_id):
+        return proposal_id.int in self.pending_events
+
+    def park(self, proposal_id, metadata, action_args):
+        key = proposal_id.int
+        event = [metadata.event_timestamp, next(self.sequence), metadata, action_args]
+        self.pending_events.setdefault(key, []).append(event)
+        self.parking_queue.append((key, event))
+        self.pending_count += 1
+        self.parked_count += 1
+
+    def drain(self, proposal_id):
+        events = self.pending_events.pop(proposal_id.int, [])
+        self.pending_count -= len(events)
+        self.drained_count += len(events)
+
+        # sequence keeps the arrival order between events with same timestamp
+        events.sort(key=lambda event: (event[0], event[1]))
+        drained_events = []
+        for event in events:
+            drained_events.append((event[2], event[3]))
+            # marks the event as gone for the parking queue
+            event[2] = None
+
+        return drained_events
+
+    def expire(self, event_timestamp):
+        # called for every applied event, parked or not, so the age is
+        # relative to the newest event received
+        if self.newest_timestamp is None or event_timestamp > self.newest_timestamp:
+            self.newest_timestamp = event_timestamp
+
+        queue = self.parking_queue
+        if not queue:
+            return
+
+        watermark = self.newest_timestamp - self.max_age
+        while queue:
+            key, event = queue[0]
+            if event[2] is not None and self.pending_count <= self.max_events and event[0] >= watermark:
+                break
+
+            queue.popleft()
+            if event[2] is not None:
+                self._remove(key, event)
+
+    def _remove(self, key, event):
+        events = self.pending_events[key]
+        events.remove(event)
+        if not events:
+            del self.pending_events[key]
+
+        event[2] = None
+        self.pending_count -= 1
+        self.expired_count += 1
+
+    def get_metrics(self):
+        return {
+            "pending": self.pending_count,
+            "parked": self.parked_count,
+            "drained": self.drained_count,
+            "expired": self.expired_count,
+        }
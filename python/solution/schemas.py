@@ -1,18 +1,24 @@
 import uuid
 from datetime import datetime
-from typing import Mapping
+from typing import Mapping, Optional, Set
 
+from pydantic import VERSION as PYDANTIC_VERSION
 from pydantic import BaseModel
 
-from .validations import (
-    has_main_proponent_with_valid_monthly_income,
-    has_proponents_with_valid_age,
-    has_valid_loan_installments_number,
-    has_valid_loan_value,
-    has_valid_main_proponents_number,
-    has_valid_proponents_number,
-    has_valid_warranties_number_and_valid_warranted_value,
-)
+from .interning import intern_string
+from .mixins import ProposalMixin
+from .trusted_schemas import to_utc
+
+if PYDANTIC_VERSION.startswith("1."):
+    from pydantic import validator
+
+    timestamp_validator = validator("event_timestamp", allow_reuse=True)
+    kind_validator = validator("event_schema", "event_action", allow_reuse=True)
+else:
+    from pydantic import field_validator
+
+    timestamp_validator = field_validator("event_timestamp")
+    kind_validator = field_validator("event_schema", "event_action")
 
 
 class EventMetadata(BaseModel):
@@ -21,12 +27,42 @@ class EventMetadata(BaseModel):
     event_action: str
     event_timestamp: datetime
 
+    @timestamp_validator
+    def normalize_event_timestamp(cls, value):
+        return to_utc(value)
+
+    @kind_validator
+    def intern_event_kind(cls, value):
+        return intern_string(value)
+
+    @classmethod
+    def build_from_values(cls, event_id, event_schema, event_action, event_timestamp):
+        return cls(
+            event_id=event_id,
+            event_schema=event_schema,
+            event_action=event_action,
+            event_timestamp=event_timestamp,
+        )
+
+    @classmethod
+    def iter_from_raw_events(cls, raw_events):
+        # yields each event message with its metadata
+        for raw_event in raw_events:
+            event_id, event_schema, event_action, event_timestamp, *message = raw_event.split(",")
+            yield message, cls(
+                event_id=event_id,
+                event_schema=event_schema,
+                event_action=event_action,
+                event_timestamp=event_timestamp,
+            )
+
 
 class Warranty(BaseModel):
     proposal_id: uuid.UUID
     warranty_id: uuid.UUID
     warranty_value: float
     warranty_province: str
+    last_event_timestamp: Optional[datetime] = None
 
     @classmethod
     def build_from_message(cls, message):
@@ -37,6 +73,15 @@ class Warranty(BaseModel):
             warranty_province=message[3],
         )
 
+    @classmethod
+    def build_from_values(cls, proposal_id, warranty_id, warranty_value, warranty_province):
+        return cls(
+            proposal_id=proposal_id,
+            warranty_id=warranty_id,
+            warranty_value=warranty_value,
+            warranty_province=warranty_province,
+        )
+
 
 class Proponent(BaseModel):
     proposal_id: uuid.UUID
@@ -45,6 +90,7 @@ class Proponent(BaseModel):
     proponent_age: int
     proponent_monthly_income: float
     proponent_is_main: bool
+    last_event_timestamp: Optional[datetime] = None
 
     @classmethod
     def build_from_message(cls, message):
@@ -57,13 +103,38 @@ class Proponent(BaseModel):
             proponent_is_main=message[5],
         )
 
+    @classmethod
+    def build_from_values(
+        cls,
+        proposal_id,
+        proponent_id,
+        proponent_name,
+        proponent_age,
+        proponent_monthly_income,
+        proponent_is_main,
+    ):
+        return cls(
+            proposal_id=proposal_id,
+            proponent_id=proponent_id,
+            proponent_name=proponent_name,
+            proponent_age=proponent_age,
+            proponent_monthly_income=proponent_monthly_income,
+            proponent_is_main=proponent_is_main,
+        )
 
-class Proposal(BaseModel):
+
+class Proposal(ProposalMixin, BaseModel):
     proposal_id: uuid.UUID
     proposal_loan_value: float
     proposal_number_of_monthly_installments: int
+    last_event_timestamp: Optional[datetime] = None
     warranties: Mapping[uuid.UUID, Warranty] = {}
     proponents: Mapping[uuid.UUID, Proponent] = {}
+    # aggregates kept by ProposalMixin
+    main_proponents_ids: Set[uuid.UUID] = set()
+    underage_proponents_count: int = 0
+    accepted_warranties_count: int = 0
+    accepted_warranties_units: int = 0
 
     @classmethod
     def build_from_message(cls, message):
@@ -73,20 +144,10 @@ class Proposal(BaseModel):
             proposal_number_of_monthly_installments=message[2],
         )
 
-    def get_validations(self):
-        return (
-            has_valid_loan_value,
-            has_valid_loan_installments_number,
-            has_valid_proponents_number,
-            has_valid_main_proponents_number,
-            has_proponents_with_valid_age,
-            has_valid_warranties_number_and_valid_warranted_value,
-            has_main_proponent_with_valid_monthly_income,
+    @classmethod
+    def build_from_values(cls, proposal_id, proposal_loan_value, proposal_number_of_monthly_installments):
+        return cls(
+            proposal_id=proposal_id,
+            proposal_loan_value=proposal_loan_value,
+            proposal_number_of_monthly_installments=proposal_number_of_monthly_installments,
         )
-
-    def is_valid(self):
-        for validate in self.get_validations():
-            if not validate(proposal=self):
-                return False
-
-        return True
@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import json
+from contextlib import suppress
+
+from .async_core import AsyncDispatcher
+from .core import Dispatcher, iter_chunks
+from .pending import PendingEventsBuffer
+
+# bytes read at once from a producer, the complete lines of each read are
+# committed together, so pipelined writes make bigger batches
+READ_SIZE = 65536
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class EventServer:
+    # producers send newline framed events and get back "ACK <count>\n" with
+    # the events of the connection committed so far, after each batch
+
+    def __init__(self, async_dispatcher=None):
+        self.async_dispatcher = async_dispatcher if async_dispatcher is not None else AsyncDispatcher()
+        self.servers = []
+        self.connections_count = 0
+        self.active_connections_count = 0
+        self.acks_count = 0
+        self.errors_count = 0
+        self.http_requests_count = 0
+
+    @property
+    def dispatcher(self):
+        return self.async_dispatcher.dispatcher
+
+    async def start_tcp(self, host="127.0.0.1", port=0):
+        server = await asyncio.start_server(self._handle_producer, host, port)
+        self.servers.append(server)
+        return server
+
+    async def start_unix(self, path):
+        server = await asyncio.start_unix_server(self._handle_producer, path)
+        self.servers.append(server)
+        return server
+
+    async def start_http(self, host="127.0.0.1", port=0):
+        server = await asyncio.start_server(self._handle_http, host, port)
+        self.servers.append(server)
+        return server
+
+    async def serve_forever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self.servers))
+
+    async def close(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+        self.servers = []
+        self.async_dispatcher.close()
+
+    # events
+
+    async def _handle_producer(self, reader, writer):
+        self.connections_count += 1
+        self.active_connections_count += 1
+        committed_events = 0
+
+        try:
+            async for batch in self._iter_batches(reader):
+                await self.async_dispatcher.commit(batch)
+                committed_events += len(batch)
+                self.acks_count += 1
+                writer.write(b"ACK %d\n" % committed_events)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception as error:
+            # the events before the failing one are kept, since the count of
+            # the last ack the producer knows what to send again
+            self.errors_count += 1
+            writer.write(f"ERROR {type(error).__name__}: {error}\n".encode("utf-8"))
+        finally:
+            self.active_connections_count -= 1
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _iter_batches(self, reader):
+        batch_size = self.async_dispatcher.batch_size
+        incomplete_line = b""
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+
+            lines = (incomplete_line + data).split(b"\n")
+            incomplete_line = lines.pop()
+            # only complete lines are decoded, a read may split a character,
+            # and producers may end them with \r\n
+            for batch in iter_chunks((line.rstrip(b"\r").decode("utf-8") for line in lines), batch_size):
+                yield batch
+
+        # the last event may come without the line break
+        incomplete_line = incomplete_line.rstrip(b"\r")
+        if incomplete_line:
+            yield [incomplete_line.decode("utf-8")]
+
+    # http
+
+    async def _handle_http(self, reader, writer):
+        self.http_requests_count += 1
+
+        try:
+            request_line = await reader.readline()
+            # headers are not used, but are read to leave the request complete
+            while await reader.readline() not in (b"\r\n", b"\n", b""):
+                pass
+
+            status, body = await self._route(request_line)
+            payload = json.dumps(body).encode("utf-8")
+            writer.write(
+                b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+                b"Connection: close\r\n\r\n" % (status, HTTP_REASONS[status].encode("ascii"), len(payload))
+            )
+            writer.write(payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _route(self, request_line):
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return 400, {"error": "Invalid request line"}
+
+        if method != "GET":
+            return 405, {"error": f"Method {method} not allowed"}
+
+        path = target.split("?", 1)[0]
+        if path == "/valid-proposals":
+            return 200, {"valid_proposals": await self.async_dispatcher.get_valid_proposals()}
+        if path == "/stats":
+            return 200, await self.get_stats()
+
+        return 404, {"error": f"Path {path} not found"}
+
+    async def get_stats(self):
+        # read between commits, as the dispatcher changes in the executor
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.async_dispatcher.executor, self._get_stats)
+
+    def _get_stats(self):
+        dispatcher = self.dispatcher
+        stats = {
+            "connections": self.connections_count,
+            "active_connections": self.active_connections_count,
+            "acks": self.acks_count,
+            "errors": self.errors_count,
+            "http_requests": self.http_requests_count,
+            "committed_batches": self.async_dispatcher.committed_batches,
+            "committed_events": self.async_dispatcher.committed_events,
+            "stored_proposals": len(dispatcher.stored_proposals),
+            "processed_events": len(dispatcher.processed_events),
+        }
+        if dispatcher.instrumentation is not None:
+            stats["instrumentation"] = dispatcher.instrumentation.to_dict()
+
+        return stats
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Receive events from local producers")
+    parser.add_argument("--tcp", type=parse_address, help="HOST:PORT of the events listener")
+    parser.add_argument("--unix", help="path of the events unix socket")
+    parser.add_argument("--http", type=parse_address, help="HOST:PORT of the valid proposals endpoint")
+    parser.add_argument("--batch-size", type=int, default=500, help="max events committed at once")
+    parser.add_argument("--trusted", action="store_true", help="skip pydantic validation")
+    parser.add_argument("--lazy", action="store_true", help="parse fields only when read")
+    parser.add_argument(
+        "--park-orphans",
+        action="store_true",
+        help="keep events arriving before their proposal, as producers are not ordered between them",
+    )
+    args = parser.parse_args(args)
+
+    if args.tcp is None and args.unix is None:
+        parser.error("at least one of --tcp or --unix is required")
+
+    return args
+
+
+async def serve(args):
+    pending_events = PendingEventsBuffer() if args.park_orphans else None
+    dispatcher = Dispatcher(trusted=args.trusted, lazy=args.lazy, pending_events=pending_events)
+    server = EventServer(AsyncDispatcher(dispatcher, batch_size=args.batch_size))
+
+    if args.tcp is not None:
+        await server.start_tcp(*args.tcp)
+    if args.unix is not None:
+        await server.start_unix(args.unix)
+    if args.http is not None:
+        await server.start_http(*args.http)
+
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(args=None):
+    with suppress(KeyboardInterrupt):
+        asyncio.run(serve(parse_args(args)))
+
+
+if __name__ == "__main__":
+    main()
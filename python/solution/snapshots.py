@@ -0,0 +1,340 @@
+import mmap
+import os
+import struct
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from .deduplication import BloomFilterProcessedEvents, ProcessedEventsSet, TimeWindowProcessedEvents
+from .pending import PendingEventsBuffer
+
+MAGIC = b"BCSNAP"
+VERSION = 2
+# version 1 snapshots have no pending events section
+READABLE_VERSIONS = (1, 2)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+NO_TIMESTAMP = -(2**63)
+
+# all values are little endian; uuids are stored as 16 raw bytes and
+# timestamps as int64 microseconds since epoch
+HEADER = struct.Struct("<6sHQ")
+PROPOSAL = struct.Struct("<16sdiqII")
+PROPONENT = struct.Struct("<16sidBqH")
+WARRANTY = struct.Struct("<16sdqB")
+PROCESSED_EVENTS_HEADER = struct.Struct("<BQ")
+TIME_WINDOW_HEADER = struct.Struct("<qqQ")
+TIME_WINDOW_ENTRY = struct.Struct("<16sq")
+BLOOM_FILTER_HEADER = struct.Struct("<QdQIQB")
+PENDING_EVENTS_HEADER = struct.Struct("<BQqqQQQQ")
+
+PROCESSED_EVENTS_KINDS = (ProcessedEventsSet, TimeWindowProcessedEvents, BloomFilterProcessedEvents)
+
+
+def timestamp_to_micros(timestamp):
+    if timestamp is None:
+        return NO_TIMESTAMP
+    # timestamps without timezone are taken as UTC, as parsed events are
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def micros_to_timestamp(micros):
+    if micros == NO_TIMESTAMP:
+        return None
+
+    return EPOCH + timedelta(microseconds=micros)
+
+
+def write_snapshot(dispatcher, path):
+    temporary_path = f"{path}.tmp"
+
+    with open(temporary_path, "wb") as snapshot_file:
+        stored_proposals = dispatcher.stored_proposals
+        snapshot_file.write(HEADER.pack(MAGIC, VERSION, len(stored_proposals)))
+
+        for proposal in stored_proposals.values():
+            _write_proposal(snapshot_file, proposal)
+
+        processed_events = dispatcher.processed_events
+        kind = PROCESSED_EVENTS_KINDS.index(type(processed_events))
+        data = _dump_processed_events(processed_events)
+        snapshot_file.write(PROCESSED_EVENTS_HEADER.pack(kind, len(data)))
+        snapshot_file.write(data)
+
+        pending_events = dispatcher.pending_events
+        data = _dump_pending_events(pending_events) if pending_events is not None else b""
+        snapshot_file.write(_pack_pending_events_header(pending_events, len(data)))
+        snapshot_file.write(data)
+
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+
+    # readers never see a partially written snapshot
+    os.replace(temporary_path, path)
+
+
+def _write_proposal(snapshot_file, proposal):
+    snapshot_file.write(
+        PROPOSAL.pack(
+            proposal.proposal_id.bytes,
+            proposal.proposal_loan_value,
+            proposal.proposal_number_of_monthly_installments,
+            timestamp_to_micros(proposal.last_event_timestamp),
+            len(proposal.proponents),
+            len(proposal.warranties),
+        )
+    )
+
+    for proponent in proposal.proponents.values():
+        name = proponent.proponent_name.encode("utf-8")
+        snapshot_file.write(
+            PROPONENT.pack(
+                proponent.proponent_id.bytes,
+                proponent.proponent_age,
+                proponent.proponent_monthly_income,
+                proponent.proponent_is_main,
+                timestamp_to_micros(proponent.last_event_timestamp),
+                len(name),
+            )
+        )
+        snapshot_file.write(name)
+
+    for warranty in proposal.warranties.values():
+        province = warranty.warranty_province.encode("utf-8")
+        snapshot_file.write(
+            WARRANTY.pack(
+                warranty.warranty_id.bytes,
+                warranty.warranty_value,
+                timestamp_to_micros(warranty.last_event_timestamp),
+                len(province),
+            )
+        )
+        snapshot_file.write(province)
+
+
+def _dump_processed_events(processed_events):
+    if isinstance(processed_events, BloomFilterProcessedEvents):
+        has_previous = processed_events.previous is not None
+        header = BLOOM_FILTER_HEADER.pack(
+            processed_events.capacity,
+            processed_events.false_positive_rate,
+            processed_events.bits_count,
+            processed_events.hashes_count,
+            processed_events.current_count,
+            has_previous,
+        )
+        previous = processed_events.previous if has_previous else b""
+        return b"".join((header, processed_events.current, previous))
+
+    if isinstance(processed_events, TimeWindowProcessedEvents):
+        header = TIME_WINDOW_HEADER.pack(
+            processed_events.window // timedelta(microseconds=1),
+            timestamp_to_micros(processed_events.newest_timestamp),
+            len(processed_events.event_ids),
+        )
+        entries = sorted(processed_events.event_ids.items(), key=lambda entry: entry[1])
+        return header + b"".join(
+            TIME_WINDOW_ENTRY.pack(key.to_bytes(16, "big"), timestamp_to_micros(event_timestamp))
+            for key, event_timestamp in entries
+        )
+
+    return b"".join(key.to_bytes(16, "big") for key in processed_events.event_ids)
+
+
+def _pack_pending_events_header(pending_events, size):
+    if pending_events is None:
+        return PENDING_EVENTS_HEADER.pack(False, 0, 0, NO_TIMESTAMP, 0, 0, 0, 0)
+
+    return PENDING_EVENTS_HEADER.pack(
+        True,
+        pending_events.max_events,
+        pending_events.max_age // timedelta(microseconds=1),
+        timestamp_to_micros(pending_events.newest_timestamp),
+        pending_events.parked_count,
+        pending_events.drained_count,
+        pending_events.expired_count,
+        size,
+    )
+
+
+def _dump_pending_events(pending_events):
+    # imported here since encoding imports core, which imports this module
+    from .encoding import encode_decoded_event
+
+    # parked events are stored with the binary events layout, in parking
+    # order skipping the ones already drained or expired
+    return b"".join(
+        encode_decoded_event(metadata, action_args)
+        for _, (_, _, metadata, action_args) in pending_events.parking_queue
+        if metadata is not None
+    )
+
+
+def read_snapshot(dispatcher, path):
+    with open(path, "rb") as snapshot_file, mmap.mmap(
+        snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        magic, version, proposals_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            raise ValueError(f"Invalid snapshot file {path}!")
+
+        offset = HEADER.size
+        # keeps the storage backend chosen for the dispatcher
+        stored_proposals = dispatcher.stored_proposals
+        stored_proposals.clear()
+        for _ in range(proposals_count):
+            proposal, offset = _read_proposal(dispatcher, buffer, offset)
+            stored_proposals[proposal.proposal_id] = proposal
+
+        kind, size = PROCESSED_EVENTS_HEADER.unpack_from(buffer, offset)
+        offset += PROCESSED_EVENTS_HEADER.size
+        processed_events = _load_processed_events(
+            PROCESSED_EVENTS_KINDS[kind], buffer[offset : offset + size]
+        )
+        offset += size
+
+        pending_events = dispatcher.pending_events
+        if version > 1:
+            pending_events = _load_pending_events(dispatcher, buffer, offset)
+
+    dispatcher.processed_events = processed_events
+    dispatcher.pending_events = pending_events
+
+
+def _read_proposal(dispatcher, buffer, offset):
+    proposal_class = dispatcher.handlers["proposal"].schema_class
+    proponent_class = dispatcher.handlers["proponent"].schema_class
+    warranty_class = dispatcher.handlers["warranty"].schema_class
+
+    (
+        proposal_id,
+        loan_value,
+        installments,
+        last_event_micros,
+        proponents_count,
+        warranties_count,
+    ) = PROPOSAL.unpack_from(buffer, offset)
+    offset += PROPOSAL.size
+
+    proposal_id = uuid.UUID(bytes=proposal_id)
+    proposal = proposal_class(
+        proposal_id=proposal_id,
+        proposal_loan_value=loan_value,
+        proposal_number_of_monthly_installments=installments,
+        last_event_timestamp=micros_to_timestamp(last_event_micros),
+    )
+
+    for _ in range(proponents_count):
+        proponent_id, age, monthly_income, is_main, last_event_micros, name_size = PROPONENT.unpack_from(
+            buffer, offset
+        )
+        offset += PROPONENT.size
+        name = buffer[offset : offset + name_size].decode("utf-8")
+        offset += name_size
+
+        proposal.put_proponent(
+            proponent_class(
+                proposal_id=proposal_id,
+                proponent_id=uuid.UUID(bytes=proponent_id),
+                proponent_name=name,
+                proponent_age=age,
+                proponent_monthly_income=monthly_income,
+                proponent_is_main=bool(is_main),
+                last_event_timestamp=micros_to_timestamp(last_event_micros),
+            )
+        )
+
+    for _ in range(warranties_count):
+        warranty_id, value, last_event_micros, province_size = WARRANTY.unpack_from(buffer, offset)
+        offset += WARRANTY.size
+        province = buffer[offset : offset + province_size].decode("utf-8")
+        offset += province_size
+
+        proposal.put_warranty(
+            warranty_class(
+                proposal_id=proposal_id,
+                warranty_id=uuid.UUID(bytes=warranty_id),
+                warranty_value=value,
+                warranty_province=province,
+                last_event_timestamp=micros_to_timestamp(last_event_micros),
+            )
+        )
+
+    return proposal, offset
+
+
+def _load_pending_events(dispatcher, buffer, offset):
+    # imported here since core, also imported by encoding, imports this module
+    from .core import get_action_proposal_id
+    from .encoding import iter_decoded_events_between
+
+    (
+        has_pending_events,
+        max_events,
+        max_age_micros,
+        newest_micros,
+        parked_count,
+        drained_count,
+        expired_count,
+        size,
+    ) = PENDING_EVENTS_HEADER.unpack_from(buffer, offset)
+    if not has_pending_events:
+        return dispatcher.pending_events
+
+    pending_events = PendingEventsBuffer(
+        max_events=max_events, max_age=timedelta(microseconds=max_age_micros)
+    )
+    pending_events.newest_timestamp = micros_to_timestamp(newest_micros)
+
+    offset += PENDING_EVENTS_HEADER.size
+    # parked again with objects of the dispatcher classes, in parking order
+    for metadata, action_args in iter_decoded_events_between(buffer, dispatcher, offset, offset + size):
+        pending_events.park(get_action_proposal_id(action_args), metadata, action_args)
+
+    pending_events.parked_count = parked_count
+    pending_events.drained_count = drained_count
+    pending_events.expired_count = expired_count
+    return pending_events
+
+
+def _load_processed_events(processed_events_class, data):
+    if processed_events_class is BloomFilterProcessedEvents:
+        capacity, false_positive_rate, bits_count, hashes_count, current_count, has_previous = (
+            BLOOM_FILTER_HEADER.unpack_from(data, 0)
+        )
+        processed_events = BloomFilterProcessedEvents(capacity, false_positive_rate)
+        processed_events.bits_count = bits_count
+        processed_events.hashes_count = hashes_count
+        processed_events.current_count = current_count
+
+        bits_size = (bits_count + 7) // 8
+        offset = BLOOM_FILTER_HEADER.size
+        processed_events.current = bytearray(data[offset : offset + bits_size])
+        if has_previous:
+            processed_events.previous = bytearray(data[offset + bits_size : offset + 2 * bits_size])
+
+        return processed_events
+
+    if processed_events_class is TimeWindowProcessedEvents:
+        window_micros, newest_micros, _ = TIME_WINDOW_HEADER.unpack_from(data, 0)
+        processed_events = TimeWindowProcessedEvents(window=timedelta(microseconds=window_micros))
+        processed_events.newest_timestamp = micros_to_timestamp(newest_micros)
+
+        expiration_queue = deque()
+        for key, event_micros in TIME_WINDOW_ENTRY.iter_unpack(data[TIME_WINDOW_HEADER.size :]):
+            key = int.from_bytes(key, "big")
+            event_timestamp = micros_to_timestamp(event_micros)
+            processed_events.event_ids[key] = event_timestamp
+            expiration_queue.append((event_timestamp, key))
+
+        processed_events.expiration_queue = expiration_queue
+        return processed_events
+
+    processed_events = ProcessedEventsSet()
+    processed_events.event_ids = {
+        int.from_bytes(data[offset : offset + 16], "big") for offset in range(0, len(data), 16)
+    }
+    return processed_events
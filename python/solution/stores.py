@@ -0,0 +1,519 @@
+import sys
+import uuid
+from array import array
+from collections.abc import Mapping, MutableMapping
+
+from .mixins import ProposalMixin
+from .snapshots import micros_to_timestamp, timestamp_to_micros
+from .trusted_schemas import TrustedProponent, TrustedProposal, TrustedWarranty
+from .validations import is_accepted_warranty, is_underage_proponent, to_exact_units
+
+NO_ROW = -1
+LOW_BITS_MASK = (1 << 64) - 1
+
+
+class Table:
+    # parallel typed columns (or lists for strings and big ints) with reusable
+    # free rows
+    def __init__(self, **typecodes):
+        self.columns = {
+            name: array(typecode) if typecode is not None else [] for name, typecode in typecodes.items()
+        }
+        # columns are reachable as attributes too, e.g. table.ages[row]
+        self.__dict__.update(self.columns)
+        self.list_columns = [column for column in self.columns.values() if isinstance(column, list)]
+        self.array_columns = [column for column in self.columns.values() if not isinstance(column, list)]
+        self.free_rows = []
+        self.rows_count = 0
+
+    def allocate(self):
+        if self.free_rows:
+            return self.free_rows.pop()
+
+        for column in self.array_columns:
+            column.append(0)
+        for column in self.list_columns:
+            column.append(None)
+
+        self.rows_count += 1
+        return self.rows_count - 1
+
+    # uuids are kept as two unsigned 64 bits halves instead of python objects
+    def get_id(self, row):
+        return uuid.UUID(int=(self.id_highs[row] << 64) | self.id_lows[row])
+
+    def set_id(self, row, value):
+        value = value.int
+        self.id_highs[row] = value >> 64
+        self.id_lows[row] = value & LOW_BITS_MASK
+
+    def release(self, row):
+        for column in self.list_columns:
+            column[row] = None
+
+        self.free_rows.append(row)
+
+
+class ColumnarProposalStore(MutableMapping):
+    def __init__(self):
+        self.proposals = Table(
+            id_highs="Q",
+            id_lows="Q",
+            loan_values="d",
+            installments="i",
+            timestamps="q",
+            underage_counts="i",
+            accepted_counts="i",
+            # exact sums are ints wider than 64 bits
+            accepted_units=None,
+            proponents_counts="i",
+            proponents_heads="i",
+            proponents_tails="i",
+            warranties_counts="i",
+            warranties_heads="i",
+            warranties_tails="i",
+        )
+        self.proponents = Table(
+            id_highs="Q",
+            id_lows="Q",
+            proposal_rows="i",
+            names=None,
+            ages="i",
+            monthly_incomes="d",
+            is_main="b",
+            timestamps="q",
+            previous_rows="i",
+            next_rows="i",
+        )
+        self.warranties = Table(
+            id_highs="Q",
+            id_lows="Q",
+            proposal_rows="i",
+            values="d",
+            provinces=None,
+            timestamps="q",
+            previous_rows="i",
+            next_rows="i",
+        )
+        # proposal_id int -> row, in insertion order like a dict store
+        self.proposals_index = {}
+        # (proposal row << 128 | related id int) -> row
+        self.proponents_index = {}
+        self.warranties_index = {}
+
+    def __getitem__(self, proposal_id):
+        return ProposalRow(self, self.proposals_index[proposal_id.int])
+
+    def __setitem__(self, proposal_id, proposal):
+        row = self.proposals_index.get(proposal_id.int)
+        if row is None:
+            row = self._insert_proposal(proposal_id)
+            self.proposals_index[proposal_id.int] = row
+            self._put_relateds(row, proposal)
+        elif not self._owns_relateds(row, proposal):
+            self._clear_relateds(row)
+            self._put_relateds(row, proposal)
+
+        proposals = self.proposals
+        proposals.loan_values[row] = proposal.proposal_loan_value
+        proposals.installments[row] = proposal.proposal_number_of_monthly_installments
+        proposals.timestamps[row] = timestamp_to_micros(proposal.last_event_timestamp)
+
+    def __delitem__(self, proposal_id):
+        row = self.proposals_index.pop(proposal_id.int)
+        self._clear_relateds(row)
+        self.proposals.release(row)
+
+    def __iter__(self):
+        for proposal_id in self.proposals_index:
+            yield uuid.UUID(int=proposal_id)
+
+    def __len__(self):
+        return len(self.proposals_index)
+
+    def __contains__(self, proposal_id):
+        return proposal_id.int in self.proposals_index
+
+    def pop(self, proposal_id, *default):
+        try:
+            row = self.proposals_index[proposal_id.int]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+
+        # rows are reused, so the popped proposal is detached from the columns
+        proposal = ProposalRow(self, row).materialize()
+        del self[proposal_id]
+        return proposal
+
+    def clear(self):
+        self.__init__()
+
+    def _insert_proposal(self, proposal_id):
+        proposals = self.proposals
+        row = proposals.allocate()
+        proposals.set_id(row, proposal_id)
+        for column in ("underage_counts", "accepted_counts", "proponents_counts", "warranties_counts"):
+            proposals.columns[column][row] = 0
+        proposals.accepted_units[row] = 0
+        for column in ("proponents_heads", "proponents_tails", "warranties_heads", "warranties_tails"):
+            proposals.columns[column][row] = NO_ROW
+
+        return row
+
+    def _owns_relateds(self, row, proposal):
+        proponents = proposal.proponents
+        return (
+            isinstance(proponents, RelatedsView)
+            and proponents.store is self
+            and proponents.proposal_row == row
+        )
+
+    def _put_relateds(self, row, proposal):
+        for proponent in list(proposal.proponents.values()):
+            self.put_proponent(row, proponent)
+        for warranty in list(proposal.warranties.values()):
+            self.put_warranty(row, warranty)
+
+    def _clear_relateds(self, row):
+        for related_row in list(self._iter_rows(self.proponents, self.proposals.proponents_heads[row])):
+            self._unlink(self.proponents, self.proponents_index, "proponents", row, related_row)
+        for related_row in list(self._iter_rows(self.warranties, self.proposals.warranties_heads[row])):
+            self._unlink(self.warranties, self.warranties_index, "warranties", row, related_row)
+
+        proposals = self.proposals
+        proposals.underage_counts[row] = 0
+        proposals.accepted_counts[row] = 0
+        proposals.accepted_units[row] = 0
+
+    @staticmethod
+    def _get_related_key(proposal_row, related_id):
+        return (proposal_row << 128) | related_id.int
+
+    @staticmethod
+    def _iter_rows(table, row):
+        next_rows = table.next_rows
+        while row != NO_ROW:
+            yield row
+            row = next_rows[row]
+
+    def _link(self, table, index, name, proposal_row, key, related_id):
+        # appends at the tail to keep the insertion order of a dict
+        proposals = self.proposals
+        heads = proposals.columns[f"{name}_heads"]
+        tails = proposals.columns[f"{name}_tails"]
+        counts = proposals.columns[f"{name}_counts"]
+
+        related_row = table.allocate()
+        table.set_id(related_row, related_id)
+        table.proposal_rows[related_row] = proposal_row
+        table.previous_rows[related_row] = tails[proposal_row]
+        table.next_rows[related_row] = NO_ROW
+
+        if tails[proposal_row] == NO_ROW:
+            heads[proposal_row] = related_row
+        else:
+            table.next_rows[tails[proposal_row]] = related_row
+        tails[proposal_row] = related_row
+        counts[proposal_row] += 1
+
+        index[key] = related_row
+        return related_row
+
+    def _unlink(self, table, index, name, proposal_row, related_row):
+        proposals = self.proposals
+        heads = proposals.columns[f"{name}_heads"]
+        tails = proposals.columns[f"{name}_tails"]
+        previous_row = table.previous_rows[related_row]
+        next_row = table.next_rows[related_row]
+
+        if previous_row == NO_ROW:
+            heads[proposal_row] = next_row
+        else:
+            table.next_rows[previous_row] = next_row
+        if next_row == NO_ROW:
+            tails[proposal_row] = previous_row
+        else:
+            table.previous_rows[next_row] = previous_row
+        proposals.columns[f"{name}_counts"][proposal_row] -= 1
+
+        del index[self._get_related_key(proposal_row, table.get_id(related_row))]
+        table.release(related_row)
+
+    def put_proponent(self, proposal_row, proponent):
+        proponents = self.proponents
+        proponent_id = proponent.proponent_id
+        key = self._get_related_key(proposal_row, proponent_id)
+        related_row = self.proponents_index.get(key)
+
+        if related_row is None:
+            related_row = self._link(
+                proponents, self.proponents_index, "proponents", proposal_row, key, proponent_id
+            )
+        elif is_underage_proponent(ProponentRow(self, related_row)):
+            self.proposals.underage_counts[proposal_row] -= 1
+
+        proponents.names[related_row] = proponent.proponent_name
+        proponents.ages[related_row] = proponent.proponent_age
+        proponents.monthly_incomes[related_row] = proponent.proponent_monthly_income
+        proponents.is_main[related_row] = proponent.proponent_is_main
+        proponents.timestamps[related_row] = timestamp_to_micros(proponent.last_event_timestamp)
+
+        if is_underage_proponent(proponent):
+            self.proposals.underage_counts[proposal_row] += 1
+
+    def pop_proponent(self, proposal_row, proponent_id):
+        related_row = self.proponents_index.get(self._get_related_key(proposal_row, proponent_id))
+        if related_row is None:
+            return None
+
+        proponent = ProponentRow(self, related_row).materialize()
+        if is_underage_proponent(proponent):
+            self.proposals.underage_counts[proposal_row] -= 1
+
+        self._unlink(self.proponents, self.proponents_index, "proponents", proposal_row, related_row)
+        return proponent
+
+    def put_warranty(self, proposal_row, warranty):
+        warranties = self.warranties
+        warranty_id = warranty.warranty_id
+        key = self._get_related_key(proposal_row, warranty_id)
+        related_row = self.warranties_index.get(key)
+        is_new = related_row is None
+
+        if is_new:
+            related_row = self._link(
+                warranties, self.warranties_index, "warranties", proposal_row, key, warranty_id
+            )
+        else:
+            self._discount_warranty(proposal_row, related_row)
+
+        warranties.values[related_row] = warranty.warranty_value
+        warranties.provinces[related_row] = sys.intern(warranty.warranty_province)
+        warranties.timestamps[related_row] = timestamp_to_micros(warranty.last_event_timestamp)
+
+        if is_accepted_warranty(warranty):
+            self.proposals.accepted_counts[proposal_row] += 1
+            self.proposals.accepted_units[proposal_row] += to_exact_units(warranty.warranty_value)
+
+    def pop_warranty(self, proposal_row, warranty_id):
+        related_row = self.warranties_index.get(self._get_related_key(proposal_row, warranty_id))
+        if related_row is None:
+            return None
+
+        warranty = WarrantyRow(self, related_row).materialize()
+        self._discount_warranty(proposal_row, related_row)
+        self._unlink(self.warranties, self.warranties_index, "warranties", proposal_row, related_row)
+        return warranty
+
+    def _discount_warranty(self, proposal_row, related_row):
+        if is_accepted_warranty(WarrantyRow(self, related_row)):
+            self.proposals.accepted_counts[proposal_row] -= 1
+            self.proposals.accepted_units[proposal_row] -= to_exact_units(self.warranties.values[related_row])
+
+
+class ProponentRow:
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def proposal_id(self):
+        return self.store.proposals.get_id(self.store.proponents.proposal_rows[self.row])
+
+    @property
+    def proponent_id(self):
+        return self.store.proponents.get_id(self.row)
+
+    @property
+    def proponent_name(self):
+        return self.store.proponents.names[self.row]
+
+    @property
+    def proponent_age(self):
+        return self.store.proponents.ages[self.row]
+
+    @property
+    def proponent_monthly_income(self):
+        return self.store.proponents.monthly_incomes[self.row]
+
+    @property
+    def proponent_is_main(self):
+        return bool(self.store.proponents.is_main[self.row])
+
+    @property
+    def last_event_timestamp(self):
+        return micros_to_timestamp(self.store.proponents.timestamps[self.row])
+
+    def materialize(self):
+        return TrustedProponent(
+            proposal_id=self.proposal_id,
+            proponent_id=self.proponent_id,
+            proponent_name=self.proponent_name,
+            proponent_age=self.proponent_age,
+            proponent_monthly_income=self.proponent_monthly_income,
+            proponent_is_main=self.proponent_is_main,
+            last_event_timestamp=self.last_event_timestamp,
+        )
+
+
+class WarrantyRow:
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def proposal_id(self):
+        return self.store.proposals.get_id(self.store.warranties.proposal_rows[self.row])
+
+    @property
+    def warranty_id(self):
+        return self.store.warranties.get_id(self.row)
+
+    @property
+    def warranty_value(self):
+        return self.store.warranties.values[self.row]
+
+    @property
+    def warranty_province(self):
+        return self.store.warranties.provinces[self.row]
+
+    @property
+    def last_event_timestamp(self):
+        return micros_to_timestamp(self.store.warranties.timestamps[self.row])
+
+    def materialize(self):
+        return TrustedWarranty(
+            proposal_id=self.proposal_id,
+            warranty_id=self.warranty_id,
+            warranty_value=self.warranty_value,
+            warranty_province=self.warranty_province,
+            last_event_timestamp=self.last_event_timestamp,
+        )
+
+
+class RelatedsView(Mapping):
+    def __init__(self, store, proposal_row, table, index, row_class, heads):
+        self.store = store
+        self.proposal_row = proposal_row
+        self.table = table
+        self.index = index
+        self.row_class = row_class
+        self.heads = heads
+
+    def __getitem__(self, related_id):
+        related_row = self.index[ColumnarProposalStore._get_related_key(self.proposal_row, related_id)]
+        return self.row_class(self.store, related_row)
+
+    def __iter__(self):
+        for row in ColumnarProposalStore._iter_rows(self.table, self.heads[self.proposal_row]):
+            yield self.table.get_id(row)
+
+    def __len__(self):
+        counts = self.store.proposals.proponents_counts
+        if self.table is self.store.warranties:
+            counts = self.store.proposals.warranties_counts
+
+        return counts[self.proposal_row]
+
+
+class ProposalRow(ProposalMixin):
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def proposal_id(self):
+        return self.store.proposals.get_id(self.row)
+
+    @property
+    def proposal_loan_value(self):
+        return self.store.proposals.loan_values[self.row]
+
+    @property
+    def proposal_number_of_monthly_installments(self):
+        return self.store.proposals.installments[self.row]
+
+    @property
+    def last_event_timestamp(self):
+        return micros_to_timestamp(self.store.proposals.timestamps[self.row])
+
+    @property
+    def proponents(self):
+        store = self.store
+        return RelatedsView(
+            store,
+            self.row,
+            store.proponents,
+            store.proponents_index,
+            ProponentRow,
+            store.proposals.proponents_heads,
+        )
+
+    @property
+    def warranties(self):
+        store = self.store
+        return RelatedsView(
+            store,
+            self.row,
+            store.warranties,
+            store.warranties_index,
+            WarrantyRow,
+            store.proposals.warranties_heads,
+        )
+
+    @property
+    def main_proponents_ids(self):
+        proponents = self.store.proponents
+        return {
+            proponents.get_id(row)
+            for row in ColumnarProposalStore._iter_rows(
+                proponents, self.store.proposals.proponents_heads[self.row]
+            )
+            if proponents.is_main[row]
+        }
+
+    @property
+    def underage_proponents_count(self):
+        return self.store.proposals.underage_counts[self.row]
+
+    @property
+    def accepted_warranties_count(self):
+        return self.store.proposals.accepted_counts[self.row]
+
+    @property
+    def accepted_warranties_units(self):
+        return self.store.proposals.accepted_units[self.row]
+
+    def put_proponent(self, proponent):
+        self.store.put_proponent(self.row, proponent)
+
+    def pop_proponent(self, proponent_id):
+        return self.store.pop_proponent(self.row, proponent_id)
+
+    def put_warranty(self, warranty):
+        self.store.put_warranty(self.row, warranty)
+
+    def pop_warranty(self, warranty_id):
+        return self.store.pop_warranty(self.row, warranty_id)
+
+    def materialize(self):
+        proposal = TrustedProposal(
+            proposal_id=self.proposal_id,
+            proposal_loan_value=self.proposal_loan_value,
+            proposal_number_of_monthly_installments=self.proposal_number_of_monthly_installments,
+            last_event_timestamp=self.last_event_timestamp,
+        )
+        for proponent in self.proponents.values():
+            proposal.put_proponent(proponent.materialize())
+        for warranty in self.warranties.values():
+            proposal.put_warranty(warranty.materialize())
+
+        return proposal
@@ -0,0 +1,203 @@
+import uuid
+from datetime import datetime, timezone
+
+from .interning import intern_string, parse_uuid
+from .mixins import ProposalMixin
+
+# same truthy strings accepted by pydantic bool parsing
+TRUE_VALUES = frozenset(("1", "on", "t", "true", "y", "yes"))
+
+
+def parse_timestamp(value):
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+
+    return to_utc(datetime.fromisoformat(value))
+
+
+def to_utc(timestamp):
+    # timestamps without timezone are taken as UTC, so events mixing both
+    # can still be compared
+    tzinfo = timestamp.tzinfo
+    if tzinfo is timezone.utc:
+        return timestamp
+    if tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+
+    return timestamp.astimezone(timezone.utc)
+
+
+def parse_bool(value):
+    return value.lower() in TRUE_VALUES
+
+
+class TrustedEventMetadata:
+    __slots__ = ("event_id", "event_schema", "event_action", "event_timestamp")
+
+    def __init__(self, event_id, event_schema, event_action, event_timestamp):
+        # event ids are unique, interning them would only evict the others
+        self.event_id = uuid.UUID(event_id)
+        # few schemas and actions, shared by all the stored metadata as the
+        # constants of binary events are
+        self.event_schema = intern_string(event_schema)
+        self.event_action = intern_string(event_action)
+        self.event_timestamp = parse_timestamp(event_timestamp)
+
+    @classmethod
+    def build_from_values(cls, event_id, event_schema, event_action, event_timestamp):
+        # values already parsed, as the ones read from binary events
+        metadata = cls.__new__(cls)
+        metadata.event_id = event_id
+        metadata.event_schema = event_schema
+        metadata.event_action = event_action
+        metadata.event_timestamp = event_timestamp
+        return metadata
+
+    @classmethod
+    def iter_from_raw_events(cls, raw_events):
+        # yields each event message with its metadata, consecutive events
+        # usually share the timestamp so it is parsed once for them
+        last_timestamp = event_timestamp = None
+        for raw_event in raw_events:
+            event_id, event_schema, event_action, timestamp, *message = raw_event.split(",")
+            if timestamp != last_timestamp:
+                last_timestamp = timestamp
+                event_timestamp = parse_timestamp(timestamp)
+
+            metadata = cls.__new__(cls)
+            metadata.event_id = uuid.UUID(event_id)
+            metadata.event_schema = intern_string(event_schema)
+            metadata.event_action = intern_string(event_action)
+            metadata.event_timestamp = event_timestamp
+            yield message, metadata
+
+
+class TrustedWarranty:
+    __slots__ = ("proposal_id", "warranty_id", "warranty_value", "warranty_province", "last_event_timestamp")
+
+    def __init__(
+        self, proposal_id, warranty_id, warranty_value, warranty_province, last_event_timestamp=None
+    ):
+        self.proposal_id = proposal_id
+        self.warranty_id = warranty_id
+        self.warranty_value = warranty_value
+        self.warranty_province = warranty_province
+        self.last_event_timestamp = last_event_timestamp
+
+    @classmethod
+    def build_from_message(cls, message):
+        return cls(
+            proposal_id=parse_uuid(message[0]),
+            warranty_id=uuid.UUID(message[1]),
+            warranty_value=float(message[2]),
+            warranty_province=intern_string(message[3]),
+        )
+
+    @classmethod
+    def build_from_values(cls, proposal_id, warranty_id, warranty_value, warranty_province):
+        return cls(proposal_id, warranty_id, warranty_value, warranty_province)
+
+
+class TrustedProponent:
+    __slots__ = (
+        "proposal_id",
+        "proponent_id",
+        "proponent_name",
+        "proponent_age",
+        "proponent_monthly_income",
+        "proponent_is_main",
+        "last_event_timestamp",
+    )
+
+    def __init__(
+        self,
+        proposal_id,
+        proponent_id,
+        proponent_name,
+        proponent_age,
+        proponent_monthly_income,
+        proponent_is_main,
+        last_event_timestamp=None,
+    ):
+        self.proposal_id = proposal_id
+        self.proponent_id = proponent_id
+        self.proponent_name = proponent_name
+        self.proponent_age = proponent_age
+        self.proponent_monthly_income = proponent_monthly_income
+        self.proponent_is_main = proponent_is_main
+        self.last_event_timestamp = last_event_timestamp
+
+    @classmethod
+    def build_from_message(cls, message):
+        return cls(
+            proposal_id=parse_uuid(message[0]),
+            proponent_id=uuid.UUID(message[1]),
+            proponent_name=message[2],
+            proponent_age=int(message[3]),
+            proponent_monthly_income=float(message[4]),
+            proponent_is_main=parse_bool(message[5]),
+        )
+
+    @classmethod
+    def build_from_values(
+        cls,
+        proposal_id,
+        proponent_id,
+        proponent_name,
+        proponent_age,
+        proponent_monthly_income,
+        proponent_is_main,
+    ):
+        return cls(
+            proposal_id,
+            proponent_id,
+            proponent_name,
+            proponent_age,
+            proponent_monthly_income,
+            proponent_is_main,
+        )
+
+
+class TrustedProposal(ProposalMixin):
+    __slots__ = (
+        "proposal_id",
+        "proposal_loan_value",
+        "proposal_number_of_monthly_installments",
+        "last_event_timestamp",
+        "warranties",
+        "proponents",
+        "main_proponents_ids",
+        "underage_proponents_count",
+        "accepted_warranties_count",
+        "accepted_warranties_units",
+    )
+
+    def __init__(
+        self,
+        proposal_id,
+        proposal_loan_value,
+        proposal_number_of_monthly_installments,
+        last_event_timestamp=None,
+    ):
+        self.proposal_id = proposal_id
+        self.proposal_loan_value = proposal_loan_value
+        self.proposal_number_of_monthly_installments = proposal_number_of_monthly_installments
+        self.last_event_timestamp = last_event_timestamp
+        self.warranties = {}
+        self.proponents = {}
+        self.main_proponents_ids = set()
+        self.underage_proponents_count = 0
+        self.accepted_warranties_count = 0
+        self.accepted_warranties_units = 0
+
+    @classmethod
+    def build_from_message(cls, message):
+        return cls(
+            proposal_id=parse_uuid(message[0]),
+            proposal_loan_value=float(message[1]),
+            proposal_number_of_monthly_installments=int(message[2]),
+        )
+
+    @classmethod
+    def build_from_values(cls, proposal_id, proposal_loan_value, proposal_number_of_monthly_installments):
+        return cls(proposal_id, proposal_loan_value, proposal_number_of_monthly_installments)
@@ -1,21 +1,39 @@
-MAX_LOAN_VALUE = 3000000.0
-MIN_LOAN_VALUE = 30000.0
+import math
 
-MAX_LOAN_INSTALLMENTS = 180
-MIN_LOAN_INSTALLMENTS = 24
+from prettyconf import config
 
-LIMIT_MAIN_PROPONENTS = 1
-MIN_PROPONENTS_QUANTITY = 2
-MIN_PROPONENTS_AGE = 18
-MIN_MAIN_PROPONENT_INCOME = {
-    # AGE / LOAN PORTION MULTIPLIER
-    51: 2,
-    24: 3,
-    18: 4,
-}
 
-MIN_WARRANTIES_QUANTITY = 1
-NOT_ACCEPTED_WARRANTIES_PROVINCES = ("PR", "SC", "RS")
+def parse_income_multipliers(value):
+    # "AGE:MULTIPLIER,..." checked from the oldest age limit
+    multipliers = {}
+    for item in config.list(value):
+        age_limit, multiplier = item.split(":")
+        multipliers[int(age_limit)] = int(multiplier)
+
+    return dict(sorted(multipliers.items(), reverse=True))
+
+
+# thresholds can be changed by environment variables or a .env file
+MAX_LOAN_VALUE = config("MAX_LOAN_VALUE", default="3000000.0", cast=float)
+MIN_LOAN_VALUE = config("MIN_LOAN_VALUE", default="30000.0", cast=float)
+
+MAX_LOAN_INSTALLMENTS = config("MAX_LOAN_INSTALLMENTS", default="180", cast=int)
+MIN_LOAN_INSTALLMENTS = config("MIN_LOAN_INSTALLMENTS", default="24", cast=int)
+
+LIMIT_MAIN_PROPONENTS = config("LIMIT_MAIN_PROPONENTS", default="1", cast=int)
+MIN_PROPONENTS_QUANTITY = config("MIN_PROPONENTS_QUANTITY", default="2", cast=int)
+MIN_PROPONENTS_AGE = config("MIN_PROPONENTS_AGE", default="18", cast=int)
+MIN_MAIN_PROPONENT_INCOME = config(
+    # AGE:LOAN PORTION MULTIPLIER
+    "MIN_MAIN_PROPONENT_INCOME",
+    default="51:2,24:3,18:4",
+    cast=parse_income_multipliers,
+)
+
+MIN_WARRANTIES_QUANTITY = config("MIN_WARRANTIES_QUANTITY", default="1", cast=int)
+NOT_ACCEPTED_WARRANTIES_PROVINCES = config(
+    "NOT_ACCEPTED_WARRANTIES_PROVINCES", default="PR,SC,RS", cast=config.tuple
+)
 
 
 def has_valid_loan_value(proposal):
@@ -31,43 +49,83 @@ def has_valid_proponents_number(proposal):
 
 
 def has_valid_main_proponents_number(proposal):
-    main_proponents = [
-        proponent for _, proponent in proposal.proponents.items() if proponent.proponent_is_main
-    ]
-    return len(main_proponents) == LIMIT_MAIN_PROPONENTS
+    return len(proposal.main_proponents_ids) == LIMIT_MAIN_PROPONENTS
 
 
 def has_proponents_with_valid_age(proposal):
-    return all(
-        [proponent.proponent_age >= MIN_PROPONENTS_AGE for _, proponent in proposal.proponents.items()]
-    )
+    return proposal.underage_proponents_count == 0
 
 
 def has_valid_warranties_number_and_valid_warranted_value(proposal):
-    accepted_warranties = [
-        warranty
-        for _, warranty in proposal.warranties.items()
-        if warranty.warranty_province not in NOT_ACCEPTED_WARRANTIES_PROVINCES
-    ]
-    if not len(accepted_warranties) >= MIN_WARRANTIES_QUANTITY:
+    if not proposal.accepted_warranties_count >= MIN_WARRANTIES_QUANTITY:
         return False
 
-    warranted_value = sum([warranty.warranty_value for warranty in accepted_warranties])
+    return covers_warranted_value(proposal.accepted_warranties_units, proposal.proposal_loan_value)
 
-    return warranted_value >= (proposal.proposal_loan_value * 2)
+
+def covers_warranted_value(accepted_warranties_units, loan_value):
+    warranted_value = loan_value * 2
+    # an infinite or nan loan has no exact units, only -inf is covered
+    if not math.isfinite(warranted_value):
+        return warranted_value < 0
+
+    return accepted_warranties_units >= to_exact_units(warranted_value)
 
 
 def has_main_proponent_with_valid_monthly_income(proposal):
-    main_proponent = [
-        proponent for _, proponent in proposal.proponents.items() if proponent.proponent_is_main
-    ]
-    main_proponent = main_proponent[0]
+    # safe on its own, so rules can be checked in any order
+    if len(proposal.main_proponents_ids) != LIMIT_MAIN_PROPONENTS:
+        return False
+    if proposal.proposal_number_of_monthly_installments <= 0:
+        return False
+
+    main_proponent_id = next(iter(proposal.main_proponents_ids))
+    main_proponent = proposal.proponents[main_proponent_id]
 
     for age_limit, multiplier in MIN_MAIN_PROPONENT_INCOME.items():
         if main_proponent.proponent_age >= age_limit:
             loan_portion_multiplier = multiplier
             break
+    else:
+        return False
 
     loan_monthly_portion = proposal.proposal_loan_value / proposal.proposal_number_of_monthly_installments
 
     return main_proponent.proponent_monthly_income >= (loan_monthly_portion * loan_portion_multiplier)
+
+
+def is_underage_proponent(proponent):
+    return proponent.proponent_age < MIN_PROPONENTS_AGE
+
+
+def is_accepted_warranty(warranty):
+    return warranty.warranty_province not in NOT_ACCEPTED_WARRANTIES_PROVINCES
+
+
+# floats are integer multiples of 2**-1074, the smallest subnormal, so the
+# accepted warranties are summed as integers of that unit: the sum is exact,
+# without rounding sub-cent values, and updates and removals subtract it
+# without drift or summing all warranties again
+EXACT_UNIT_BITS = 1074
+
+
+def to_exact_units(value):
+    numerator, denominator = value.as_integer_ratio()
+    # denominators are powers of two up to 2**1074
+    return numerator << (EXACT_UNIT_BITS + 1 - denominator.bit_length())
+
+
+def from_exact_units(units):
+    # int true division is correctly rounded, whatever the size of the ints
+    return units / (1 << EXACT_UNIT_BITS)
+
+
+VALIDATIONS = (
+    has_valid_loan_value,
+    has_valid_loan_installments_number,
+    has_valid_proponents_number,
+    has_valid_main_proponents_number,
+    has_proponents_with_valid_age,
+    has_valid_warranties_number_and_valid_warranted_value,
+    has_main_proponent_with_valid_monthly_income,
+)
@@ -0,0 +1,134 @@
+import os
+import re
+
+SEGMENT_FILENAME = "segment-{:08}.log"
+CHECKPOINT_FILENAME = "checkpoint-{:08}.snapshot"
+SEGMENT_PATTERN = re.compile(r"^segment-(\d{8})\.log$")
+CHECKPOINT_PATTERN = re.compile(r"^checkpoint-(\d{8})\.snapshot$")
+
+
+class WriteAheadLog:
+    def __init__(
+        self,
+        directory,
+        segment_size=64 * 1024 * 1024,
+        sync_every=1000,
+        checkpoint_every=100000,
+        buffer_size=1024 * 1024,
+    ):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync_every = sync_every
+        self.checkpoint_every = checkpoint_every
+        self.buffer_size = buffer_size
+        self.pending_sync = 0
+        self.events_since_checkpoint = 0
+
+        os.makedirs(directory, exist_ok=True)
+        segments = self._list_files(SEGMENT_PATTERN)
+        self.segment_index = segments[-1] if segments else 1
+        self.segment_file = self._open_segment(self.segment_index)
+
+    def _list_files(self, pattern):
+        indexes = []
+        for filename in os.listdir(self.directory):
+            match = pattern.match(filename)
+            if match:
+                indexes.append(int(match.group(1)))
+
+        return sorted(indexes)
+
+    def _get_path(self, filename_format, index):
+        return os.path.join(self.directory, filename_format.format(index))
+
+    def _open_segment(self, index):
+        path = self._get_path(SEGMENT_FILENAME, index)
+        segment_file = open(path, "ab", buffering=self.buffer_size)
+
+        # drop a partially written last event left by a crash
+        size = segment_file.tell()
+        if size:
+            segment_file.truncate(self._get_last_line_end(path, size))
+
+        return segment_file
+
+    @staticmethod
+    def _get_last_line_end(path, size, chunk_size=4096):
+        with open(path, "rb") as segment_file:
+            end = size
+            while end > 0:
+                start = max(0, end - chunk_size)
+                segment_file.seek(start)
+                position = segment_file.read(end - start).rfind(b"\n")
+                if position != -1:
+                    return start + position + 1
+                end = start
+
+        return 0
+
+    def append(self, raw_event):
+        self.segment_file.write(raw_event.encode("utf-8") + b"\n")
+        self.pending_sync += 1
+        self.events_since_checkpoint += 1
+
+        if self.pending_sync >= self.sync_every:
+            self.sync()
+        if self.segment_file.tell() >= self.segment_size:
+            self._roll_segment()
+
+    def sync(self):
+        self.segment_file.flush()
+        os.fsync(self.segment_file.fileno())
+        self.pending_sync = 0
+
+    def _roll_segment(self):
+        self.sync()
+        self.segment_file.close()
+        self.segment_index += 1
+        self.segment_file = self._open_segment(self.segment_index)
+
+    def needs_checkpoint(self):
+        return self.events_since_checkpoint >= self.checkpoint_every
+
+    def checkpoint(self, dispatcher):
+        # the checkpoint holds the state right before the new segment
+        self._roll_segment()
+        dispatcher.snapshot(self._get_path(CHECKPOINT_FILENAME, self.segment_index))
+        self.events_since_checkpoint = 0
+
+        for index in self._list_files(CHECKPOINT_PATTERN):
+            if index < self.segment_index:
+                os.remove(self._get_path(CHECKPOINT_FILENAME, index))
+        for index in self._list_files(SEGMENT_PATTERN):
+            if index < self.segment_index:
+                os.remove(self._get_path(SEGMENT_FILENAME, index))
+
+    def recover(self, dispatcher):
+        checkpoints = self._list_files(CHECKPOINT_PATTERN)
+        first_segment_index = 1
+        if checkpoints:
+            first_segment_index = checkpoints[-1]
+            dispatcher.restore(self._get_path(CHECKPOINT_FILENAME, first_segment_index))
+
+        self.segment_file.flush()
+        replayed_events = 0
+        # avoid logging the replayed events again
+        wal, dispatcher.wal = dispatcher.wal, None
+        try:
+            for index in self._list_files(SEGMENT_PATTERN):
+                if index < first_segment_index:
+                    continue
+
+                with open(self._get_path(SEGMENT_FILENAME, index), "r", encoding="utf-8") as segment_file:
+                    for raw_event in segment_file:
+                        dispatcher.dispatch(raw_event.rstrip("\n"))
+                        replayed_events += 1
+        finally:
+            dispatcher.wal = wal
+
+        self.events_since_checkpoint = replayed_events
+        return replayed_events
+
+    def close(self):
+        self.sync()
+        self.segment_file.close()
@@ -1,8 +1,20 @@
 import pytest
 
+from solution.core import iter_raw_events
 from solution.schemas import EventMetadata, Proponent, Proposal, Warranty
 
 
+@pytest.fixture
+def raw_events():
+    # events of all test input files
+    raw_events = []
+    for index in range(0, 13):
+        with open(f"../test/input/input{index:03}.txt", "r") as input_file:
+            raw_events.extend(iter_raw_events(input_file))
+
+    return raw_events
+
+
 @pytest.fixture
 def warranty_data():
     return {
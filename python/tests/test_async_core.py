@@ -0,0 +1,102 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from solution.async_core import AsyncDispatcher
+from solution.core import Dispatcher, read_events
+
+
+class FakeMessageQueue:
+    def __init__(self, messages, error=None):
+        self.messages = list(messages)
+        self.error = error
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # gives control back to the loop like a real broker client
+        await asyncio.sleep(0)
+        if self.messages:
+            return self.messages.pop(0)
+        if self.error is not None:
+            raise self.error
+
+        raise StopAsyncIteration
+
+
+@pytest.fixture
+def raw_events():
+    with open("../test/input/input000.txt", "r") as input_file:
+        return input_file.read().split("\n")
+
+
+@pytest.fixture
+def async_dispatcher():
+    async_dispatcher = AsyncDispatcher(batch_size=4)
+    yield async_dispatcher
+    async_dispatcher.close()
+
+
+def test_consume_processes_all_events(async_dispatcher, raw_events):
+    async def consume():
+        await async_dispatcher.consume(FakeMessageQueue(raw_events))
+        return await async_dispatcher.get_valid_proposals()
+
+    valid_proposals = asyncio.run(consume())
+
+    assert ",".join(valid_proposals) == read_events("\n".join(raw_events))
+    assert async_dispatcher.committed_events == len(raw_events)
+
+
+def test_consume_commits_in_batches(async_dispatcher, raw_events):
+    async def produce_all():
+        for raw_event in raw_events:
+            yield raw_event
+
+    asyncio.run(async_dispatcher.consume(produce_all()))
+
+    # without awaits between messages the queue fills and batches are full
+    assert async_dispatcher.committed_batches == -(-len(raw_events) // async_dispatcher.batch_size)
+
+
+def test_consume_applies_backpressure(raw_events):
+    async_dispatcher = AsyncDispatcher(queue_size=2, batch_size=1)
+    queue_sizes = []
+    original_put = asyncio.Queue.put
+
+    async def put(queue, item):
+        await original_put(queue, item)
+        queue_sizes.append(queue.qsize())
+
+    with mock.patch.object(asyncio.Queue, "put", put):
+        asyncio.run(async_dispatcher.consume(FakeMessageQueue(raw_events)))
+
+    async_dispatcher.close()
+    assert max(queue_sizes) <= 2
+
+
+def test_consume_with_given_dispatcher(raw_events):
+    dispatcher = Dispatcher(trusted=True)
+    async_dispatcher = AsyncDispatcher(dispatcher=dispatcher)
+
+    asyncio.run(async_dispatcher.consume(FakeMessageQueue(raw_events)))
+    async_dispatcher.close()
+
+    assert async_dispatcher.dispatcher is dispatcher
+    assert ",".join(dispatcher.get_valid_proposals()) == read_events("\n".join(raw_events))
+
+
+def test_consume_raises_source_errors(async_dispatcher, raw_events):
+    with pytest.raises(ConnectionError):
+        asyncio.run(async_dispatcher.consume(FakeMessageQueue(raw_events[:5], error=ConnectionError())))
+
+    assert async_dispatcher.committed_events == 5
+
+
+def test_consume_raises_dispatch_errors(async_dispatcher, raw_events):
+    invalid_event = raw_events[0].replace("proposal", "unknown")
+
+    with pytest.raises(ValueError):
+        asyncio.run(async_dispatcher.consume(FakeMessageQueue([invalid_event] + raw_events)))
@@ -0,0 +1,156 @@
+import uuid
+
+import pytest
+
+from solution.core import Dispatcher, read_events
+from solution.schemas import Proponent, Warranty
+from solution.stores import ColumnarProposalStore
+
+pytest.importorskip("numpy")
+
+from solution import batch_validations, validations  # noqa: E402
+from solution.batch_validations import get_valid_proposals  # noqa: E402
+
+
+@pytest.fixture(params=("dict", "columnar"))
+def stored_proposals(request):
+    return {} if request.param == "dict" else ColumnarProposalStore()
+
+
+@pytest.fixture
+def valid_proposal(proposal, proponent, proponent_data, warranty):
+    proposal.put_proponent(proponent)
+    other_proponent_data = dict(proponent_data, proponent_id=str(uuid.uuid4()), proponent_is_main="false")
+    proposal.put_proponent(Proponent(**other_proponent_data))
+    proposal.put_warranty(warranty)
+    assert proposal.is_valid()
+    return proposal
+
+
+def assert_same_as_scalar(stored_proposals):
+    expected = [str(proposal_id) for proposal_id, proposal in stored_proposals.items() if proposal.is_valid()]
+    assert get_valid_proposals(stored_proposals) == expected
+
+
+@pytest.mark.parametrize("trusted", (False, True))
+def test_batch_validation_matches_scalar_validation(trusted, stored_proposals, raw_events):
+    dispatcher = Dispatcher(trusted=trusted, stored_proposals=stored_proposals)
+    for index, raw_event in enumerate(raw_events):
+        dispatcher.dispatch(raw_event)
+        # checks intermediate states too, with proposals still incomplete
+        if index % 25 == 0:
+            assert dispatcher.get_valid_proposals(vectorized=True) == dispatcher.get_valid_proposals()
+
+    assert dispatcher.get_valid_proposals(vectorized=True) == dispatcher.get_valid_proposals()
+
+
+def test_batch_validation_with_empty_store(stored_proposals):
+    assert get_valid_proposals(stored_proposals) == []
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    (
+        ("proposal_loan_value", 29999.99),
+        ("proposal_loan_value", 3000000.01),
+        ("proposal_number_of_monthly_installments", 0),
+        ("proposal_number_of_monthly_installments", 23),
+        ("proposal_number_of_monthly_installments", 181),
+    ),
+)
+def test_batch_validation_with_invalid_loan(field, value, stored_proposals, valid_proposal):
+    stored_proposals[valid_proposal.proposal_id] = valid_proposal
+    assert_same_as_scalar(stored_proposals)
+
+    setattr(valid_proposal, field, value)
+    stored_proposals[valid_proposal.proposal_id] = valid_proposal
+    assert_same_as_scalar(stored_proposals)
+    assert get_valid_proposals(stored_proposals) == []
+
+
+@pytest.mark.parametrize("main_proponents", (0, 2))
+def test_batch_validation_without_one_main_proponent(
+    main_proponents, stored_proposals, valid_proposal, proponent_data
+):
+    for index, proponent_id in enumerate(list(valid_proposal.proponents)):
+        proponent_data["proponent_id"] = str(proponent_id)
+        proponent_data["proponent_is_main"] = str(index < main_proponents).lower()
+        valid_proposal.put_proponent(Proponent(**proponent_data))
+
+    stored_proposals[valid_proposal.proposal_id] = valid_proposal
+    assert_same_as_scalar(stored_proposals)
+    assert get_valid_proposals(stored_proposals) == []
+
+
+@pytest.mark.parametrize("age", (17, 18, 23, 24, 50, 51, 80))
+def test_batch_validation_income_by_age_band(age, stored_proposals, valid_proposal, proponent_data):
+    loan_monthly_portion = (
+        valid_proposal.proposal_loan_value / valid_proposal.proposal_number_of_monthly_installments
+    )
+
+    for multiplier in (2, 3, 4):
+        # exactly on the limit of each band multiplier
+        proponent_data["proponent_age"] = age
+        proponent_data["proponent_monthly_income"] = loan_monthly_portion * multiplier
+        valid_proposal.put_proponent(Proponent(**proponent_data))
+
+        stored_proposals[valid_proposal.proposal_id] = valid_proposal
+        assert_same_as_scalar(stored_proposals)
+
+
+def test_batch_validation_rejects_main_proponent_younger_than_every_band(
+    monkeypatch, stored_proposals, valid_proposal, proponent_data
+):
+    # adults from 16, but the income bands start at 18
+    monkeypatch.setattr(validations, "MIN_PROPONENTS_AGE", 16)
+    proponent_data["proponent_age"] = 17
+    valid_proposal.put_proponent(Proponent(**proponent_data))
+
+    stored_proposals[valid_proposal.proposal_id] = valid_proposal
+    assert_same_as_scalar(stored_proposals)
+    assert get_valid_proposals(stored_proposals) == []
+
+
+def test_batch_validation_rejects_proposal_without_installments(
+    monkeypatch, stored_proposals, valid_proposal
+):
+    monkeypatch.setattr(validations, "MIN_LOAN_INSTALLMENTS", -12)
+    monkeypatch.setattr(batch_validations, "MIN_LOAN_INSTALLMENTS", -12)
+    valid_proposal.proposal_number_of_monthly_installments = -1
+
+    stored_proposals[valid_proposal.proposal_id] = valid_proposal
+    assert_same_as_scalar(stored_proposals)
+    assert get_valid_proposals(stored_proposals) == []
+
+
+def test_batch_validation_with_not_accepted_warranties(stored_proposals, valid_proposal, warranty_data):
+    warranty_data["warranty_province"] = "PR"
+    valid_proposal.put_warranty(Warranty(**warranty_data))
+
+    stored_proposals[valid_proposal.proposal_id] = valid_proposal
+    assert_same_as_scalar(stored_proposals)
+    assert get_valid_proposals(stored_proposals) == []
+
+
+def test_batch_validation_with_sub_cent_warranty_values(stored_proposals, valid_proposal, warranty_data):
+    # 199999.999 in total, rounding each value to cents would give 200000.0
+    valid_proposal.proposal_loan_value = 100000.0
+    valid_proposal.pop_warranty(next(iter(valid_proposal.warranties)))
+    for value in (99999.996, 100000.003):
+        valid_proposal.put_warranty(
+            Warranty(**dict(warranty_data, warranty_id=str(uuid.uuid4()), warranty_value=value))
+        )
+
+    stored_proposals[valid_proposal.proposal_id] = valid_proposal
+    assert_same_as_scalar(stored_proposals)
+    assert get_valid_proposals(stored_proposals) == []
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_read_events_vectorized(workers):
+    with open("../test/input/input012.txt", "r") as input_file:
+        raw_events_string = input_file.read()
+    with open("../test/output/output012.txt", "r") as output_file:
+        expected = output_file.read().strip()
+
+    assert read_events(raw_events_string, workers=workers, vectorized=True) == expected
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from benchmarks.generator import EventStreamGenerator
+from benchmarks.run import get_percentile, main, summarize_latencies
+from benchmarks.startup import main as startup_main
+from benchmarks.startup import parse_import_times
+from solution.core import read_events
+
+
+class TestEventStreamGenerator:
+    def test_generate_is_deterministic_with_seed(self):
+        assert EventStreamGenerator(proposals=10, seed=1).generate() == (
+            EventStreamGenerator(proposals=10, seed=1).generate()
+        )
+
+    def test_generate_events_count(self):
+        generator = EventStreamGenerator(
+            proposals=10,
+            proponents_per_proposal=3,
+            warranties_per_proposal=2,
+            updates_per_proposal=0,
+            duplicate_rate=0,
+            late_event_rate=0,
+            delete_rate=0,
+        )
+
+        raw_events = generator.generate()
+        assert len(raw_events) == 10 * (1 + 3 + 2)
+        assert len({raw_event.split(",")[0] for raw_event in raw_events}) == len(raw_events)
+
+    def test_generate_duplicated_late_and_deleted_events(self):
+        generator = EventStreamGenerator(
+            proposals=50,
+            updates_per_proposal=2,
+            duplicate_rate=0.5,
+            late_event_rate=0.5,
+            delete_rate=1,
+            seed=1,
+        )
+
+        raw_events = generator.generate()
+        event_ids = [raw_event.split(",")[0] for raw_event in raw_events]
+        actions = {raw_event.split(",")[2] for raw_event in raw_events}
+        assert len(set(event_ids)) < len(event_ids)
+        assert {"created", "added", "updated"} < actions
+        assert actions & {"deleted", "removed"}
+
+    def test_generated_stream_is_processable(self):
+        raw_events = EventStreamGenerator(proposals=200, seed=1).generate()
+
+        assert read_events("\n".join(raw_events)) == read_events("\n".join(raw_events), trusted=True)
+
+
+@pytest.mark.parametrize(
+    "percentile, expected_result",
+    ((0, 1), (50, 3), (99, 5), (100, 5)),
+)
+def test_get_percentile(percentile, expected_result):
+    assert get_percentile([1, 2, 3, 4, 5], percentile) == expected_result
+
+
+def test_summarize_latencies():
+    result = summarize_latencies([2000, 1000, 3000])
+
+    assert result["count"] == 3
+    assert result["p50_us"] == 2
+    assert result["events_per_second"] == 3 / 0.000006
+
+
+def test_main_writes_json_results(tmp_path):
+    output_path = tmp_path / "results.json"
+
+    result = main(["--proposals", "20", "--output", str(output_path)])
+
+    with open(output_path, "r") as output_file:
+        assert json.load(output_file) == result
+    assert result["events"] > 0
+    assert set(result["dispatch"]["by_schema"]) >= {"proposal.created", "proponent.added", "warranty.added"}
+    assert result["is_valid"]["count"] > 0
+    assert result["peak_rss_kb"] > 0
+
+
+def test_parse_import_times():
+    output = "\n".join(
+        (
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   solution.interning",
+            "import time:       300 |        420 | solution.core",
+            "other stderr line",
+        )
+    )
+
+    assert parse_import_times(output) == {"solution.interning": 120, "solution.core": 420}
+
+
+def test_startup_main_writes_json_results(tmp_path):
+    output_path = tmp_path / "startup.json"
+
+    result = startup_main(["--runs", "1", "--output", str(output_path)])
+
+    with open(output_path, "r") as output_file:
+        assert json.load(output_file) == result
+    assert set(result["timings"]) == {
+        "interpreter",
+        "import_core",
+        "import_schemas",
+        "cli_strict",
+        "cli_trusted",
+    }
+    assert all(timing["best_ms"] > 0 for timing in result["timings"].values())
+    modules = {item["module"] for item in result["slowest_imports"]["cli_strict"]}
+    assert "pydantic" in modules
+    assert "pydantic" not in {item["module"] for item in result["slowest_imports"]["cli_trusted"]}
@@ -1,9 +1,42 @@
+import subprocess
+import sys
+import uuid
 from unittest import mock
 
 import pytest
 
-from solution.core import Dispatcher, read_events
+from benchmarks.generator import EventStreamGenerator
+from solution.core import Dispatcher, iter_chunks, iter_raw_events, read_events, read_events_iter
+from solution.deduplication import BloomFilterProcessedEvents, TimeWindowProcessedEvents
+from solution.feeds import BufferSink, ValidityFeed
+from solution.handlers import (
+    LazyProponentHandler,
+    LazyProposalHandler,
+    LazyWarrantyHandler,
+    ProposalHandler,
+    TrustedProponentHandler,
+    TrustedProposalHandler,
+    TrustedWarrantyHandler,
+)
+from solution.pending import PendingEventsBuffer
 from solution.schemas import EventMetadata
+from solution.trusted_schemas import TrustedEventMetadata
+
+TEST_FILES = (
+    ("../test/input/input000.txt", "../test/output/output000.txt"),
+    ("../test/input/input001.txt", "../test/output/output001.txt"),
+    ("../test/input/input002.txt", "../test/output/output002.txt"),
+    ("../test/input/input003.txt", "../test/output/output003.txt"),
+    ("../test/input/input004.txt", "../test/output/output004.txt"),
+    ("../test/input/input005.txt", "../test/output/output005.txt"),
+    ("../test/input/input006.txt", "../test/output/output006.txt"),
+    ("../test/input/input007.txt", "../test/output/output007.txt"),
+    ("../test/input/input008.txt", "../test/output/output008.txt"),
+    # ("../test/input/input009.txt", "../test/output/output009.txt"),
+    ("../test/input/input010.txt", "../test/output/output010.txt"),
+    ("../test/input/input011.txt", "../test/output/output011.txt"),
+    ("../test/input/input012.txt", "../test/output/output012.txt"),
+)
 
 
 @pytest.fixture
@@ -27,57 +60,137 @@ def event_data(raw_event):
     }
 
 
-@pytest.mark.parametrize(
-    "input_filepath, output_filepath",
-    (
-        ("../test/input/input000.txt", "../test/output/output000.txt"),
-        ("../test/input/input001.txt", "../test/output/output001.txt"),
-        ("../test/input/input002.txt", "../test/output/output002.txt"),
-        ("../test/input/input003.txt", "../test/output/output003.txt"),
-        ("../test/input/input004.txt", "../test/output/output004.txt"),
-        ("../test/input/input005.txt", "../test/output/output005.txt"),
-        ("../test/input/input006.txt", "../test/output/output006.txt"),
-        ("../test/input/input007.txt", "../test/output/output007.txt"),
-        ("../test/input/input008.txt", "../test/output/output008.txt"),
-        # ("../test/input/input009.txt", "../test/output/output009.txt"),
-        ("../test/input/input010.txt", "../test/output/output010.txt"),
-        ("../test/input/input011.txt", "../test/output/output011.txt"),
-        ("../test/input/input012.txt", "../test/output/output012.txt"),
-    ),
-)
+@pytest.mark.parametrize("input_filepath, output_filepath", TEST_FILES)
 def test_read_events_with_test_files(input_filepath, output_filepath):
     with open(input_filepath, "r") as input_file, open(output_filepath, "r") as output_file:
         assert read_events(input_file.read()) == output_file.read()
 
 
-def test_dispatcher_calls_right_handler(dispatcher, raw_event, event_data):
-    handle_mock = mock.Mock()
-    handler_class_mock = mock.Mock()
-    handler_class_mock.return_value.handle = handle_mock
+@pytest.mark.parametrize("input_filepath, output_filepath", TEST_FILES)
+def test_read_events_trusted_with_test_files(input_filepath, output_filepath):
+    with open(input_filepath, "r") as input_file, open(output_filepath, "r") as output_file:
+        assert read_events(input_file.read(), trusted=True) == output_file.read()
+
+
+@pytest.mark.parametrize("input_filepath, output_filepath", TEST_FILES)
+def test_read_events_lazy_with_test_files(input_filepath, output_filepath):
+    with open(input_filepath, "r") as input_file, open(output_filepath, "r") as output_file:
+        assert read_events(input_file.read(), lazy=True) == output_file.read()
+
+
+@pytest.mark.parametrize("input_filepath, output_filepath", TEST_FILES)
+def test_read_events_with_workers_with_test_files(input_filepath, output_filepath):
+    with open(input_filepath, "r") as input_file, open(output_filepath, "r") as output_file:
+        assert read_events(input_file.read(), workers=2) == output_file.read()
+
+
+def test_read_events_with_workers_keeps_single_process_order():
+    raw_events = []
+    for input_filepath, _ in TEST_FILES:
+        with open(input_filepath, "r") as input_file:
+            raw_events.extend(input_file.read().split("\n"))
 
-    dispatcher.handlers = {"test": handler_class_mock}
+    # deleting and creating again moves the proposal to the end
+    proposal_id = "52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6"
+    proposal_events = [raw_event for raw_event in raw_events if proposal_id in raw_event]
+    raw_events.append(f"{uuid.uuid4()},proposal,deleted,2019-11-11T14:28:01Z,{proposal_id}")
+    for raw_event in proposal_events:
+        _, event_data = raw_event.split(",", 1)
+        raw_events.append(f"{uuid.uuid4()},{event_data}")
+    raw_events_string = "\n".join(raw_events)
+
+    expected_result = read_events(raw_events_string)
+    assert expected_result.endswith(proposal_id)
+    for workers in (2, 3, 5):
+        assert read_events(raw_events_string, workers=workers) == expected_result
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 1024))
+def test_read_events_with_workers_keeps_single_process_order_across_chunks(chunk_size):
+    raw_events = EventStreamGenerator(proposals=200, duplicate_rate=0.2, seed=1).generate()
+    first_proposal_id, proposal_id, *_ = read_events("\n".join(raw_events)).split(",")
+    # created again while stored, which keeps it in place
+    raw_events += [
+        f"{uuid.uuid4()},{raw_event.split(',', 1)[1]}"
+        for raw_event in raw_events
+        if f",proposal,created,{first_proposal_id}" in raw_event
+    ]
+    # deleted and created again, which moves it to the end
+    proposal_events_data = [
+        raw_event.split(",", 1)[1] for raw_event in raw_events if proposal_id in raw_event
+    ]
+    raw_events.append(f"{uuid.uuid4()},proposal,deleted,2030-01-01T00:00:00Z,{proposal_id}")
+    raw_events.extend(f"{uuid.uuid4()},{event_data}" for event_data in proposal_events_data)
+    raw_events_string = "\n".join(raw_events)
+
+    expected_result = read_events(raw_events_string)
+    assert expected_result.endswith(proposal_id)
+    # workers are forked, so they see the patched chunk size
+    with mock.patch("solution.core.DISPATCH_CHUNK_SIZE", chunk_size):
+        assert read_events(raw_events_string, workers=3) == expected_result
+
+
+def test_read_events_iter_with_workers_raises_with_given_dispatcher(dispatcher):
+    with pytest.raises(ValueError):
+        read_events_iter([], dispatcher=dispatcher, workers=2)
+
+
+def test_iter_raw_events():
+    raw_events = ["2\n", "first\n", "  \n", "\n", "second", "3,4"]
+
+    assert list(iter_raw_events(raw_events)) == ["first", "second", "3,4"]
+
+
+def test_iter_chunks():
+    assert list(iter_chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(iter_chunks([], 2)) == []
+
+
+@pytest.mark.parametrize("input_filepath, output_filepath", TEST_FILES)
+def test_read_events_iter_with_test_files(input_filepath, output_filepath):
+    with open(input_filepath, "r") as input_file, open(output_filepath, "r") as output_file:
+        assert read_events_iter(input_file) == output_file.read()
+
+
+def test_read_events_iter_consumes_generators():
+    with open("../test/input/input000.txt", "r") as input_file:
+        raw_events = input_file.read().split("\n")
+
+    with open("../test/output/output000.txt", "r") as output_file:
+        assert read_events_iter(raw_event for raw_event in raw_events) == output_file.read()
+
+
+def test_read_events_iter_uses_given_dispatcher():
+    dispatcher = mock.Mock()
+    dispatcher.get_valid_proposals.return_value = ["foo", "bar"]
+
+    assert read_events_iter(["2\n", "first\n", "\n", "second"], dispatcher=dispatcher) == "foo,bar"
+    assert dispatcher.dispatch_many.call_args_list == [mock.call(["first", "second"])]
+
+
+def test_dispatcher_calls_right_handler(dispatcher, raw_event, event_data):
+    process_mock = mock.Mock()
+    decode_message_mock = mock.Mock(return_value=("decoded",))
+    dispatcher.register_action("test", "testing", process_mock, decode_message_mock)
 
     message = event_data.pop("message")
     event_metadata = EventMetadata(**event_data)
 
     assert dispatcher.dispatch(raw_event) is None
-    assert handler_class_mock.called is True
-    assert handler_class_mock.call_args == mock.call({})
-    assert handle_mock.called is True
-    assert handle_mock.call_args == mock.call(event_metadata, message)
+    assert decode_message_mock.call_args == mock.call(message)
+    assert process_mock.call_args == mock.call(event_metadata, "decoded")
 
 
 def test_dispatcher_avoid_repeated_event_id(dispatcher, raw_event, event_data):
-    handle_mock = mock.Mock()
-    handler_class_mock = mock.Mock()
-    handler_class_mock.return_value.handle = handle_mock
+    process_mock = mock.Mock()
+    dispatcher.register_action("test", "testing", process_mock, mock.Mock(return_value=()))
 
-    dispatcher.handlers = {"test": handler_class_mock}
-    dispatcher.processed_events = [event_data["event_id"]]
+    event_data.pop("message")
+    event_metadata = EventMetadata(**event_data)
+    dispatcher.processed_events.add(event_metadata.event_id, event_metadata.event_timestamp)
 
     assert dispatcher.dispatch(raw_event) is None
-    assert handler_class_mock.called is False
-    assert handle_mock.called is False
+    assert process_mock.called is False
 
 
 def test_dispatcher_raises_when_cant_handle_schema(dispatcher, raw_event):
@@ -85,3 +198,278 @@ def test_dispatcher_raises_when_cant_handle_schema(dispatcher, raw_event):
 
     with pytest.raises(ValueError):
         dispatcher.dispatch(raw_event)
+
+
+def test_dispatcher_raises_when_cant_handle_action(dispatcher):
+    with pytest.raises(NotImplementedError):
+        dispatcher.dispatch(f"{uuid.uuid4()},proposal,testing,2020-01-01T00:00:00Z,{uuid.uuid4()}")
+
+
+def test_dispatcher_accepts_custom_processed_events_store(raw_event):
+    processed_events = BloomFilterProcessedEvents(capacity=10)
+    dispatcher = Dispatcher(processed_events=processed_events)
+    process_mock = mock.Mock()
+    dispatcher.register_action("test", "testing", process_mock, mock.Mock(return_value=()))
+
+    dispatcher.dispatch(raw_event)
+    dispatcher.dispatch(raw_event)
+
+    assert uuid.UUID(raw_event.split(",")[0]) in processed_events
+    assert process_mock.call_count == 1
+
+
+def test_dispatcher_compiles_dispatch_table(dispatcher):
+    assert set(dispatcher.dispatch_table) == {
+        ("proposal", "created"),
+        ("proposal", "updated"),
+        ("proposal", "deleted"),
+        ("proponent", "added"),
+        ("proponent", "updated"),
+        ("proponent", "removed"),
+        ("warranty", "added"),
+        ("warranty", "updated"),
+        ("warranty", "removed"),
+    }
+    action_method, _ = dispatcher.dispatch_table[("proposal", "created")]
+    assert action_method.__self__.stored_proposals is dispatcher.stored_proposals
+
+
+def test_dispatcher_register_handler(dispatcher, raw_event):
+    class TestHandler(ProposalHandler):
+        def process_testing(self, metadata, proposal):
+            self.stored_proposals[proposal.proposal_id] = proposal
+
+    dispatcher.register_handler("test", TestHandler)
+    dispatcher.dispatch(raw_event)
+
+    proposal = dispatcher.stored_proposals[uuid.UUID("80921e5f-4307-4623-9ddb-5bf826a31dd7")]
+    assert proposal.proposal_number_of_monthly_installments == 240
+    # registered actions survive a new compilation
+    dispatcher.register_action("foo", "bar", mock.Mock(), mock.Mock())
+    dispatcher.stored_proposals = {}
+    assert ("test", "testing") in dispatcher.dispatch_table
+    assert ("foo", "bar") in dispatcher.dispatch_table
+
+
+def test_dispatcher_replacing_stored_proposals_rebinds_handlers(dispatcher):
+    stored_proposals = {}
+    dispatcher.stored_proposals = stored_proposals
+    proposal_id = "80921e5f-4307-4623-9ddb-5bf826a31dd7"
+
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,created,2020-01-01T00:00:00Z,{proposal_id},1000.0,24")
+
+    assert list(stored_proposals) == [uuid.UUID(proposal_id)]
+
+
+def test_dispatcher_get_valid_proposals_in_the_middle_of_stream(dispatcher):
+    with open("../test/input/input000.txt", "r") as input_file:
+        raw_events = input_file.read().split("\n")
+
+    # second proposal only becomes valid after its last proponent is added
+    for raw_event in raw_events[:9]:
+        dispatcher.dispatch(raw_event)
+
+    assert dispatcher.get_valid_proposals() == []
+
+    dispatcher.dispatch(raw_events[9])
+
+    assert dispatcher.get_valid_proposals() == ["52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6"]
+
+
+def test_dispatcher_get_valid_proposals(dispatcher):
+    invalid_proposal = mock.Mock(proposal_id="foo")
+    valid_proposal = mock.Mock(proposal_id="bar")
+    dispatcher.stored_proposals = {"foo": invalid_proposal, "bar": valid_proposal}
+    dispatcher.rule_engine = mock.Mock()
+    dispatcher.rule_engine.is_valid.side_effect = lambda proposal: proposal is valid_proposal
+
+    assert dispatcher.get_valid_proposals() == ["bar"]
+    dispatcher.rule_engine.is_valid.assert_has_calls([mock.call(invalid_proposal), mock.call(valid_proposal)])
+
+
+def test_trusted_dispatcher_uses_trusted_handlers():
+    dispatcher = Dispatcher(trusted=True)
+
+    assert dispatcher.metadata_class is TrustedEventMetadata
+    assert dispatcher.handlers == {
+        "proponent": TrustedProponentHandler,
+        "proposal": TrustedProposalHandler,
+        "warranty": TrustedWarrantyHandler,
+    }
+
+
+def test_lazy_dispatcher_uses_lazy_handlers():
+    dispatcher = Dispatcher(lazy=True)
+
+    assert dispatcher.metadata_class is TrustedEventMetadata
+    assert dispatcher.handlers == {
+        "proponent": LazyProponentHandler,
+        "proposal": LazyProposalHandler,
+        "warranty": LazyWarrantyHandler,
+    }
+
+
+@pytest.mark.parametrize(
+    "mode, imports_pydantic", (("", True), ("trusted=True", False), ("lazy=True", False))
+)
+def test_only_strict_mode_imports_pydantic(mode, imports_pydantic):
+    # a new interpreter, as the tests already imported pydantic
+    code = (
+        "import sys\n"
+        "from solution.core import read_events\n"
+        f"read_events(open('../test/input/input000.txt').read(), {mode})\n"
+        "print('pydantic' in sys.modules)"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True).stdout
+
+    assert output.decode("utf-8").strip() == str(imports_pydantic)
+
+
+def test_lazy_dispatcher_never_parses_superseded_events():
+    dispatcher = Dispatcher(lazy=True)
+    proposal_id = "80921e5f-4307-4623-9ddb-5bf826a31dd7"
+    warranty_id = "92139ccf-848e-4e2f-97b3-39a8851d1a87"
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,created,2020-01-01T00:00:00Z,{proposal_id},1000.0,24")
+    dispatcher.dispatch(
+        f"{uuid.uuid4()},warranty,added,2020-01-01T00:00:00Z,{proposal_id},{warranty_id},1.0,GO"
+    )
+    proposal = dispatcher.stored_proposals[uuid.UUID(proposal_id)]
+    warranty = proposal.warranties[uuid.UUID(warranty_id)]
+
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,updated,2020-01-02T00:00:00Z,{proposal_id},2000.0,36")
+    dispatcher.dispatch(
+        f"{uuid.uuid4()},warranty,updated,2020-01-02T00:00:00Z,{proposal_id},{warranty_id},2.0,SP"
+    )
+
+    assert proposal.is_materialized is False
+    assert warranty.is_materialized is False
+
+    updated_proposal = dispatcher.stored_proposals[uuid.UUID(proposal_id)]
+    assert updated_proposal.proposal_loan_value == 2000.0
+    assert updated_proposal.accepted_warranties_value == 2.0
+    assert updated_proposal.warranties[uuid.UUID(warranty_id)].warranty_province == "SP"
+
+
+def test_dispatcher_discards_late_events(dispatcher):
+    proposal_id = "80921e5f-4307-4623-9ddb-5bf826a31dd7"
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,created,2020-01-01T00:00:00Z,{proposal_id},1000.0,24")
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,updated,2020-01-03T00:00:00Z,{proposal_id},3000.0,36")
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,updated,2020-01-02T00:00:00Z,{proposal_id},2000.0,48")
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,deleted,2020-01-02T00:00:00Z,{proposal_id}")
+
+    proposal = dispatcher.stored_proposals[uuid.UUID(proposal_id)]
+    assert proposal.proposal_loan_value == 3000.0
+    assert proposal.proposal_number_of_monthly_installments == 36
+
+
+@pytest.mark.parametrize("mode", [{}, {"trusted": True}, {"lazy": True}])
+def test_dispatcher_compares_timestamps_with_and_without_timezone(mode):
+    dispatcher = Dispatcher(**mode)
+    proposal_id = "80921e5f-4307-4623-9ddb-5bf826a31dd7"
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,created,2020-01-01T00:00:00Z,{proposal_id},1000.0,24")
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,updated,2020-01-03T00:00:00,{proposal_id},3000.0,36")
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,updated,2020-01-02T20:00:00-03:00,{proposal_id},2000.0,48")
+
+    # naive timestamps are UTC, so the last update is late
+    proposal = dispatcher.stored_proposals[uuid.UUID(proposal_id)]
+    assert proposal.proposal_loan_value == 3000.0
+
+
+@pytest.mark.parametrize("mode", [{}, {"trusted": True}, {"lazy": True}])
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize(
+    "warranties_values, expected_result",
+    [(("99999.996", "100000.003"), ""), (("100000.0", "100000.0"), "80921e5f-4307-4623-9ddb-5bf826a31dd7")],
+)
+def test_read_events_sums_sub_cent_warranty_values_exactly(
+    mode, vectorized, warranties_values, expected_result
+):
+    if vectorized:
+        pytest.importorskip("numpy")
+
+    proposal_id = "80921e5f-4307-4623-9ddb-5bf826a31dd7"
+    raw_events = [
+        f"{uuid.uuid4()},proposal,created,2020-01-01T00:00:00Z,{proposal_id},100000.0,48",
+        f"{uuid.uuid4()},proponent,added,2020-01-01T00:00:01Z,{proposal_id},{uuid.uuid4()},Ana,30,10000.0,true",
+        f"{uuid.uuid4()},proponent,added,2020-01-01T00:00:02Z,{proposal_id},{uuid.uuid4()},Rui,25,5000.0,false",
+    ] + [
+        f"{uuid.uuid4()},warranty,added,2020-01-01T00:00:03Z,{proposal_id},{uuid.uuid4()},{value},ES"
+        for value in warranties_values
+    ]
+
+    assert read_events_iter(raw_events, vectorized=vectorized, **mode) == expected_result
+
+
+@pytest.mark.parametrize("mode", [{}, {"trusted": True}, {"lazy": True}])
+def test_dispatch_many_matches_dispatch(mode):
+    raw_events = EventStreamGenerator(
+        proposals=200,
+        updates_per_proposal=3,
+        duplicate_rate=0.1,
+        late_event_rate=0.2,
+        delete_rate=0.3,
+        seed=1,
+    ).generate()
+    dispatchers = []
+    for _ in range(2):
+        dispatchers.append(
+            Dispatcher(
+                pending_events=PendingEventsBuffer(),
+                validity_feed=ValidityFeed(sinks=[BufferSink()]),
+                **mode,
+            )
+        )
+
+    dispatcher, batched_dispatcher = dispatchers
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+    for raw_events_chunk in iter_chunks(raw_events, 100):
+        batched_dispatcher.dispatch_many(raw_events_chunk)
+
+    assert batched_dispatcher.get_valid_proposals() == dispatcher.get_valid_proposals()
+    assert batched_dispatcher.processed_events.event_ids == dispatcher.processed_events.event_ids
+    assert list(batched_dispatcher.validity_feed.sinks[0]) == list(dispatcher.validity_feed.sinks[0])
+
+
+def test_dispatch_many_skips_repeated_events_of_the_chunk(dispatcher, raw_event):
+    process_mock = mock.Mock()
+    dispatcher.register_action("test", "testing", process_mock, mock.Mock(return_value=()))
+
+    dispatcher.dispatch_many([raw_event, raw_event])
+
+    assert process_mock.call_count == 1
+    assert uuid.UUID(raw_event.split(",")[0]) in dispatcher.processed_events
+
+
+def test_dispatch_many_keeps_events_before_an_error(dispatcher):
+    proposal_id = uuid.uuid4()
+    event_id = uuid.uuid4()
+    raw_events = [
+        f"{event_id},proposal,created,2020-01-01T00:00:00Z,{proposal_id},1000.0,24",
+        f"{uuid.uuid4()},unknown,created,2020-01-01T00:00:00Z,{proposal_id}",
+        f"{uuid.uuid4()},proposal,deleted,2020-01-01T00:00:00Z,{proposal_id}",
+    ]
+
+    with pytest.raises(ValueError):
+        dispatcher.dispatch_many(raw_events)
+
+    assert proposal_id in dispatcher.stored_proposals
+    assert len(dispatcher.processed_events) == 1
+    assert event_id in dispatcher.processed_events
+
+
+@pytest.mark.parametrize(
+    "dispatcher_kwargs",
+    [
+        {"processed_events": TimeWindowProcessedEvents()},
+        {"processed_events": BloomFilterProcessedEvents(capacity=10)},
+        {"wal": mock.Mock()},
+    ],
+)
+def test_dispatch_many_dispatches_one_by_one(dispatcher_kwargs, raw_event):
+    dispatcher = Dispatcher(**dispatcher_kwargs)
+
+    with mock.patch.object(dispatcher, "dispatch") as dispatch_mock:
+        dispatcher.dispatch_many([raw_event, "other"])
+
+    assert dispatch_mock.call_args_list == [mock.call(raw_event), mock.call("other")]
@@ -0,0 +1,94 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from solution.deduplication import BloomFilterProcessedEvents, ProcessedEventsSet, TimeWindowProcessedEvents
+
+
+@pytest.fixture
+def event_timestamp():
+    return datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+class TestProcessedEventsSet:
+    def test_add_and_contains(self, event_timestamp):
+        processed_events = ProcessedEventsSet()
+        event_id = uuid.uuid4()
+
+        assert event_id not in processed_events
+        processed_events.add(event_id, event_timestamp)
+        assert event_id in processed_events
+        assert uuid.UUID(str(event_id)) in processed_events
+        assert len(processed_events) == 1
+
+
+class TestTimeWindowProcessedEvents:
+    def test_add_and_contains(self, event_timestamp):
+        processed_events = TimeWindowProcessedEvents(window=timedelta(minutes=5))
+        event_id = uuid.uuid4()
+
+        processed_events.add(event_id, event_timestamp)
+        assert event_id in processed_events
+
+    def test_expires_events_out_of_window(self, event_timestamp):
+        processed_events = TimeWindowProcessedEvents(window=timedelta(minutes=5))
+        old_event_id = uuid.uuid4()
+        new_event_id = uuid.uuid4()
+
+        processed_events.add(old_event_id, event_timestamp)
+        processed_events.add(new_event_id, event_timestamp + timedelta(minutes=10))
+
+        assert old_event_id not in processed_events
+        assert new_event_id in processed_events
+        assert len(processed_events) == 1
+
+    def test_keeps_late_events_inside_window(self, event_timestamp):
+        processed_events = TimeWindowProcessedEvents(window=timedelta(minutes=5))
+        newest_event_id = uuid.uuid4()
+        late_event_id = uuid.uuid4()
+
+        processed_events.add(newest_event_id, event_timestamp + timedelta(minutes=3))
+        processed_events.add(late_event_id, event_timestamp)
+
+        assert newest_event_id in processed_events
+        assert late_event_id in processed_events
+
+
+class TestBloomFilterProcessedEvents:
+    def test_add_and_contains(self, event_timestamp):
+        processed_events = BloomFilterProcessedEvents(capacity=100, false_positive_rate=0.01)
+        event_ids = [uuid.uuid4() for _ in range(100)]
+
+        for event_id in event_ids:
+            processed_events.add(event_id, event_timestamp)
+
+        assert all(event_id in processed_events for event_id in event_ids)
+
+    def test_false_positive_rate(self, event_timestamp):
+        processed_events = BloomFilterProcessedEvents(capacity=1000, false_positive_rate=0.01)
+        for _ in range(1000):
+            processed_events.add(uuid.uuid4(), event_timestamp)
+
+        false_positives = sum(uuid.uuid4() in processed_events for _ in range(1000))
+        assert false_positives < 50
+
+    def test_memory_stays_flat_when_full(self, event_timestamp):
+        processed_events = BloomFilterProcessedEvents(capacity=10)
+        size = len(processed_events.current)
+        first_generation = [uuid.uuid4() for _ in range(10)]
+        for event_id in first_generation:
+            processed_events.add(event_id, event_timestamp)
+
+        # fills second generation and rotates the first one out
+        for _ in range(20):
+            processed_events.add(uuid.uuid4(), event_timestamp)
+
+        assert len(processed_events.current) == size
+        assert len(processed_events.previous) == size
+        assert len(processed_events) <= 10
+
+    @pytest.mark.parametrize("false_positive_rate", (0, 1, 1.5))
+    def test_invalid_false_positive_rate(self, false_positive_rate):
+        with pytest.raises(ValueError):
+            BloomFilterProcessedEvents(false_positive_rate=false_positive_rate)
@@ -0,0 +1,197 @@
+import mmap
+import uuid
+
+import pytest
+
+from solution.core import Dispatcher
+from solution.encoding import (
+    EVENT_KINDS,
+    HEADER,
+    convert_text_to_binary,
+    encode_decoded_event,
+    encode_event,
+    iter_decoded_events,
+    read_binary_events,
+)
+from solution.pending import PendingEventsBuffer
+
+from .test_core import TEST_FILES
+
+PROPOSAL_ID = "80921e5f-4307-4623-9ddb-5bf826a31dd7"
+RELATED_ID = "9a4f6388-f937-4da5-8293-6b2dac7d7afb"
+
+RAW_EVENTS = (
+    f"{uuid.uuid4()},proposal,created,2020-01-01T00:00:00Z,{PROPOSAL_ID},1141424.0,240",
+    f"{uuid.uuid4()},proposal,updated,2020-01-01T00:00:01Z,{PROPOSAL_ID},1141425.5,120",
+    f"{uuid.uuid4()},proponent,added,2020-01-01T00:00:02Z,{PROPOSAL_ID},{RELATED_ID},José Ávila,35,126096.68,true",
+    f"{uuid.uuid4()},proponent,updated,2020-01-01T00:00:03Z,{PROPOSAL_ID},{RELATED_ID},José Ávila,36,126096.68,false",
+    f"{uuid.uuid4()},proponent,removed,2020-01-01T00:00:04Z,{PROPOSAL_ID},{RELATED_ID}",
+    f"{uuid.uuid4()},warranty,added,2020-01-01T00:00:05Z,{PROPOSAL_ID},{RELATED_ID},4488813.77,GO",
+    f"{uuid.uuid4()},warranty,updated,2020-01-01T00:00:06Z,{PROPOSAL_ID},{RELATED_ID},4488814.77,DF",
+    f"{uuid.uuid4()},warranty,removed,2020-01-01T00:00:07Z,{PROPOSAL_ID},{RELATED_ID}",
+    f"{uuid.uuid4()},proposal,deleted,2020-01-01T00:00:08Z,{PROPOSAL_ID}",
+)
+
+
+def get_values(value):
+    # schema objects are compared by their fields
+    if isinstance(value, uuid.UUID):
+        return value
+
+    return {
+        name: getattr(value, name)
+        for name in dir(value)
+        if name.startswith(("proposal_", "proponent_", "warranty_"))
+    }
+
+
+def decode_events(path, dispatcher):
+    with open(path, "rb") as events_file, mmap.mmap(
+        events_file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        return list(iter_decoded_events(buffer, dispatcher))
+
+
+def test_encode_event_raises_on_unknown_event():
+    with pytest.raises(ValueError):
+        encode_event(f"{uuid.uuid4()},proposal,added,2020-01-01T00:00:00Z,{PROPOSAL_ID}")
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+def test_decoded_events_match_text_events(tmp_path, trusted):
+    path = tmp_path / "events.bin"
+    assert convert_text_to_binary(["9\n"] + [f"{raw_event}\n" for raw_event in RAW_EVENTS], path) == 9
+
+    dispatcher = Dispatcher(trusted=trusted)
+    decoded_events = decode_events(path, dispatcher)
+
+    event_kinds = [(metadata.event_schema, metadata.event_action) for metadata, _ in decoded_events]
+    assert sorted(event_kinds) == sorted(EVENT_KINDS)
+    for raw_event, (metadata, action_args) in zip(RAW_EVENTS, decoded_events):
+        event_id, event_schema, event_action, event_timestamp, *message = raw_event.split(",")
+        expected_metadata = dispatcher.metadata_class(
+            event_id=event_id,
+            event_schema=event_schema,
+            event_action=event_action,
+            event_timestamp=event_timestamp,
+        )
+        _, decode_message = dispatcher.dispatch_table[(event_schema, event_action)]
+        expected_args = decode_message(message)
+
+        assert (metadata.event_schema, metadata.event_action) == (event_schema, event_action)
+        assert metadata.event_id == expected_metadata.event_id
+        assert metadata.event_timestamp == expected_metadata.event_timestamp
+        assert len(action_args) == len(expected_args)
+        for value, expected_value in zip(action_args, expected_args):
+            assert type(value) is type(expected_value)
+            assert get_values(value) == get_values(expected_value)
+
+
+@pytest.mark.parametrize("mode", [{}, {"trusted": True}, {"lazy": True}])
+def test_encode_decoded_event_matches_encode_event(tmp_path, mode):
+    path = tmp_path / "events.bin"
+    convert_text_to_binary(RAW_EVENTS, path)
+
+    decoded_events = decode_events(path, Dispatcher(**mode))
+
+    assert [encode_decoded_event(*decoded_event) for decoded_event in decoded_events] == [
+        encode_event(raw_event) for raw_event in RAW_EVENTS
+    ]
+
+
+@pytest.mark.parametrize("input_filepath, output_filepath", TEST_FILES)
+@pytest.mark.parametrize("trusted", [False, True])
+def test_read_binary_events_with_test_files(tmp_path, input_filepath, output_filepath, trusted):
+    path = tmp_path / "events.bin"
+    with open(input_filepath, "r") as input_file:
+        convert_text_to_binary(input_file, path)
+
+    with open(output_filepath, "r") as output_file:
+        assert read_binary_events(path, trusted=trusted) == output_file.read()
+
+
+def test_binary_events_are_smaller_than_text(tmp_path):
+    path = tmp_path / "events.bin"
+    with open("../test/input/input004.txt", "r") as input_file:
+        convert_text_to_binary(input_file, path)
+
+    with open("../test/input/input004.txt", "rb") as input_file:
+        assert path.stat().st_size * 2 < len(input_file.read())
+
+
+def test_read_binary_events_raises_on_invalid_file(tmp_path):
+    path = tmp_path / "events.bin"
+    path.write_bytes(HEADER.pack(b"FOOBAR", 1))
+
+    with pytest.raises(ValueError):
+        read_binary_events(path)
+
+
+def test_dispatch_decoded_avoids_repeated_event_id(tmp_path):
+    path = tmp_path / "events.bin"
+    convert_text_to_binary(RAW_EVENTS[:1] * 2, path)
+    dispatcher = Dispatcher(trusted=True)
+
+    for metadata, action_args in decode_events(path, dispatcher):
+        dispatcher.dispatch_decoded(metadata, action_args)
+
+    assert len(dispatcher.processed_events) == 1
+    assert list(dispatcher.stored_proposals) == [uuid.UUID(PROPOSAL_ID)]
+
+
+def test_dispatch_decoded_raises_with_wal(tmp_path):
+    path = tmp_path / "events.bin"
+    convert_text_to_binary(RAW_EVENTS[:1], path)
+    dispatcher = Dispatcher(trusted=True, wal=object())
+    metadata, action_args = decode_events(path, dispatcher)[0]
+
+    with pytest.raises(ValueError):
+        dispatcher.dispatch_decoded(metadata, action_args)
+
+
+def test_dispatch_decoded_parks_orphan_events(tmp_path):
+    path = tmp_path / "events.bin"
+    # proponent arrives before its proposal
+    convert_text_to_binary([RAW_EVENTS[2], RAW_EVENTS[0]], path)
+    pending_events = PendingEventsBuffer()
+    dispatcher = Dispatcher(trusted=True, pending_events=pending_events)
+    decoded_events = decode_events(path, dispatcher)
+
+    dispatcher.dispatch_decoded(*decoded_events[0])
+    assert len(pending_events) == 1
+
+    dispatcher.dispatch_decoded(*decoded_events[1])
+    assert len(pending_events) == 0
+    proposal = dispatcher.stored_proposals[uuid.UUID(PROPOSAL_ID)]
+    assert proposal.proponents[uuid.UUID(RELATED_ID)].proponent_name == "José Ávila"
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+def test_dispatch_decoded_many_matches_dispatch_decoded(tmp_path, trusted):
+    path = tmp_path / "events.bin"
+    # repeated and orphan events, the proponent arrives before its proposal
+    convert_text_to_binary([RAW_EVENTS[2], RAW_EVENTS[0], RAW_EVENTS[0], RAW_EVENTS[5]], path)
+    dispatcher = Dispatcher(trusted=trusted, pending_events=PendingEventsBuffer())
+
+    dispatcher.dispatch_decoded_many(decode_events(path, dispatcher))
+
+    assert len(dispatcher.processed_events) == 3
+    assert len(dispatcher.pending_events) == 0
+    proposal = dispatcher.stored_proposals[uuid.UUID(PROPOSAL_ID)]
+    assert list(proposal.proponents) == [uuid.UUID(RELATED_ID)]
+    assert list(proposal.warranties) == [uuid.UUID(RELATED_ID)]
+
+
+def test_dispatcher_drains_text_and_decoded_orphan_events(tmp_path):
+    path = tmp_path / "events.bin"
+    convert_text_to_binary([RAW_EVENTS[5], RAW_EVENTS[0]], path)
+    dispatcher = Dispatcher(trusted=True, pending_events=PendingEventsBuffer())
+    decoded_events = decode_events(path, dispatcher)
+
+    dispatcher.dispatch_decoded(*decoded_events[0])
+    dispatcher.dispatch(RAW_EVENTS[2])
+    dispatcher.dispatch(RAW_EVENTS[0])
+
+    proposal = dispatcher.stored_proposals[uuid.UUID(PROPOSAL_ID)]
+    assert list(proposal.proponents) == [uuid.UUID(RELATED_ID)]
+    assert list(proposal.warranties) == [uuid.UUID(RELATED_ID)]
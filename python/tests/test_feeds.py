@@ -0,0 +1,187 @@
+import json
+import uuid
+from unittest import mock
+
+import pytest
+
+from solution.core import Dispatcher, iter_raw_events
+from solution.encoding import convert_text_to_binary, read_binary_events
+from solution.feeds import BECAME_INVALID, BECAME_VALID, BufferSink, FileSink, ValidityChange, ValidityFeed
+from solution.instrumentation import Instrumentation
+from solution.schemas import EventMetadata
+
+VALID_PROPOSAL_ID = uuid.UUID("52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6")
+
+
+@pytest.fixture
+def raw_events():
+    with open("../test/input/input000.txt", "r") as input_file:
+        return list(iter_raw_events(input_file))
+
+
+@pytest.fixture
+def metadata(event_data):
+    event_data["event_schema"] = "proposal"
+    event_data["event_action"] = "deleted"
+    return EventMetadata(**event_data)
+
+
+def get_feed_valid_proposals(changes):
+    valid_proposals_ids = set()
+    for validity_change in changes:
+        if validity_change.change == BECAME_VALID:
+            valid_proposals_ids.add(validity_change.proposal_id)
+        else:
+            valid_proposals_ids.discard(validity_change.proposal_id)
+
+    return valid_proposals_ids
+
+
+class TestValidityFeed:
+    def test_update_publishes_only_transitions(self, metadata):
+        callback = mock.Mock()
+        feed = ValidityFeed(sinks=[callback])
+        proposal_id = uuid.uuid4()
+
+        assert feed.update(proposal_id, False, metadata) is None
+        validity_change = feed.update(proposal_id, True, metadata)
+        assert feed.update(proposal_id, True, metadata) is None
+        assert feed.update(proposal_id, False, metadata).change == BECAME_INVALID
+
+        assert validity_change == ValidityChange(
+            proposal_id, BECAME_VALID, metadata.event_id, metadata.event_timestamp
+        )
+        assert callback.call_count == 2
+        assert callback.call_args_list[0] == mock.call(validity_change)
+        assert feed.published_count == 2
+
+    def test_add_sink(self, metadata):
+        feed = ValidityFeed()
+        buffer_sink = feed.add_sink(BufferSink())
+
+        feed.update(uuid.uuid4(), True, metadata)
+
+        assert len(buffer_sink) == 1
+
+
+class TestBufferSink:
+    def test_iter_consumes_changes(self, metadata):
+        buffer_sink = BufferSink()
+        feed = ValidityFeed(sinks=[buffer_sink])
+        first_proposal_id, second_proposal_id = uuid.uuid4(), uuid.uuid4()
+
+        feed.update(first_proposal_id, True, metadata)
+        assert [change.proposal_id for change in buffer_sink] == [first_proposal_id]
+
+        feed.update(second_proposal_id, True, metadata)
+        assert [change.proposal_id for change in buffer_sink] == [second_proposal_id]
+        assert len(buffer_sink) == 0
+
+    def test_max_changes_drops_oldest(self, metadata):
+        buffer_sink = BufferSink(max_changes=1)
+        feed = ValidityFeed(sinks=[buffer_sink])
+        proposal_id = uuid.uuid4()
+
+        feed.update(uuid.uuid4(), True, metadata)
+        feed.update(proposal_id, True, metadata)
+
+        assert [change.proposal_id for change in buffer_sink] == [proposal_id]
+
+
+class TestFileSink:
+    def test_appends_json_lines(self, tmp_path, metadata):
+        path = tmp_path / "changes.jsonl"
+        proposal_id = uuid.uuid4()
+
+        # reopening keeps the previous changes
+        for _ in range(2):
+            with FileSink(path) as file_sink:
+                ValidityFeed(sinks=[file_sink]).update(proposal_id, True, metadata)
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0]) == {
+            "proposal_id": str(proposal_id),
+            "change": BECAME_VALID,
+            "event_id": str(metadata.event_id),
+            "event_timestamp": metadata.event_timestamp.isoformat(),
+        }
+
+    def test_flush_every(self, tmp_path, metadata):
+        path = tmp_path / "changes.jsonl"
+        file_sink = FileSink(path, flush_every=2)
+        feed = ValidityFeed(sinks=[file_sink])
+
+        feed.update(uuid.uuid4(), True, metadata)
+        assert path.read_text() == ""
+
+        feed.update(uuid.uuid4(), True, metadata)
+        assert len(path.read_text().splitlines()) == 2
+
+        file_sink.close()
+        file_sink.close()
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+def test_dispatcher_publishes_change_when_triggering_event_is_handled(raw_events, trusted):
+    buffer_sink = BufferSink()
+    dispatcher = Dispatcher(trusted=trusted, validity_feed=ValidityFeed(sinks=[buffer_sink]))
+
+    # proposal only becomes valid after its last proponent is added
+    for raw_event in raw_events[:9]:
+        dispatcher.dispatch(raw_event)
+    assert list(buffer_sink) == []
+
+    dispatcher.dispatch(raw_events[9])
+    validity_changes = list(buffer_sink)
+
+    assert [(change.proposal_id, change.change) for change in validity_changes] == [
+        (VALID_PROPOSAL_ID, BECAME_VALID)
+    ]
+    assert str(validity_changes[0].event_id) == raw_events[9].split(",")[0]
+
+    dispatcher.dispatch(f"{uuid.uuid4()},proposal,deleted,2030-01-01T00:00:00Z,{VALID_PROPOSAL_ID}")
+
+    assert [(change.proposal_id, change.change) for change in buffer_sink] == [
+        (VALID_PROPOSAL_ID, BECAME_INVALID)
+    ]
+
+
+def test_dispatcher_feed_matches_valid_proposals(raw_events):
+    buffer_sink = BufferSink()
+    dispatcher = Dispatcher(validity_feed=ValidityFeed(sinks=[buffer_sink]))
+
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+
+    valid_proposals_ids = {uuid.UUID(proposal_id) for proposal_id in dispatcher.get_valid_proposals()}
+    assert get_feed_valid_proposals(buffer_sink) == valid_proposals_ids
+    # the feed does not count as final validation
+    assert dispatcher.rule_engine.checked_proposals == len(dispatcher.stored_proposals)
+
+
+def test_instrumented_dispatcher_publishes_changes(raw_events):
+    buffer_sink = BufferSink()
+    dispatcher = Dispatcher(
+        instrumentation=Instrumentation(), validity_feed=ValidityFeed(sinks=[buffer_sink])
+    )
+
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+
+    assert get_feed_valid_proposals(buffer_sink) == {
+        uuid.UUID(proposal_id) for proposal_id in dispatcher.get_valid_proposals()
+    }
+
+
+def test_decoded_dispatch_publishes_changes(tmp_path, raw_events):
+    path = tmp_path / "events.bin"
+    convert_text_to_binary(raw_events, path)
+    buffer_sink = BufferSink()
+    dispatcher = Dispatcher(trusted=True, validity_feed=ValidityFeed(sinks=[buffer_sink]))
+
+    valid_proposals = read_binary_events(path, dispatcher=dispatcher)
+
+    assert get_feed_valid_proposals(buffer_sink) == {
+        uuid.UUID(proposal_id) for proposal_id in valid_proposals.split(",")
+    }
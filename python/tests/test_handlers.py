@@ -1,11 +1,23 @@
 import uuid
+from datetime import datetime, timezone
 from unittest import mock
 
 import pytest
 
 from solution.exceptions import ReferenceDoesNotExist
-from solution.handlers import BaseHandler, ProponentHandler, ProposalHandler, WarrantyHandler
-from solution.schemas import EventMetadata, Proposal
+from solution.handlers import (
+    BaseHandler,
+    ProponentHandler,
+    ProposalHandler,
+    PydanticSchemaClass,
+    WarrantyHandler,
+)
+from solution.schemas import EventMetadata, Proponent, Proposal, Warranty
+
+
+@pytest.fixture
+def newer_timestamp():
+    return datetime(2021, 1, 1, tzinfo=timezone.utc)
 
 
 @pytest.fixture
@@ -28,6 +40,24 @@ def warranty_handler():
     return WarrantyHandler(stored_proposals={})
 
 
+def test_pydantic_schema_class_is_resolved_on_first_read():
+    class Handler(BaseHandler):
+        schema_class = PydanticSchemaClass("Warranty")
+
+    assert isinstance(vars(Handler)["schema_class"], PydanticSchemaClass)
+    assert Handler({}).schema_class is Warranty
+    # replaced by the model itself after the first read
+    assert vars(Handler)["schema_class"] is Warranty
+
+
+@pytest.mark.parametrize(
+    "handler_class, schema_class",
+    ((ProposalHandler, Proposal), (ProponentHandler, Proponent), (WarrantyHandler, Warranty)),
+)
+def test_handlers_schema_class(handler_class, schema_class):
+    assert handler_class.schema_class is schema_class
+
+
 class TestBaseHandler:
     def test_get_stored_proposal(self, proposal, base_handler):
         proposal_id = proposal.proposal_id
@@ -41,64 +71,67 @@ class TestBaseHandler:
         with pytest.raises(ReferenceDoesNotExist):
             base_handler._get_stored_proposal(proposal_id)
 
-    def test_build_action_kwargs_with_deleted_action(self, event_data, base_handler):
-        event_data["event_schema"] = "foo"
-        event_data["event_action"] = "deleted"
-        metadata = EventMetadata(**event_data)
+    def test_is_late_event(self, proposal_updated_metadata, proposal, newer_timestamp, base_handler):
+        assert base_handler._is_late_event(proposal_updated_metadata, None) is False
+        assert base_handler._is_late_event(proposal_updated_metadata, proposal) is False
+
+        proposal.last_event_timestamp = proposal_updated_metadata.event_timestamp
+        assert base_handler._is_late_event(proposal_updated_metadata, proposal) is False
+
+        proposal.last_event_timestamp = newer_timestamp
+        assert base_handler._is_late_event(proposal_updated_metadata, proposal) is True
+
+    def test_get_message_decoder_with_deleted_action(self, base_handler):
         some_id = uuid.uuid4()
-        message = [str(some_id)]
 
-        expected_result = {"metadata": metadata, "foo_id": some_id}
-        assert base_handler._build_action_kwargs(metadata, message) == expected_result
+        assert base_handler.get_message_decoder("deleted")([str(some_id)]) == (some_id,)
 
-    def test_build_action_kwargs_with_removed_action(self, event_data, base_handler):
-        event_data["event_schema"] = "foo"
-        event_data["event_action"] = "removed"
-        metadata = EventMetadata(**event_data)
+    def test_get_message_decoder_with_removed_action(self, base_handler):
         some_id = uuid.uuid4()
         some_other_id = uuid.uuid4()
-        message = [str(some_id), str(some_other_id)]
 
-        expected_result = {"metadata": metadata, "parent_id": some_id, "foo_id": some_other_id}
-        assert base_handler._build_action_kwargs(metadata, message) == expected_result
+        decode_message = base_handler.get_message_decoder("removed")
+        assert decode_message([str(some_id), str(some_other_id)]) == (some_id, some_other_id)
 
     @pytest.mark.parametrize("common_action", ("created", "added", "updated"))
-    def test_build_action_kwargs_with_common_action(
-        self, common_action, event_data, proposal_data, base_handler
-    ):
-        event_data["event_schema"] = "foo"
-        event_data["event_action"] = common_action
-        metadata = EventMetadata(**event_data)
-        message = list(proposal_data.values())
+    def test_get_message_decoder_with_common_action(self, common_action, proposal_data, base_handler):
         base_handler.schema_class = Proposal
 
-        expected_result = {"metadata": metadata, "foo": Proposal(**proposal_data)}
-        assert base_handler._build_action_kwargs(metadata, message) == expected_result
+        decode_message = base_handler.get_message_decoder(common_action)
+        assert decode_message(list(proposal_data.values())) == (Proposal(**proposal_data),)
 
-    def test_handle_calls_processor(self, event_data, base_handler):
+    def test_get_dispatch_table(self, proponent_handler):
+        dispatch_table = proponent_handler.get_dispatch_table("proponent")
+
+        assert set(dispatch_table) == {
+            ("proponent", "added"),
+            ("proponent", "updated"),
+            ("proponent", "removed"),
+        }
+        action_method, _ = dispatch_table[("proponent", "removed")]
+        assert action_method == proponent_handler.process_removed
+
+    def test_get_dispatch_table_calls_processor(self, event_data, proposal_data, base_handler):
         event_data["event_action"] = "created"
         metadata = EventMetadata(**event_data)
         base_handler.process_created = mock.Mock(return_value=None)
-        base_handler._build_action_kwargs = mock.Mock(return_value={"metadata": metadata, "foo": None})
+        base_handler.schema_class = Proposal
 
-        assert base_handler.handle(metadata, message={}) is None
-        assert base_handler.process_created.called is True
-        assert base_handler._build_action_kwargs.called is True
+        action_method, decode_message = base_handler.get_dispatch_table("foo")[("foo", "created")]
 
-    def test_handle_raises_not_implemented_whith_uncovered_event_action(self, event_data, base_handler):
-        event_data["event_action"] = "uncovered"
-        metadata = EventMetadata(**event_data)
-        base_handler._build_action_kwargs = mock.Mock(return_value={"metadata": metadata, "foo": None})
+        assert action_method(metadata, *decode_message(list(proposal_data.values()))) is None
+        base_handler.process_created.assert_called_once_with(metadata, Proposal(**proposal_data))
 
-        with pytest.raises(NotImplementedError):
-            base_handler.handle(metadata, message={})
-            assert base_handler._build_action_kwargs.called is False
+    def test_get_dispatch_table_skips_uncovered_event_action(self, base_handler):
+        # actions without a process method are left to the dispatcher errors
+        assert base_handler.get_dispatch_table("foo") == {}
 
 
 class TestProposalHandler:
     def test_process_created_stores_proposal(self, proposal_created_metadata, proposal, proposal_handler):
         assert proposal_handler.process_created(proposal_created_metadata, proposal) is None
         assert proposal_handler.stored_proposals.get(proposal.proposal_id) is proposal
+        assert proposal.last_event_timestamp == proposal_created_metadata.event_timestamp
 
     def test_process_created_idempotency(self, proposal_created_metadata, proposal, proposal_handler):
         proposal_handler.stored_proposals[proposal.proposal_id] = proposal
@@ -110,8 +143,8 @@ class TestProposalHandler:
         self, proposal_updated_metadata, proposal, proponent, warranty, proposal_data, proposal_handler
     ):
         # store proposal with relateds
-        proposal.proponents = {proponent.proponent_id: proponent}
-        proposal.warranties = {warranty.warranty_id: warranty}
+        proposal.put_proponent(proponent)
+        proposal.put_warranty(warranty)
         proposal_handler.stored_proposals[proposal.proposal_id] = proposal
 
         # create non stored new proposal instance
@@ -123,6 +156,19 @@ class TestProposalHandler:
         assert current_stored_proposal.proposal_number_of_monthly_installments == 999
         assert len(current_stored_proposal.proponents) == 1
         assert len(current_stored_proposal.warranties) == 1
+        assert current_stored_proposal.main_proponents_ids == {proponent.proponent_id}
+        assert current_stored_proposal.accepted_warranties_count == 1
+        assert current_stored_proposal.last_event_timestamp == proposal_updated_metadata.event_timestamp
+
+    def test_process_updated_ignores_late_event(
+        self, proposal_updated_metadata, proposal, proposal_data, newer_timestamp, proposal_handler
+    ):
+        proposal.last_event_timestamp = newer_timestamp
+        proposal_handler.stored_proposals[proposal.proposal_id] = proposal
+        updated_proposal = Proposal(**proposal_data)
+
+        assert proposal_handler.process_updated(proposal_updated_metadata, updated_proposal) is None
+        assert proposal_handler.stored_proposals.get(proposal.proposal_id) is proposal
 
     def test_process_updated_with_nonexistent_proposal(
         self, proposal_updated_metadata, proposal, proposal_handler
@@ -136,6 +182,15 @@ class TestProposalHandler:
         assert proposal_handler.process_deleted(proposal_deleted_metadata, proposal.proposal_id) is None
         assert proposal_handler.stored_proposals.get(proposal.proposal_id, None) is None
 
+    def test_process_deleted_ignores_late_event(
+        self, proposal_deleted_metadata, proposal, newer_timestamp, proposal_handler
+    ):
+        proposal.last_event_timestamp = newer_timestamp
+        proposal_handler.stored_proposals[proposal.proposal_id] = proposal
+
+        assert proposal_handler.process_deleted(proposal_deleted_metadata, proposal.proposal_id) is None
+        assert proposal_handler.stored_proposals.get(proposal.proposal_id) is proposal
+
 
 class TestProponentHandler:
     def test_process_added_stores_proponent_in_proposal(
@@ -145,6 +200,7 @@ class TestProponentHandler:
 
         assert proponent_handler.process_added(proponent_added_metadata, proponent) is None
         assert proposal.proponents.get(proponent.proponent_id) is proponent
+        assert proposal.main_proponents_ids == {proponent.proponent_id}
 
     def test_process_added_idempotency(
         self, proponent_added_metadata, proposal, proponent, proponent_handler
@@ -156,18 +212,56 @@ class TestProponentHandler:
         assert proponent_handler.process_added(proponent_added_metadata, proponent) is None
         assert proposal.proponents.get(proponent.proponent_id) == {"test": 123}
 
-    def test_process_updated(self, proponent_updated_metadata, proposal, proponent, proponent_handler):
+    def test_process_updated(
+        self, proponent_updated_metadata, proposal, proponent, proponent_data, proponent_handler
+    ):
         # store obj to proponent id
-        proposal.proponents = {proponent.proponent_id: {"test": 123}}
+        proponent_data.update(proponent_age=17, proponent_is_main=False)
+        proposal.put_proponent(Proponent(**proponent_data))
         proponent_handler.stored_proposals.update({proposal.proposal_id: proposal})
 
         assert proponent_handler.process_updated(proponent_updated_metadata, proponent) is None
         assert proposal.proponents.get(proponent.proponent_id) is proponent
+        assert proponent.last_event_timestamp == proponent_updated_metadata.event_timestamp
+        assert proposal.main_proponents_ids == {proponent.proponent_id}
+        assert proposal.underage_proponents_count == 0
+
+    def test_process_updated_ignores_late_event(
+        self,
+        proponent_updated_metadata,
+        proposal,
+        proponent,
+        proponent_data,
+        newer_timestamp,
+        proponent_handler,
+    ):
+        stored_proponent = Proponent(**proponent_data)
+        stored_proponent.last_event_timestamp = newer_timestamp
+        proposal.put_proponent(stored_proponent)
+        proponent_handler.stored_proposals.update({proposal.proposal_id: proposal})
+
+        assert proponent_handler.process_updated(proponent_updated_metadata, proponent) is None
+        assert proposal.proponents.get(proponent.proponent_id) is stored_proponent
+
+    def test_process_removed_ignores_late_event(
+        self, proponent_removed_metadata, proposal, proponent, newer_timestamp, proponent_handler
+    ):
+        proponent.last_event_timestamp = newer_timestamp
+        proposal.put_proponent(proponent)
+        proponent_handler.stored_proposals.update({proposal.proposal_id: proposal})
+
+        assert (
+            proponent_handler.process_removed(
+                proponent_removed_metadata, proposal.proposal_id, proponent.proponent_id
+            )
+            is None
+        )
+        assert proposal.proponents.get(proponent.proponent_id) is proponent
 
     def test_process_removed(self, proponent_removed_metadata, proposal, proponent, proponent_handler):
         proposal_id = proposal.proposal_id
         proponent_id = proponent.proponent_id
-        proposal.proponents = {proponent_id: proponent}
+        proposal.put_proponent(proponent)
         proponent_handler.stored_proposals.update({proposal_id: proposal})
 
         assert len(proposal.proponents) == 1
@@ -175,6 +269,7 @@ class TestProponentHandler:
             proponent_handler.process_removed(proponent_removed_metadata, proposal_id, proponent_id) is None
         )
         assert len(proposal.proponents) == 0
+        assert proposal.main_proponents_ids == set()
 
 
 class TestWarrantyHandler:
@@ -185,6 +280,7 @@ class TestWarrantyHandler:
 
         assert warranty_handler.process_added(warranty_added_metadata, warranty) is None
         assert proposal.warranties.get(warranty.warranty_id) is warranty
+        assert proposal.accepted_warranties_count == 1
 
     def test_process_added_idempotency(self, warranty_added_metadata, proposal, warranty, warranty_handler):
         # store obj to warranty id
@@ -194,20 +290,54 @@ class TestWarrantyHandler:
         assert warranty_handler.process_added(warranty_added_metadata, warranty) is None
         assert proposal.warranties.get(warranty.warranty_id) == {"test": 123}
 
-    def test_process_updated(self, warranty_updated_metadata, proposal, warranty, warranty_handler):
+    def test_process_updated(
+        self, warranty_updated_metadata, proposal, warranty, warranty_data, warranty_handler
+    ):
         # store obj to warranty id
-        proposal.warranties = {warranty.warranty_id: {"test": 123}}
+        warranty_data.update(warranty_value=1, warranty_province="PR")
+        proposal.put_warranty(Warranty(**warranty_data))
+        warranty_handler.stored_proposals.update({proposal.proposal_id: proposal})
+
+        assert warranty_handler.process_updated(warranty_updated_metadata, warranty) is None
+        assert proposal.warranties.get(warranty.warranty_id) is warranty
+        assert warranty.last_event_timestamp == warranty_updated_metadata.event_timestamp
+        assert proposal.accepted_warranties_count == 1
+        assert proposal.accepted_warranties_value == warranty.warranty_value
+
+    def test_process_updated_ignores_late_event(
+        self, warranty_updated_metadata, proposal, warranty, warranty_data, newer_timestamp, warranty_handler
+    ):
+        stored_warranty = Warranty(**warranty_data)
+        stored_warranty.last_event_timestamp = newer_timestamp
+        proposal.put_warranty(stored_warranty)
         warranty_handler.stored_proposals.update({proposal.proposal_id: proposal})
 
         assert warranty_handler.process_updated(warranty_updated_metadata, warranty) is None
+        assert proposal.warranties.get(warranty.warranty_id) is stored_warranty
+
+    def test_process_removed_ignores_late_event(
+        self, warranty_removed_metadata, proposal, warranty, newer_timestamp, warranty_handler
+    ):
+        warranty.last_event_timestamp = newer_timestamp
+        proposal.put_warranty(warranty)
+        warranty_handler.stored_proposals.update({proposal.proposal_id: proposal})
+
+        assert (
+            warranty_handler.process_removed(
+                warranty_removed_metadata, proposal.proposal_id, warranty.warranty_id
+            )
+            is None
+        )
         assert proposal.warranties.get(warranty.warranty_id) is warranty
 
     def test_process_removed(self, warranty_removed_metadata, proposal, warranty, warranty_handler):
         proposal_id = proposal.proposal_id
         warranty_id = warranty.warranty_id
-        proposal.warranties = {warranty_id: warranty}
+        proposal.put_warranty(warranty)
         warranty_handler.stored_proposals.update({proposal_id: proposal})
 
         assert len(proposal.warranties) == 1
         assert warranty_handler.process_removed(warranty_removed_metadata, proposal_id, warranty_id) is None
         assert len(proposal.warranties) == 0
+        assert proposal.accepted_warranties_count == 0
+        assert proposal.accepted_warranties_value == 0
@@ -0,0 +1,183 @@
+import uuid
+
+import pytest
+
+from benchmarks.generator import EventStreamGenerator
+from solution.core import Dispatcher
+from solution.indexes import ProposalIndexes
+from solution.schemas import Proponent, Proposal, Warranty
+from solution.stores import ColumnarProposalStore
+
+
+@pytest.fixture
+def raw_events(raw_events):
+    # test files events followed by a synthetic stream
+    generator = EventStreamGenerator(
+        proposals=300, updates_per_proposal=4, late_event_rate=0.2, delete_rate=0.5, seed=1
+    )
+    return raw_events + generator.generate()
+
+
+@pytest.fixture
+def indexes():
+    return ProposalIndexes()
+
+
+def assert_indexes_match_proposals(indexes, stored_proposals):
+    provinces = {}
+    proponents = {}
+    under_covered_proposals_ids = set()
+    for proposal_id, proposal in stored_proposals.items():
+        for warranty in proposal.warranties.values():
+            provinces.setdefault(warranty.warranty_province, set()).add(proposal_id)
+        for proponent_id in proposal.proponents:
+            proponents[proponent_id] = proposal_id
+        if proposal.accepted_warranties_value < proposal.proposal_loan_value * 2:
+            under_covered_proposals_ids.add(proposal_id)
+
+    assert {province: set(indexes.get_proposals_by_province(province)) for province in provinces} == provinces
+    assert {
+        province: set(proposals_ids) for province, proposals_ids in indexes.provinces.items()
+    } == provinces
+    assert indexes.proponents == proponents
+    assert set(indexes.get_under_covered_proposals()) == under_covered_proposals_ids
+    assert sorted(indexes.get_proposals_by_loan_range()) == sorted(stored_proposals)
+
+    min_value, max_value = 500000.0, 1500000.0
+    assert sorted(indexes.get_proposals_by_loan_range(min_value, max_value)) == sorted(
+        proposal_id
+        for proposal_id, proposal in stored_proposals.items()
+        if min_value <= proposal.proposal_loan_value <= max_value
+    )
+
+
+class TestProposalIndexes:
+    def test_put_and_pop_proposal(self, indexes, proposal, proponent, warranty):
+        proposal.put_proponent(proponent)
+        proposal.put_warranty(warranty)
+        indexes.put_proposal(proposal)
+        indexes.put_proponent(proponent)
+        indexes.put_warranty(proposal, warranty)
+
+        proposal_id = proposal.proposal_id
+        assert indexes.get_proposals_by_province("GO") == [proposal_id]
+        assert indexes.get_proposal_by_proponent(proponent.proponent_id) == proposal_id
+        assert indexes.get_under_covered_proposals() == []
+        assert indexes.get_proposals_by_loan_range(1656233.0, 1656233.0) == [proposal_id]
+
+        indexes.pop_proposal(proposal)
+
+        assert indexes.provinces == {}
+        assert indexes.proponents == {}
+        assert indexes.sorted_loans == []
+        assert indexes.loan_values == {}
+
+    def test_put_proposal_moves_loan_value(self, indexes, proposal_data):
+        proposal = Proposal(**proposal_data)
+        indexes.put_proposal(proposal)
+        proposal_data["proposal_loan_value"] = "10.0"
+        indexes.put_proposal(Proposal(**proposal_data))
+
+        assert indexes.sorted_loans == [(10.0, proposal.proposal_id)]
+        assert indexes.get_proposals_by_loan_range(max_value=100.0) == [proposal.proposal_id]
+        assert indexes.get_proposals_by_loan_range(min_value=100.0) == []
+
+    def test_loan_range_is_inclusive_with_same_values(self, indexes, proposal_data):
+        proposals_ids = []
+        for _ in range(3):
+            proposal_data["proposal_id"] = str(uuid.uuid4())
+            proposal = Proposal(**proposal_data)
+            indexes.put_proposal(proposal)
+            proposals_ids.append(proposal.proposal_id)
+
+        loan_value = proposal.proposal_loan_value
+        assert sorted(indexes.get_proposals_by_loan_range(loan_value, loan_value)) == sorted(proposals_ids)
+        assert indexes.get_proposals_by_loan_range(loan_value + 0.01) == []
+        assert indexes.get_proposals_by_loan_range(max_value=loan_value - 0.01) == []
+
+    def test_warranty_province_counts(self, indexes, proposal, warranty_data):
+        first_warranty = Warranty(**warranty_data)
+        warranty_data["warranty_id"] = str(uuid.uuid4())
+        second_warranty = Warranty(**warranty_data)
+        for warranty in (first_warranty, second_warranty):
+            proposal.put_warranty(warranty)
+            indexes.put_warranty(proposal, warranty)
+
+        proposal.pop_warranty(first_warranty.warranty_id)
+        indexes.pop_warranty(proposal, first_warranty)
+        assert indexes.get_proposals_by_province("GO") == [proposal.proposal_id]
+
+        warranty_data["warranty_province"] = "SP"
+        moved_warranty = Warranty(**warranty_data)
+        proposal.put_warranty(moved_warranty)
+        indexes.put_warranty(proposal, moved_warranty, previous_province="GO")
+        assert indexes.get_proposals_by_province("GO") == []
+        assert indexes.get_proposals_by_province("SP") == [proposal.proposal_id]
+
+    def test_coverage(self, indexes, proposal, warranty_data):
+        indexes.put_proposal(proposal)
+        assert indexes.get_under_covered_proposals() == [proposal.proposal_id]
+
+        warranty = Warranty(**warranty_data)
+        proposal.put_warranty(warranty)
+        indexes.put_warranty(proposal, warranty)
+        assert indexes.get_under_covered_proposals() == []
+
+        proposal.pop_warranty(warranty.warranty_id)
+        indexes.pop_warranty(proposal, warranty)
+        assert indexes.get_under_covered_proposals() == [proposal.proposal_id]
+
+    def test_coverage_multiplier(self, proposal, warranty):
+        indexes = ProposalIndexes(coverage_multiplier=3)
+        proposal.put_warranty(warranty)
+        indexes.put_proposal(proposal)
+
+        assert indexes.get_under_covered_proposals() == [proposal.proposal_id]
+
+    def test_pop_proponent_of_other_proposal(self, indexes, proponent_data):
+        proponent = Proponent(**proponent_data)
+        indexes.put_proponent(proponent)
+        indexes.pop_proponent(uuid.uuid4(), proponent.proponent_id)
+
+        assert indexes.get_proposal_by_proponent(proponent.proponent_id) == proponent.proposal_id
+
+
+@pytest.mark.parametrize("mode", [{}, {"trusted": True}, {"lazy": True}])
+@pytest.mark.parametrize("store_class", [dict, ColumnarProposalStore])
+def test_handlers_keep_indexes_up_to_date(raw_events, mode, store_class):
+    dispatcher = Dispatcher(stored_proposals=store_class(), indexes=ProposalIndexes(), **mode)
+
+    for index, raw_event in enumerate(raw_events):
+        dispatcher.dispatch(raw_event)
+        if index % 500 == 0:
+            assert_indexes_match_proposals(dispatcher.indexes, dispatcher.stored_proposals)
+
+    assert_indexes_match_proposals(dispatcher.indexes, dispatcher.stored_proposals)
+
+
+def test_restore_rebuilds_indexes(raw_events, tmp_path):
+    dispatcher = Dispatcher(trusted=True)
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+    dispatcher.snapshot(tmp_path / "dispatcher.snapshot")
+
+    restored_dispatcher = Dispatcher(trusted=True, indexes=ProposalIndexes())
+    restored_dispatcher.restore(tmp_path / "dispatcher.snapshot")
+
+    assert_indexes_match_proposals(restored_dispatcher.indexes, restored_dispatcher.stored_proposals)
+
+
+@pytest.mark.parametrize("mode", [{}, {"trusted": True}, {"lazy": True}])
+def test_setting_indexes_keeps_them_up_to_date(raw_events, mode):
+    dispatcher = Dispatcher(**mode)
+    middle = len(raw_events) // 2
+    for raw_event in raw_events[:middle]:
+        dispatcher.dispatch(raw_event)
+
+    dispatcher.indexes = ProposalIndexes()
+    assert_indexes_match_proposals(dispatcher.indexes, dispatcher.stored_proposals)
+
+    for raw_event in raw_events[middle:]:
+        dispatcher.dispatch(raw_event)
+
+    assert_indexes_match_proposals(dispatcher.indexes, dispatcher.stored_proposals)
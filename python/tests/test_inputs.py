@@ -0,0 +1,129 @@
+import gzip
+import os
+import shutil
+import sys
+from itertools import chain
+from unittest import mock
+
+import pytest
+
+from solution.core import read_events_iter
+from solution.inputs import (
+    expand_paths,
+    iter_input_lines,
+    iter_lines_in_background,
+    open_input,
+    read_events_files,
+)
+
+INPUT_PATHS = [f"../test/input/input{index:03}.txt" for index in range(0, 4)]
+
+
+@pytest.fixture
+def input_directory(tmp_path):
+    # plain and gzip copies of the same inputs
+    for path in INPUT_PATHS:
+        filename = os.path.basename(path)
+        shutil.copy(path, tmp_path / filename)
+        with open(path, "rb") as input_file, gzip.open(tmp_path / f"{filename}.gz", "wb") as gzip_file:
+            shutil.copyfileobj(input_file, gzip_file)
+
+    return tmp_path
+
+
+def read_plain_inputs(paths):
+    input_files = [open(path, "r") for path in paths]
+    try:
+        return read_events_iter(chain.from_iterable(input_files))
+    finally:
+        for input_file in input_files:
+            input_file.close()
+
+
+def test_expand_paths(input_directory):
+    pattern = str(input_directory / "input00[0-1].txt")
+    first_path = str(input_directory / "input000.txt")
+
+    assert expand_paths([first_path, pattern]) == [
+        first_path,
+        str(input_directory / "input001.txt"),
+    ]
+
+
+def test_expand_paths_raises_without_matches(input_directory):
+    with pytest.raises(FileNotFoundError):
+        expand_paths([str(input_directory / "*.zip")])
+
+
+def test_open_input_gzip(input_directory):
+    with open_input(str(input_directory / "input000.txt.gz")) as gzip_file, open(
+        INPUT_PATHS[0]
+    ) as input_file:
+        assert gzip_file.read() == input_file.read()
+
+
+def test_open_input_zstd(input_directory):
+    zstandard = pytest.importorskip("zstandard")
+    path = str(input_directory / "input000.txt.zst")
+    with open(INPUT_PATHS[0], "rb") as input_file, open(path, "wb") as zstd_file:
+        zstd_file.write(zstandard.ZstdCompressor().compress(input_file.read()))
+
+    with open_input(path) as zstd_file, open(INPUT_PATHS[0]) as input_file:
+        assert zstd_file.read() == input_file.read()
+
+
+def test_open_input_zstd_requires_zstandard(input_directory):
+    path = str(input_directory / "input000.txt.zst")
+
+    # a None entry makes the import fail
+    with mock.patch.dict(sys.modules, {"zstandard": None}):
+        with pytest.raises(ImportError, match="requires zstandard"):
+            open_input(path)
+
+
+def test_iter_input_lines_chains_files(input_directory):
+    lines = list(iter_input_lines([str(input_directory / "input00[0-1].txt.gz")]))
+
+    with open(INPUT_PATHS[0]) as first_file, open(INPUT_PATHS[1]) as second_file:
+        assert lines == first_file.readlines() + second_file.readlines()
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 10000))
+def test_iter_lines_in_background(chunk_size):
+    lines = [f"line {index}\n" for index in range(100)]
+
+    assert list(iter_lines_in_background(iter(lines), queue_size=2, chunk_size=chunk_size)) == lines
+
+
+def test_iter_lines_in_background_raises_reader_errors():
+    def lines():
+        yield "line\n"
+        raise OSError("broken file")
+
+    with pytest.raises(OSError):
+        list(iter_lines_in_background(lines(), chunk_size=1))
+
+
+def test_iter_lines_in_background_stops_reader_early():
+    closed = []
+
+    def lines():
+        try:
+            for index in range(100000):
+                yield f"line {index}\n"
+        finally:
+            closed.append(True)
+
+    background_lines = iter_lines_in_background(lines(), queue_size=1, chunk_size=10)
+    assert next(background_lines) == "line 0\n"
+    background_lines.close()
+
+    assert closed == [True]
+
+
+@pytest.mark.parametrize("background", (False, True))
+@pytest.mark.parametrize("extension", ("txt", "txt.gz"))
+def test_read_events_files(background, extension, input_directory):
+    paths = [str(input_directory / f"input00*.{extension}")]
+
+    assert read_events_files(paths, background=background) == read_plain_inputs(INPUT_PATHS)
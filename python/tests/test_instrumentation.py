@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from solution.core import Dispatcher
+from solution.exceptions import ReferenceDoesNotExist
+from solution.instrumentation import STAGES, Instrumentation
+from solution.wal import WriteAheadLog
+
+
+@pytest.fixture
+def instrumentation():
+    return Instrumentation()
+
+
+def test_dispatcher_without_instrumentation_uses_plain_dispatch():
+    dispatcher = Dispatcher()
+
+    assert dispatcher.instrumentation is None
+    assert "dispatch" not in vars(dispatcher)
+
+
+@pytest.mark.parametrize("trusted", (False, True))
+def test_instrumented_dispatcher_has_same_result(trusted, raw_events, instrumentation):
+    dispatcher = Dispatcher(trusted=trusted)
+    instrumented_dispatcher = Dispatcher(trusted=trusted, instrumentation=instrumentation)
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+        instrumented_dispatcher.dispatch(raw_event)
+
+    assert instrumented_dispatcher.get_valid_proposals() == dispatcher.get_valid_proposals()
+    assert instrumentation.dedup_checks == len(raw_events)
+    assert instrumentation.dedup_hits == len(raw_events) - len(dispatcher.processed_events)
+    assert sum(instrumentation.events.values()) == len(dispatcher.processed_events)
+    assert instrumentation.events[("proposal", "created")] > 0
+    assert instrumentation.validations == 1
+    assert instrumentation.validation_ns > 0
+    assert all(instrumentation.stages_ns[stage] > 0 for stage in STAGES if stage != "wal")
+    assert instrumentation.stages_ns["wal"] == 0
+
+
+def test_instrumented_dispatcher_with_wal(raw_events, instrumentation, tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    dispatcher = Dispatcher(wal=wal, instrumentation=instrumentation)
+    for raw_event in raw_events[:10]:
+        dispatcher.dispatch(raw_event)
+    wal.close()
+
+    assert instrumentation.stages_ns["wal"] > 0
+
+
+def test_instrumented_dispatcher_counts_reference_misses(raw_events, instrumentation):
+    dispatcher = Dispatcher(instrumentation=instrumentation)
+    orphan_event = next(raw_event for raw_event in raw_events if ",warranty,added," in raw_event)
+
+    with pytest.raises(ReferenceDoesNotExist):
+        dispatcher.dispatch(orphan_event)
+
+    assert instrumentation.reference_misses == 1
+    assert sum(instrumentation.events.values()) == 0
+    assert len(dispatcher.processed_events) == 0
+
+
+def test_instrumented_dispatcher_raises_with_unknown_schema(instrumentation, event_data):
+    dispatcher = Dispatcher(instrumentation=instrumentation)
+    raw_event = ",".join(event_data.values())
+
+    with pytest.raises(ValueError):
+        dispatcher.dispatch(raw_event)
+
+
+def test_get_dedup_hit_rate(instrumentation):
+    assert instrumentation.get_dedup_hit_rate() == 0.0
+
+    for is_duplicated in (True, False, False, False):
+        instrumentation.record_dedup(is_duplicated)
+
+    assert instrumentation.get_dedup_hit_rate() == 0.25
+
+
+def test_to_prometheus(instrumentation):
+    instrumentation.record_stage("split", 1500000000)
+    instrumentation.record_event("proposal", "created")
+    instrumentation.record_event("proposal", "created")
+    instrumentation.record_reference_miss()
+
+    lines = instrumentation.to_prometheus().splitlines()
+
+    assert "# TYPE events_stage_seconds_total counter" in lines
+    assert 'events_stage_seconds_total{stage="split"} 1.5' in lines
+    assert 'events_processed_total{schema="proposal",action="created"} 2' in lines
+    assert "events_reference_misses_total 1" in lines
+    assert "events_dedup_hits_total 0" in lines
+
+
+@pytest.mark.parametrize("output_format", ("json", "prometheus"))
+def test_write(output_format, instrumentation, tmp_path):
+    path = str(tmp_path / "metrics")
+    instrumentation.record_event("warranty", "added")
+
+    instrumentation.write(path, output_format)
+
+    with open(path, "r") as metrics_file:
+        content = metrics_file.read()
+
+    if output_format == "json":
+        assert json.loads(content) == instrumentation.to_dict()
+    else:
+        assert content == instrumentation.to_prometheus()
+
+
+def test_write_raises_with_invalid_format(instrumentation, tmp_path):
+    with pytest.raises(ValueError):
+        instrumentation.write(str(tmp_path / "metrics"), "xml")
@@ -0,0 +1,92 @@
+import uuid
+
+import pytest
+
+from solution import interning
+from solution.handlers import TrustedProponentHandler
+from solution.trusted_schemas import TrustedProposal, TrustedWarranty
+
+
+@pytest.fixture(autouse=True)
+def clear_interning():
+    interning.clear()
+    yield
+    interning.clear()
+
+
+def test_build_uuid_from_bytes(proposal_data):
+    proposal_id = uuid.UUID(proposal_data["proposal_id"])
+    built_id = interning.build_uuid_from_bytes(proposal_id.bytes)
+
+    assert built_id == proposal_id
+    assert hash(built_id) == hash(proposal_id)
+    assert str(built_id) == proposal_data["proposal_id"]
+    assert built_id is not interning.build_uuid_from_bytes(proposal_id.bytes)
+
+
+def test_parse_uuid_returns_same_object(proposal_data):
+    proposal_id = interning.parse_uuid(proposal_data["proposal_id"])
+
+    assert proposal_id == uuid.UUID(proposal_data["proposal_id"])
+    assert interning.parse_uuid(proposal_data["proposal_id"]) is proposal_id
+
+
+def test_parse_uuid_raises_on_invalid_value():
+    with pytest.raises(ValueError):
+        interning.parse_uuid("foo")
+
+    assert interning.get_stats()["uuids"]["size"] == 0
+
+
+def test_uuid_from_bytes_returns_same_object(proposal_data):
+    proposal_id_bytes = uuid.UUID(proposal_data["proposal_id"]).bytes
+
+    assert interning.uuid_from_bytes(proposal_id_bytes) is interning.uuid_from_bytes(proposal_id_bytes)
+
+
+def test_intern_string_returns_first_object():
+    province = "".join(["G", "O"])
+    other_province = "".join(["G", "O"])
+
+    assert interning.intern_string(province) is province
+    assert interning.intern_string(other_province) is province
+
+
+def test_get_stats(proposal_data):
+    interning.parse_uuid(proposal_data["proposal_id"])
+    interning.parse_uuid(proposal_data["proposal_id"])
+    interning.parse_uuid(str(uuid.uuid4()))
+    interning.parse_uuid(proposal_data["proposal_id"])
+
+    stats = interning.get_stats()
+
+    assert stats["uuids"] == {
+        "hits": 2,
+        "misses": 2,
+        "size": 2,
+        "max_size": interning.INTERNED_UUIDS_MAX_SIZE,
+        "hit_rate": 0.5,
+    }
+    assert stats["uuids_bytes"]["hit_rate"] == 0.0
+    assert stats["strings"]["max_size"] == interning.INTERNED_STRINGS_MAX_SIZE
+
+
+def test_trusted_schemas_share_proposal_id(proposal_data, warranty_data):
+    proposal = TrustedProposal.build_from_message(list(proposal_data.values()))
+    warranty = TrustedWarranty.build_from_message(list(warranty_data.values()))
+    other_warranty = TrustedWarranty.build_from_message(list(warranty_data.values()))
+
+    assert warranty.proposal_id is proposal.proposal_id
+    assert other_warranty.warranty_province is warranty.warranty_province
+    # children ids rarely repeat and are not interned
+    assert other_warranty.warranty_id is not warranty.warranty_id
+
+
+def test_handler_removed_action_interns_parent_id(proponent_data):
+    message = [proponent_data["proposal_id"], proponent_data["proponent_id"]]
+    handler = TrustedProponentHandler({})
+
+    parent_id, proponent_id = handler.get_message_decoder("removed")(message)
+
+    assert parent_id is interning.parse_uuid(proponent_data["proposal_id"])
+    assert proponent_id == uuid.UUID(proponent_data["proponent_id"])
@@ -0,0 +1,184 @@
+import uuid
+
+import pytest
+
+from solution.lazy_schemas import LazyProponent, LazyProposal, LazyWarranty
+from solution.trusted_schemas import TrustedProponent, TrustedProposal, TrustedWarranty
+
+AGGREGATES_FIELDS = (
+    "main_proponents_ids",
+    "underage_proponents_count",
+    "accepted_warranties_count",
+    "accepted_warranties_value",
+)
+
+
+def assert_same_aggregates(proposal, expected_proposal):
+    for name in AGGREGATES_FIELDS:
+        assert getattr(proposal, name) == getattr(expected_proposal, name)
+
+
+class TestLazyProponent:
+    def test_build_from_message_parses_ids_only(self, proponent_data):
+        message = list(proponent_data.values())
+        proponent = LazyProponent.build_from_message(message)
+        expected_proponent = TrustedProponent.build_from_message(message)
+
+        assert proponent.proposal_id == expected_proponent.proposal_id
+        assert proponent.proponent_id == expected_proponent.proponent_id
+        assert proponent.last_event_timestamp is None
+        assert proponent.is_materialized is False
+
+        assert proponent.proponent_age == expected_proponent.proponent_age
+        assert proponent.is_materialized is True
+        assert proponent.proponent_name == expected_proponent.proponent_name
+        assert proponent.proponent_monthly_income == expected_proponent.proponent_monthly_income
+        assert proponent.proponent_is_main is expected_proponent.proponent_is_main
+
+    def test_materialize(self, proponent_data):
+        proponent = LazyProponent.build_from_message(list(proponent_data.values()))
+
+        assert proponent.materialize() is proponent
+        assert proponent.is_materialized is True
+        assert proponent.proponent_age == 35
+
+    def test_unknown_attribute(self, proponent_data):
+        proponent = LazyProponent.build_from_message(list(proponent_data.values()))
+
+        with pytest.raises(AttributeError):
+            proponent.foo
+
+        assert proponent.is_materialized is False
+
+    def test_has_no_instance_dict(self, proponent_data):
+        proponent = LazyProponent.build_from_message(list(proponent_data.values()))
+
+        assert not hasattr(proponent, "__dict__")
+
+
+class TestLazyWarranty:
+    def test_build_from_message_parses_ids_only(self, warranty_data):
+        message = list(warranty_data.values())
+        warranty = LazyWarranty.build_from_message(message)
+        expected_warranty = TrustedWarranty.build_from_message(message)
+
+        assert warranty.proposal_id == expected_warranty.proposal_id
+        assert warranty.warranty_id == expected_warranty.warranty_id
+        assert warranty.is_materialized is False
+
+        assert warranty.warranty_province == expected_warranty.warranty_province
+        assert warranty.warranty_value == expected_warranty.warranty_value
+        assert warranty.is_materialized is True
+
+    def test_init_is_materialized(self, warranty):
+        lazy_warranty = LazyWarranty(
+            proposal_id=warranty.proposal_id,
+            warranty_id=warranty.warranty_id,
+            warranty_value=warranty.warranty_value,
+            warranty_province=warranty.warranty_province,
+        )
+
+        assert lazy_warranty.is_materialized is True
+        assert lazy_warranty.warranty_value == warranty.warranty_value
+
+
+class TestLazyProposal:
+    def test_build_from_message_parses_ids_only(self, proposal_data):
+        message = list(proposal_data.values())
+        proposal = LazyProposal.build_from_message(message)
+        expected_proposal = TrustedProposal.build_from_message(message)
+
+        assert proposal.proposal_id == expected_proposal.proposal_id
+        assert proposal.warranties == {}
+        assert proposal.proponents == {}
+        assert proposal.is_materialized is False
+
+        assert proposal.proposal_loan_value == expected_proposal.proposal_loan_value
+        assert (
+            proposal.proposal_number_of_monthly_installments
+            == expected_proposal.proposal_number_of_monthly_installments
+        )
+        assert proposal.is_materialized is True
+        assert_same_aggregates(proposal, expected_proposal)
+
+    def test_put_relateds_keeps_them_unparsed(self, proposal_data, proponent_data, warranty_data):
+        proposal = LazyProposal.build_from_message(list(proposal_data.values()))
+        proponent = LazyProponent.build_from_message(list(proponent_data.values()))
+        warranty = LazyWarranty.build_from_message(list(warranty_data.values()))
+        proposal.put_proponent(proponent)
+        proposal.put_warranty(warranty)
+
+        assert proponent.is_materialized is False
+        assert warranty.is_materialized is False
+
+        # proponents aggregates don't parse the warranties
+        assert proposal.main_proponents_ids == {proponent.proponent_id}
+        assert proponent.is_materialized is True
+        assert warranty.is_materialized is False
+
+        assert proposal.accepted_warranties_count == 1
+        assert warranty.is_materialized is True
+
+    def test_aggregates_match_trusted_proposal(self, proposal_data, proponent_data, warranty_data):
+        lazy_proposal = LazyProposal.build_from_message(list(proposal_data.values()))
+        trusted_proposal = TrustedProposal.build_from_message(list(proposal_data.values()))
+
+        proponent_data["proponent_is_main"] = "false"
+        proponent_data["proponent_age"] = "17"
+        warranty_data["warranty_province"] = "PR"
+        messages = [("proponent", list(proponent_data.values())), ("warranty", list(warranty_data.values()))]
+        for _ in range(3):
+            proponent_data["proponent_id"] = str(uuid.uuid4())
+            warranty_data["warranty_id"] = str(uuid.uuid4())
+            proponent_data["proponent_is_main"] = "true"
+            proponent_data["proponent_age"] = "35"
+            warranty_data["warranty_province"] = "GO"
+            messages.append(("proponent", list(proponent_data.values())))
+            messages.append(("warranty", list(warranty_data.values())))
+
+        for proposal, proponent_class, warranty_class in (
+            (lazy_proposal, LazyProponent, LazyWarranty),
+            (trusted_proposal, TrustedProponent, TrustedWarranty),
+        ):
+            for schema, message in messages:
+                if schema == "proponent":
+                    proposal.put_proponent(proponent_class.build_from_message(message))
+                else:
+                    proposal.put_warranty(warranty_class.build_from_message(message))
+
+        assert_same_aggregates(lazy_proposal, trusted_proposal)
+
+        # changes after a read drop the aggregates
+        for proposal in (lazy_proposal, trusted_proposal):
+            proposal.pop_proponent(uuid.UUID(messages[0][1][1]))
+            proposal.pop_warranty(uuid.UUID(messages[3][1][1]))
+
+        assert_same_aggregates(lazy_proposal, trusted_proposal)
+        assert lazy_proposal.is_valid() is trusted_proposal.is_valid()
+
+    def test_inherit_relateds(self, proposal_data, proponent_data):
+        proposal = LazyProposal.build_from_message(list(proposal_data.values()))
+        proposal.put_proponent(LazyProponent.build_from_message(list(proponent_data.values())))
+        assert len(proposal.main_proponents_ids) == 1
+
+        proposal_data["proposal_loan_value"] = "10.0"
+        updated_proposal = LazyProposal.build_from_message(list(proposal_data.values()))
+        updated_proposal.inherit_relateds(proposal)
+
+        assert updated_proposal.proponents is proposal.proponents
+        assert updated_proposal.main_proponents_ids == proposal.main_proponents_ids
+        assert updated_proposal.proposal_loan_value == 10.0
+
+    def test_init_is_materialized(self, proposal, proponent_data):
+        lazy_proposal = LazyProposal(
+            proposal_id=proposal.proposal_id,
+            proposal_loan_value=proposal.proposal_loan_value,
+            proposal_number_of_monthly_installments=proposal.proposal_number_of_monthly_installments,
+        )
+
+        assert lazy_proposal.is_materialized is True
+        assert lazy_proposal.main_proponents_ids == set()
+
+        proponent = LazyProponent.build_from_message(list(proponent_data.values()))
+        lazy_proposal.put_proponent(proponent)
+        assert lazy_proposal.main_proponents_ids == {proponent.proponent_id}
@@ -0,0 +1,190 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from solution.core import Dispatcher, get_action_proposal_id, iter_raw_events
+from solution.exceptions import ReferenceDoesNotExist
+from solution.instrumentation import Instrumentation
+from solution.pending import PendingEventsBuffer
+from solution.trusted_schemas import TrustedEventMetadata
+
+
+@pytest.fixture
+def event_timestamp():
+    return datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def metadata_factory(event_timestamp, event_schema="proponent", event_action="added"):
+    return TrustedEventMetadata(
+        event_id=str(uuid.uuid4()),
+        event_schema=event_schema,
+        event_action=event_action,
+        event_timestamp=event_timestamp.isoformat(),
+    )
+
+
+def get_proposal_raw_events(proposal_id):
+    # events of a proposal from input000, in the original order
+    with open("../test/input/input000.txt", "r") as input_file:
+        return [raw_event for raw_event in iter_raw_events(input_file) if proposal_id in raw_event]
+
+
+class TestPendingEventsBuffer:
+    def test_park_and_drain_in_timestamp_order(self, event_timestamp):
+        pending_events = PendingEventsBuffer()
+        proposal_id = uuid.uuid4()
+        newer_metadata = metadata_factory(event_timestamp + timedelta(seconds=1), event_action="removed")
+        older_metadata = metadata_factory(event_timestamp)
+        same_time_metadata = metadata_factory(event_timestamp, event_action="updated")
+
+        pending_events.park(proposal_id, newer_metadata, ["newer"])
+        pending_events.park(proposal_id, older_metadata, ["older"])
+        pending_events.park(proposal_id, same_time_metadata, ["same time"])
+
+        assert proposal_id in pending_events
+        assert len(pending_events) == 3
+        assert pending_events.drain(proposal_id) == [
+            (older_metadata, ["older"]),
+            (same_time_metadata, ["same time"]),
+            (newer_metadata, ["newer"]),
+        ]
+        assert proposal_id not in pending_events
+        assert len(pending_events) == 0
+        assert pending_events.drain(proposal_id) == []
+        assert pending_events.get_metrics() == {"pending": 0, "parked": 3, "drained": 3, "expired": 0}
+
+    def test_expire_by_size(self, event_timestamp):
+        pending_events = PendingEventsBuffer(max_events=2)
+        proposals_ids = [uuid.uuid4() for _ in range(3)]
+
+        for proposal_id in proposals_ids:
+            pending_events.park(proposal_id, metadata_factory(event_timestamp), [])
+            pending_events.expire(event_timestamp)
+
+        assert len(pending_events) == 2
+        assert proposals_ids[0] not in pending_events
+        assert pending_events.get_metrics() == {"pending": 2, "parked": 3, "drained": 0, "expired": 1}
+
+    def test_expire_by_age(self, event_timestamp):
+        pending_events = PendingEventsBuffer(max_age=timedelta(minutes=5))
+        old_proposal_id = uuid.uuid4()
+        proposal_id = uuid.uuid4()
+
+        pending_events.park(old_proposal_id, metadata_factory(event_timestamp), [])
+        pending_events.park(proposal_id, metadata_factory(event_timestamp + timedelta(minutes=5)), [])
+        assert len(pending_events) == 2
+
+        pending_events.expire(event_timestamp + timedelta(minutes=6))
+
+        assert old_proposal_id not in pending_events
+        assert proposal_id in pending_events
+        assert pending_events.expired_count == 1
+
+    def test_drained_events_are_not_expired(self, event_timestamp):
+        pending_events = PendingEventsBuffer(max_age=timedelta(minutes=5))
+        proposal_id = uuid.uuid4()
+        pending_events.park(proposal_id, metadata_factory(event_timestamp), [])
+        pending_events.drain(proposal_id)
+
+        pending_events.expire(event_timestamp + timedelta(hours=1))
+
+        assert pending_events.expired_count == 0
+        assert len(pending_events.parking_queue) == 0
+
+
+def test_dispatcher_raises_orphan_events_without_pending_buffer():
+    raw_events = get_proposal_raw_events("80921e5f-4307-4623-9ddb-5bf826a31dd7")
+
+    with pytest.raises(ReferenceDoesNotExist) as error:
+        Dispatcher().dispatch(raw_events[1])
+
+    assert error.value.proposal_id == uuid.UUID("80921e5f-4307-4623-9ddb-5bf826a31dd7")
+
+
+@pytest.mark.parametrize("trusted", (False, True))
+def test_dispatcher_parks_orphan_events_until_proposal_is_created(trusted):
+    proposal_id = "52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6"
+    raw_events = get_proposal_raw_events(proposal_id)
+    pending_events = PendingEventsBuffer()
+    dispatcher = Dispatcher(trusted=trusted, pending_events=pending_events)
+
+    # children arrive in reverse order before the proposal
+    for raw_event in reversed(raw_events[1:]):
+        dispatcher.dispatch(raw_event)
+
+    assert dispatcher.stored_proposals == {}
+    assert len(pending_events) == len(raw_events) - 1
+    assert len(dispatcher.processed_events) == len(raw_events) - 1
+
+    dispatcher.dispatch(raw_events[0])
+
+    assert dispatcher.get_valid_proposals() == [proposal_id]
+    assert pending_events.get_metrics() == {
+        "pending": 0,
+        "parked": len(raw_events) - 1,
+        "drained": len(raw_events) - 1,
+        "expired": 0,
+    }
+
+
+@pytest.mark.parametrize("mode", [{}, {"trusted": True}, {"lazy": True}])
+def test_dispatch_many_parks_orphan_events_with_their_action_arguments(mode):
+    proposal_id = "52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6"
+    raw_events = get_proposal_raw_events(proposal_id)
+    pending_events = PendingEventsBuffer()
+    dispatcher = Dispatcher(pending_events=pending_events, **mode)
+
+    dispatcher.dispatch_many(raw_events[1:])
+
+    # parked events keep the decoded arguments, not decoded again when drained
+    for _, (_, _, _, action_args) in pending_events.parking_queue:
+        assert type(action_args) is tuple
+        assert get_action_proposal_id(action_args) == uuid.UUID(proposal_id)
+
+    dispatcher.dispatch_many(raw_events[:1])
+
+    assert dispatcher.get_valid_proposals() == [proposal_id]
+    assert len(pending_events) == 0
+
+
+@pytest.mark.parametrize("dispatch_many", (False, True))
+def test_dispatcher_expires_orphan_events_with_later_events(dispatch_many):
+    raw_events = get_proposal_raw_events("52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6")
+    pending_events = PendingEventsBuffer(max_age=timedelta(hours=1))
+    dispatcher = Dispatcher(trusted=True, pending_events=pending_events)
+    # a proposal of another day, not an orphan event
+    later_event = f"{uuid.uuid4()},proposal,created,2030-01-01T00:00:00Z,{uuid.uuid4()},1141424.0,240"
+
+    if dispatch_many:
+        dispatcher.dispatch_many([raw_events[1], later_event])
+    else:
+        dispatcher.dispatch(raw_events[1])
+        dispatcher.dispatch(later_event)
+
+    assert len(pending_events) == 0
+    assert pending_events.get_metrics() == {"pending": 0, "parked": 1, "drained": 0, "expired": 1}
+
+
+def test_dispatcher_does_not_park_duplicated_events():
+    raw_events = get_proposal_raw_events("52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6")
+    pending_events = PendingEventsBuffer()
+    dispatcher = Dispatcher(pending_events=pending_events)
+
+    dispatcher.dispatch(raw_events[1])
+    dispatcher.dispatch(raw_events[1])
+
+    assert len(pending_events) == 1
+
+
+def test_instrumented_dispatcher_parks_orphan_events():
+    proposal_id = "52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6"
+    raw_events = get_proposal_raw_events(proposal_id)
+    instrumentation = Instrumentation()
+    dispatcher = Dispatcher(pending_events=PendingEventsBuffer(), instrumentation=instrumentation)
+
+    for raw_event in raw_events[1:] + raw_events[:1]:
+        dispatcher.dispatch(raw_event)
+
+    assert dispatcher.get_valid_proposals() == [proposal_id]
+    assert instrumentation.reference_misses == len(raw_events) - 1
@@ -0,0 +1,99 @@
+from unittest import mock
+
+import pytest
+
+from solution.core import Dispatcher
+from solution.rules import RuleEngine
+from solution.validations import VALIDATIONS
+
+
+def rule_factory(name, result):
+    rule = mock.Mock(return_value=result)
+    rule.__name__ = name
+    return rule
+
+
+@pytest.fixture
+def rules():
+    return (rule_factory("first", True), rule_factory("second", False), rule_factory("third", True))
+
+
+def test_rule_engine_default_order():
+    rule_engine = RuleEngine()
+
+    assert rule_engine.order == [rule.__name__ for rule in VALIDATIONS]
+
+
+def test_rule_engine_given_order(rules):
+    rule_engine = RuleEngine(rules, order=["third"])
+
+    assert rule_engine.order == ["third", "first", "second"]
+
+
+def test_rule_engine_raises_with_unknown_rule(rules):
+    with pytest.raises(ValueError):
+        RuleEngine(rules, order=["foo"])
+
+
+def test_rule_engine_short_circuits_and_counts_rejections(rules, proposal):
+    rule_engine = RuleEngine(rules)
+
+    assert rule_engine.is_valid(proposal) is False
+    assert rule_engine.is_valid(proposal) is False
+    assert rules[0].call_count == 2
+    assert rules[1].call_count == 2
+    assert rules[2].called is False
+    assert rule_engine.checked_proposals == 2
+    assert rule_engine.rejections == {"first": 0, "second": 2, "third": 0}
+    assert rule_engine.get_stats() == [
+        {"rule": "first", "evaluations": 2, "rejections": 0, "rejection_rate": 0.0, "cost_ns": None},
+        {"rule": "second", "evaluations": 2, "rejections": 2, "rejection_rate": 1.0, "cost_ns": None},
+        {"rule": "third", "evaluations": 0, "rejections": 0, "rejection_rate": 0.0, "cost_ns": None},
+    ]
+
+
+def test_rule_engine_evaluate_does_not_count(rules, proposal):
+    rule_engine = RuleEngine(rules)
+
+    assert rule_engine.evaluate(proposal) is False
+    assert rules[2].called is False
+    assert rule_engine.checked_proposals == 0
+    assert rule_engine.rejections == {"first": 0, "second": 0, "third": 0}
+
+
+def test_rule_engine_calibrate_puts_rejecting_rules_first(rules, proposal):
+    rule_engine = RuleEngine(rules)
+
+    order = rule_engine.calibrate([proposal, proposal])
+
+    assert order[0] == "second"
+    assert set(order) == {"first", "second", "third"}
+    assert all(stats["cost_ns"] is not None for stats in rule_engine.get_stats())
+    assert rule_engine.checked_proposals == 0
+
+
+def test_rule_engine_calibrate_without_proposals(rules):
+    rule_engine = RuleEngine(rules)
+
+    assert rule_engine.calibrate([]) == ["first", "second", "third"]
+
+
+@pytest.mark.parametrize("trusted", (False, True))
+def test_rule_engine_order_does_not_change_results(trusted, raw_events):
+    dispatcher = Dispatcher(trusted=trusted)
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+
+    proposals = list(dispatcher.stored_proposals.values())
+    expected = [str(proposal.proposal_id) for proposal in proposals if proposal.is_valid()]
+    assert dispatcher.get_valid_proposals() == expected
+
+    dispatcher.rule_engine.calibrate(proposals)
+    assert dispatcher.get_valid_proposals() == expected
+
+    reversed_order = list(reversed(dispatcher.rule_engine.order))
+    dispatcher.rule_engine.compile(reversed_order)
+    assert dispatcher.rule_engine.order == reversed_order
+    assert dispatcher.get_valid_proposals() == expected
+    assert dispatcher.rule_engine.checked_proposals == len(proposals)
+    assert sum(dispatcher.rule_engine.rejections.values()) == len(proposals) - len(expected)
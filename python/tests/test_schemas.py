@@ -15,6 +15,21 @@ class TesteEventMetadata:
         assert event.event_action == event_data["event_action"]
         assert event.event_timestamp.isoformat().replace("+00:00", "Z") == event_data["event_timestamp"]
 
+    def test_iter_from_raw_events(self, event_data):
+        raw_event = ",".join(event_data.values())
+
+        assert list(EventMetadata.iter_from_raw_events([raw_event + ",foo,bar", raw_event])) == [
+            (["foo", "bar"], EventMetadata(**event_data)),
+            ([], EventMetadata(**event_data)),
+        ]
+
+    def test_interns_schema_and_action(self, event_data):
+        raw_event = ",".join(event_data.values())
+        (_, event), (_, other_event) = EventMetadata.iter_from_raw_events([raw_event, raw_event])
+
+        assert other_event.event_schema is event.event_schema
+        assert other_event.event_action is event.event_action
+
 
 class TestProponent:
     def test_parse(self, proponent_data):
@@ -0,0 +1,220 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.generator import EventStreamGenerator
+from solution.async_core import AsyncDispatcher
+from solution.core import Dispatcher, read_events
+from solution.server import EventServer, parse_address, parse_args
+
+
+@pytest.fixture
+def raw_events():
+    with open("../test/input/input000.txt", "r") as input_file:
+        return input_file.read().split("\n")
+
+
+async def send_events(reader, writer, raw_events, line_break="\n"):
+    # pipelined, all events are written before reading any ack
+    writer.write(line_break.join(raw_events).encode("utf-8"))
+    await writer.drain()
+    writer.write_eof()
+
+    acks = [line.decode("utf-8").strip() for line in await read_lines(reader)]
+    writer.close()
+    await writer.wait_closed()
+    return acks
+
+
+async def read_lines(reader):
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            return lines
+        lines.append(line)
+
+
+async def http_get(port, target, method="GET"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii"))
+    await writer.drain()
+
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+    head, body = response.split(b"\r\n\r\n", 1)
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(body)
+
+
+def get_port(server):
+    return server.sockets[0].getsockname()[1]
+
+
+def test_tcp_producer_gets_acks_and_http_serves_valid_proposals(raw_events):
+    async def run():
+        server = EventServer(AsyncDispatcher(batch_size=4))
+        events_server = await server.start_tcp()
+        http_server = await server.start_http()
+        try:
+            acks = await send_events(
+                *await asyncio.open_connection("127.0.0.1", get_port(events_server)), raw_events
+            )
+            response = await http_get(get_port(http_server), "/valid-proposals")
+        finally:
+            await server.close()
+
+        return acks, response
+
+    acks, (status, body) = asyncio.run(run())
+
+    assert acks[-1] == f"ACK {len(raw_events)}"
+    assert all(ack.startswith("ACK ") for ack in acks)
+    assert status == 200
+    assert ",".join(body["valid_proposals"]) == read_events("\n".join(raw_events))
+
+
+def test_unix_producer(raw_events, tmp_path):
+    path = str(tmp_path / "events.sock")
+
+    async def run():
+        server = EventServer()
+        await server.start_unix(path)
+        try:
+            acks = await send_events(*await asyncio.open_unix_connection(path), raw_events)
+            valid_proposals = await server.async_dispatcher.get_valid_proposals()
+        finally:
+            await server.close()
+
+        return acks, valid_proposals
+
+    acks, valid_proposals = asyncio.run(run())
+
+    assert acks[-1] == f"ACK {len(raw_events)}"
+    assert ",".join(valid_proposals) == read_events("\n".join(raw_events))
+
+
+def test_producer_with_crlf_line_breaks():
+    raw_events = EventStreamGenerator(proposals=50, seed=1).generate()
+
+    async def run():
+        server = EventServer(AsyncDispatcher(Dispatcher(trusted=True), batch_size=8))
+        events_server = await server.start_tcp()
+        try:
+            acks = await send_events(
+                *await asyncio.open_connection("127.0.0.1", get_port(events_server)),
+                raw_events + [""],
+                line_break="\r\n",
+            )
+            valid_proposals = await server.async_dispatcher.get_valid_proposals()
+        finally:
+            await server.close()
+
+        return acks, valid_proposals
+
+    acks, valid_proposals = asyncio.run(run())
+
+    assert acks[-1] == f"ACK {len(raw_events)}"
+    assert ",".join(valid_proposals) == read_events("\n".join(raw_events), trusted=True)
+
+
+def test_many_concurrent_producers():
+    raw_events = EventStreamGenerator(proposals=400, seed=1).generate()
+    # each producer sends the events of its proposals, keeping their order
+    producers_events = [[] for _ in range(8)]
+    for raw_event in raw_events:
+        proposal_id = raw_event.split(",")[4]
+        producers_events[hash(proposal_id) % len(producers_events)].append(raw_event)
+
+    async def run():
+        server = EventServer(AsyncDispatcher(Dispatcher(trusted=True), batch_size=50))
+        events_server = await server.start_tcp()
+        try:
+            producers = [
+                send_events(*await asyncio.open_connection("127.0.0.1", get_port(events_server)), events)
+                for events in producers_events
+            ]
+            producers_acks = await asyncio.gather(*producers)
+            valid_proposals = await server.async_dispatcher.get_valid_proposals()
+            stats = await server.get_stats()
+        finally:
+            await server.close()
+
+        return producers_acks, valid_proposals, stats
+
+    producers_acks, valid_proposals, stats = asyncio.run(run())
+
+    for acks, events in zip(producers_acks, producers_events):
+        assert acks[-1] == f"ACK {len(events)}"
+    assert sorted(valid_proposals) == sorted(read_events("\n".join(raw_events), trusted=True).split(","))
+    assert stats["connections"] == 8
+    assert stats["active_connections"] == 0
+    assert stats["committed_events"] == len(raw_events)
+    assert stats["acks"] == sum(len(acks) for acks in producers_acks)
+
+
+def test_producer_error_keeps_previous_events(raw_events):
+    async def run():
+        server = EventServer(AsyncDispatcher(batch_size=100))
+        events_server = await server.start_tcp()
+        try:
+            acks = await send_events(
+                *await asyncio.open_connection("127.0.0.1", get_port(events_server)),
+                raw_events[:3] + ["not,an,event"],
+            )
+            stats = await server.get_stats()
+        finally:
+            await server.close()
+
+        return acks, stats, server.dispatcher
+
+    acks, stats, dispatcher = asyncio.run(run())
+
+    # the reads decide how the events are batched
+    assert all(ack.startswith("ACK ") for ack in acks[:-1])
+    assert acks[-1].startswith("ERROR ValueError")
+    assert stats["errors"] == 1
+    assert len(dispatcher.processed_events) == 3
+
+
+def test_http_errors_and_stats(raw_events):
+    async def run():
+        server = EventServer()
+        http_server = await server.start_http()
+        port = get_port(http_server)
+        try:
+            responses = [
+                await http_get(port, "/stats?pretty=1"),
+                await http_get(port, "/unknown"),
+                await http_get(port, "/stats", method="POST"),
+            ]
+        finally:
+            await server.close()
+
+        return responses
+
+    (stats_status, stats), (not_found_status, _), (not_allowed_status, _) = asyncio.run(run())
+
+    assert stats_status == 200
+    assert stats["committed_events"] == 0
+    assert stats["http_requests"] == 1
+    assert not_found_status == 404
+    assert not_allowed_status == 405
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:8000") == ("127.0.0.1", 8000)
+
+
+def test_parse_args_requires_an_events_listener():
+    with pytest.raises(SystemExit):
+        parse_args(["--http", "127.0.0.1:8000"])
+
+    args = parse_args(["--unix", "/tmp/events.sock", "--trusted"])
+    assert args.unix == "/tmp/events.sock"
+    assert args.trusted is True
+    assert args.park_orphans is False
+    assert parse_args(["--tcp", "127.0.0.1:9000", "--park-orphans"]).park_orphans is True
@@ -0,0 +1,182 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from solution.core import Dispatcher
+from solution.deduplication import BloomFilterProcessedEvents, ProcessedEventsSet, TimeWindowProcessedEvents
+from solution.pending import PendingEventsBuffer
+from solution.snapshots import HEADER, PENDING_EVENTS_HEADER, micros_to_timestamp, timestamp_to_micros
+from solution.stores import ColumnarProposalStore
+
+from .test_pending import get_proposal_raw_events
+
+PROPOSAL_ID = "52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6"
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "dispatcher.snapshot")
+
+
+def assert_same_state(dispatcher, restored_dispatcher):
+    assert list(restored_dispatcher.stored_proposals) == list(dispatcher.stored_proposals)
+    assert restored_dispatcher.get_valid_proposals() == dispatcher.get_valid_proposals()
+
+    for proposal_id, proposal in dispatcher.stored_proposals.items():
+        restored_proposal = restored_dispatcher.stored_proposals[proposal_id]
+        assert restored_proposal.proposal_loan_value == proposal.proposal_loan_value
+        assert restored_proposal.last_event_timestamp == proposal.last_event_timestamp
+        assert list(restored_proposal.proponents) == list(proposal.proponents)
+        assert list(restored_proposal.warranties) == list(proposal.warranties)
+        assert restored_proposal.main_proponents_ids == proposal.main_proponents_ids
+        assert restored_proposal.accepted_warranties_value == proposal.accepted_warranties_value
+
+        for proponent_id, proponent in proposal.proponents.items():
+            restored_proponent = restored_proposal.proponents[proponent_id]
+            assert restored_proponent.proponent_name == proponent.proponent_name
+            assert restored_proponent.proponent_age == proponent.proponent_age
+            assert restored_proponent.proponent_monthly_income == proponent.proponent_monthly_income
+            assert restored_proponent.proponent_is_main == proponent.proponent_is_main
+
+        for warranty_id, warranty in proposal.warranties.items():
+            restored_warranty = restored_proposal.warranties[warranty_id]
+            assert restored_warranty.warranty_value == warranty.warranty_value
+            assert restored_warranty.warranty_province == warranty.warranty_province
+
+
+@pytest.mark.parametrize("trusted", (False, True))
+def test_snapshot_and_restore(trusted, raw_events, snapshot_path):
+    dispatcher = Dispatcher(trusted=trusted)
+    for raw_event in raw_events[:150]:
+        dispatcher.dispatch(raw_event)
+
+    dispatcher.snapshot(snapshot_path)
+    restored_dispatcher = Dispatcher(trusted=trusted)
+    restored_dispatcher.restore(snapshot_path)
+
+    assert_same_state(dispatcher, restored_dispatcher)
+    assert len(restored_dispatcher.processed_events) == len(dispatcher.processed_events)
+
+    # replaying everything after restore gives the same result of a full run
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+        restored_dispatcher.dispatch(raw_event)
+
+    assert_same_state(dispatcher, restored_dispatcher)
+
+
+@pytest.mark.parametrize(
+    "processed_events",
+    (
+        ProcessedEventsSet(),
+        TimeWindowProcessedEvents(window=timedelta(minutes=30)),
+        BloomFilterProcessedEvents(capacity=100),
+    ),
+)
+def test_snapshot_and_restore_processed_events(processed_events, raw_events, snapshot_path):
+    dispatcher = Dispatcher(processed_events=processed_events)
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+
+    dispatcher.snapshot(snapshot_path)
+    restored_dispatcher = Dispatcher()
+    restored_dispatcher.restore(snapshot_path)
+    restored_processed_events = restored_dispatcher.processed_events
+
+    assert type(restored_processed_events) is type(processed_events)
+    assert vars(restored_processed_events) == vars(processed_events)
+    for raw_event in raw_events:
+        event_id = uuid.UUID(raw_event.split(",")[0])
+        assert (event_id in restored_processed_events) is (event_id in processed_events)
+
+
+@pytest.mark.parametrize("mode", [{}, {"trusted": True}, {"lazy": True}])
+def test_snapshot_and_restore_pending_events(mode, snapshot_path):
+    raw_events = get_proposal_raw_events(PROPOSAL_ID)
+    pending_events = PendingEventsBuffer(max_events=50, max_age=timedelta(minutes=30))
+    dispatcher = Dispatcher(pending_events=pending_events, **mode)
+    # children arrive before the proposal
+    for raw_event in raw_events[1:]:
+        dispatcher.dispatch(raw_event)
+
+    dispatcher.snapshot(snapshot_path)
+    restored_dispatcher = Dispatcher(**mode)
+    restored_dispatcher.restore(snapshot_path)
+    restored_pending_events = restored_dispatcher.pending_events
+
+    assert len(restored_pending_events) == len(pending_events) == len(raw_events) - 1
+    assert restored_pending_events.max_events == 50
+    assert restored_pending_events.max_age == timedelta(minutes=30)
+    assert restored_pending_events.newest_timestamp == pending_events.newest_timestamp
+    assert restored_pending_events.get_metrics() == pending_events.get_metrics()
+
+    dispatcher.dispatch(raw_events[0])
+    restored_dispatcher.dispatch(raw_events[0])
+
+    assert len(restored_pending_events) == 0
+    assert restored_dispatcher.get_valid_proposals() == dispatcher.get_valid_proposals() == [PROPOSAL_ID]
+    assert_same_state(dispatcher, restored_dispatcher)
+
+
+def test_restore_snapshot_without_pending_events_section(raw_events, snapshot_path):
+    dispatcher = Dispatcher()
+    for raw_event in raw_events[:150]:
+        dispatcher.dispatch(raw_event)
+    dispatcher.snapshot(snapshot_path)
+
+    # same file written by the version 1, before the pending events section
+    with open(snapshot_path, "rb") as snapshot_file:
+        data = snapshot_file.read()
+    magic, _, proposals_count = HEADER.unpack_from(data, 0)
+    data = HEADER.pack(magic, 1, proposals_count) + data[HEADER.size : -PENDING_EVENTS_HEADER.size]
+    with open(snapshot_path, "wb") as snapshot_file:
+        snapshot_file.write(data)
+
+    pending_events = PendingEventsBuffer()
+    restored_dispatcher = Dispatcher(pending_events=pending_events)
+    restored_dispatcher.restore(snapshot_path)
+
+    assert restored_dispatcher.pending_events is pending_events
+    assert_same_state(dispatcher, restored_dispatcher)
+
+
+def test_restore_raises_with_invalid_file(snapshot_path):
+    with open(snapshot_path, "wb") as snapshot_file:
+        snapshot_file.write(b"invalid snapshot file")
+
+    with pytest.raises(ValueError):
+        Dispatcher().restore(snapshot_path)
+
+
+@pytest.mark.parametrize(
+    "timestamp",
+    (
+        None,
+        datetime(1970, 1, 1, tzinfo=timezone.utc),
+        datetime(2019, 11, 11, 14, 28, 1, 123, tzinfo=timezone.utc),
+    ),
+)
+def test_timestamp_micros_conversion(timestamp):
+    assert micros_to_timestamp(timestamp_to_micros(timestamp)) == timestamp
+
+
+def test_timestamp_without_timezone_is_taken_as_utc():
+    timestamp = datetime(2019, 11, 11, 14, 28, 1, 123)
+    utc_timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+    assert timestamp_to_micros(timestamp) == timestamp_to_micros(utc_timestamp)
+    assert micros_to_timestamp(timestamp_to_micros(timestamp)) == utc_timestamp
+
+
+def test_snapshot_and_columnar_store_with_timestamp_without_timezone(proposal, snapshot_path):
+    proposal.last_event_timestamp = datetime(2019, 11, 11, 14, 28, 1)
+    utc_timestamp = proposal.last_event_timestamp.replace(tzinfo=timezone.utc)
+    dispatcher = Dispatcher()
+    dispatcher.stored_proposals[proposal.proposal_id] = proposal
+
+    dispatcher.snapshot(snapshot_path)
+    restored_dispatcher = Dispatcher(stored_proposals=ColumnarProposalStore())
+    restored_dispatcher.restore(snapshot_path)
+
+    assert restored_dispatcher.stored_proposals[proposal.proposal_id].last_event_timestamp == utc_timestamp
@@ -0,0 +1,226 @@
+import uuid
+
+import pytest
+
+from solution.core import Dispatcher, read_events_iter
+from solution.schemas import Proposal
+from solution.stores import ColumnarProposalStore, ProposalRow
+from solution.trusted_schemas import TrustedProposal
+
+
+@pytest.fixture
+def store():
+    return ColumnarProposalStore()
+
+
+def assert_same_proposals(stored_proposals, columnar_store):
+    assert list(columnar_store) == list(stored_proposals)
+
+    for proposal_id, proposal in stored_proposals.items():
+        row = columnar_store[proposal_id]
+        assert row.proposal_id == proposal.proposal_id
+        assert row.proposal_loan_value == proposal.proposal_loan_value
+        assert row.proposal_number_of_monthly_installments == proposal.proposal_number_of_monthly_installments
+        assert row.last_event_timestamp == proposal.last_event_timestamp
+        assert list(row.proponents) == list(proposal.proponents)
+        assert list(row.warranties) == list(proposal.warranties)
+        assert row.main_proponents_ids == proposal.main_proponents_ids
+        assert row.underage_proponents_count == proposal.underage_proponents_count
+        assert row.accepted_warranties_count == proposal.accepted_warranties_count
+        assert row.accepted_warranties_value == proposal.accepted_warranties_value
+        assert row.is_valid() is proposal.is_valid()
+
+        for proponent_id, proponent in proposal.proponents.items():
+            proponent_row = row.proponents[proponent_id]
+            assert proponent_row.proposal_id == proponent.proposal_id
+            assert proponent_row.proponent_name == proponent.proponent_name
+            assert proponent_row.proponent_age == proponent.proponent_age
+            assert proponent_row.proponent_monthly_income == proponent.proponent_monthly_income
+            assert proponent_row.proponent_is_main is proponent.proponent_is_main
+            assert proponent_row.last_event_timestamp == proponent.last_event_timestamp
+
+        for warranty_id, warranty in proposal.warranties.items():
+            warranty_row = row.warranties[warranty_id]
+            assert warranty_row.warranty_value == warranty.warranty_value
+            assert warranty_row.warranty_province == warranty.warranty_province
+            assert warranty_row.last_event_timestamp == warranty.last_event_timestamp
+
+
+@pytest.mark.parametrize("trusted", (False, True))
+def test_columnar_store_has_same_state_of_dict_store(trusted, raw_events):
+    dispatcher = Dispatcher(trusted=trusted)
+    columnar_dispatcher = Dispatcher(trusted=trusted, stored_proposals=ColumnarProposalStore())
+
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+        columnar_dispatcher.dispatch(raw_event)
+
+    assert columnar_dispatcher.get_valid_proposals() == dispatcher.get_valid_proposals()
+    assert_same_proposals(dispatcher.stored_proposals, columnar_dispatcher.stored_proposals)
+
+
+@pytest.mark.parametrize("input_file_path", ("../test/input/input000.txt", "../test/input/input012.txt"))
+def test_read_events_iter_with_columnar_store(input_file_path):
+    with open(input_file_path, "r") as input_file:
+        expected = read_events_iter(input_file)
+    with open(input_file_path, "r") as input_file:
+        dispatcher = Dispatcher(stored_proposals=ColumnarProposalStore())
+        assert read_events_iter(input_file, dispatcher=dispatcher) == expected
+
+
+def test_store_mapping_interface(store, proposal, proponent, warranty):
+    store[proposal.proposal_id] = proposal
+
+    assert len(store) == 1
+    assert proposal.proposal_id in store
+    assert uuid.uuid4() not in store
+    assert store.get(uuid.uuid4()) is None
+    assert isinstance(store[proposal.proposal_id], ProposalRow)
+    with pytest.raises(KeyError):
+        store[uuid.uuid4()]
+
+    row = store[proposal.proposal_id]
+    row.put_proponent(proponent)
+    row.put_warranty(warranty)
+
+    assert len(row.proponents) == 1
+    assert len(row.warranties) == 1
+    assert row.proponents.get(uuid.uuid4()) is None
+    assert row.main_proponents_ids == {proponent.proponent_id}
+    assert row.accepted_warranties_value == warranty.warranty_value
+
+
+def test_store_inserts_proposal_relateds(store, proposal, proponent, warranty):
+    proposal.put_proponent(proponent)
+    proposal.put_warranty(warranty)
+    store[proposal.proposal_id] = proposal
+
+    assert_same_proposals({proposal.proposal_id: proposal}, store)
+
+
+def test_store_replaces_relateds_of_other_proposal_object(
+    store, proposal, proposal_data, proponent, warranty
+):
+    proposal.put_proponent(proponent)
+    proposal.put_warranty(warranty)
+    store[proposal.proposal_id] = proposal
+
+    new_proposal = Proposal(**proposal_data)
+    store[proposal.proposal_id] = new_proposal
+
+    assert_same_proposals({proposal.proposal_id: new_proposal}, store)
+
+
+def test_store_keeps_own_relateds_on_update(store, proposal, proposal_data, proponent):
+    store[proposal.proposal_id] = proposal
+    store[proposal.proposal_id].put_proponent(proponent)
+
+    proposal_data["proposal_loan_value"] = "100.0"
+    updated_proposal = Proposal(**proposal_data)
+    updated_proposal.inherit_relateds(store[proposal.proposal_id])
+    store[proposal.proposal_id] = updated_proposal
+
+    row = store[proposal.proposal_id]
+    assert row.proposal_loan_value == 100.0
+    assert list(row.proponents) == [proponent.proponent_id]
+
+
+def test_store_pop_returns_detached_proposal(store, proposal, proponent, warranty):
+    proposal.put_proponent(proponent)
+    proposal.put_warranty(warranty)
+    store[proposal.proposal_id] = proposal
+
+    popped_proposal = store.pop(proposal.proposal_id)
+
+    assert isinstance(popped_proposal, TrustedProposal)
+    assert_same_proposals({proposal.proposal_id: popped_proposal}, {proposal.proposal_id: proposal})
+    assert len(store) == 0
+    assert store.pop(proposal.proposal_id, None) is None
+    with pytest.raises(KeyError):
+        store.pop(proposal.proposal_id)
+
+
+def test_store_reuses_released_rows(store, proposal, proponent, warranty):
+    proposal.put_proponent(proponent)
+    proposal.put_warranty(warranty)
+
+    for _ in range(3):
+        store[proposal.proposal_id] = proposal
+        del store[proposal.proposal_id]
+
+    assert store.proposals.rows_count == 1
+    assert store.proponents.rows_count == 1
+    assert store.warranties.rows_count == 1
+    assert store.proponents_index == {}
+    assert store.warranties_index == {}
+
+
+def test_store_pop_relateds_updates_aggregates(store, proposal, proponent, warranty):
+    store[proposal.proposal_id] = proposal
+    row = store[proposal.proposal_id]
+    proponent.proponent_age = 17
+    row.put_proponent(proponent)
+    row.put_warranty(warranty)
+
+    assert row.underage_proponents_count == 1
+    assert row.pop_proponent(uuid.uuid4()) is None
+
+    popped_proponent = row.pop_proponent(proponent.proponent_id)
+    popped_warranty = row.pop_warranty(warranty.warranty_id)
+
+    assert popped_proponent.proponent_id == proponent.proponent_id
+    assert popped_warranty.warranty_id == warranty.warranty_id
+    assert row.underage_proponents_count == 0
+    assert row.accepted_warranties_count == 0
+    assert row.accepted_warranties_value == 0
+    assert row.main_proponents_ids == set()
+    assert list(row.proponents) == []
+
+
+def test_store_updated_warranty_updates_aggregates(store, proposal, warranty):
+    store[proposal.proposal_id] = proposal
+    row = store[proposal.proposal_id]
+    row.put_warranty(warranty)
+
+    warranty.warranty_value = 12.34
+    row.put_warranty(warranty)
+    assert row.accepted_warranties_count == 1
+    assert row.accepted_warranties_value == 12.34
+
+    warranty.warranty_province = "PR"
+    row.put_warranty(warranty)
+    assert row.accepted_warranties_count == 0
+    assert row.accepted_warranties_value == 0
+
+
+def test_same_related_id_in_different_proposals(store, proposal, proposal_data, proponent):
+    proposal_data["proposal_id"] = str(uuid.uuid4())
+    other_proposal = Proposal(**proposal_data)
+    store[proposal.proposal_id] = proposal
+    store[other_proposal.proposal_id] = other_proposal
+
+    store[proposal.proposal_id].put_proponent(proponent)
+    store[other_proposal.proposal_id].put_proponent(proponent)
+    store[proposal.proposal_id].pop_proponent(proponent.proponent_id)
+
+    assert len(store[proposal.proposal_id].proponents) == 0
+    assert list(store[other_proposal.proposal_id].proponents) == [proponent.proponent_id]
+
+
+@pytest.mark.parametrize("trusted", (False, True))
+def test_snapshot_restore_keeps_columnar_store(trusted, raw_events, tmp_path):
+    snapshot_path = str(tmp_path / "dispatcher.snapshot")
+    dispatcher = Dispatcher(trusted=trusted, stored_proposals=ColumnarProposalStore())
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+
+    dispatcher.snapshot(snapshot_path)
+    restored_dispatcher = Dispatcher(trusted=trusted, stored_proposals=ColumnarProposalStore())
+    restored_dispatcher.restore(snapshot_path)
+
+    assert isinstance(restored_dispatcher.stored_proposals, ColumnarProposalStore)
+    assert restored_dispatcher.get_valid_proposals() == dispatcher.get_valid_proposals()
+    materialized_proposals = {
+        proposal_id: proposal.materialize() for proposal_id, proposal in dispatcher.stored_proposals.items()
+    }
+    assert_same_proposals(materialized_proposals, restored_dispatcher.stored_proposals)
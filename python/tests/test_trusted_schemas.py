@@ -0,0 +1,182 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from solution.schemas import EventMetadata, Proponent, Proposal, Warranty
+from solution.trusted_schemas import (
+    TrustedEventMetadata,
+    TrustedProponent,
+    TrustedProposal,
+    TrustedWarranty,
+    parse_bool,
+    parse_timestamp,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected_result",
+    (
+        ("0", False),
+        ("False", False),
+        ("false", False),
+        ("FALSE", False),
+        ("1", True),
+        ("True", True),
+        ("true", True),
+        ("TRUE", True),
+    ),
+)
+def test_parse_bool(value, expected_result):
+    assert parse_bool(value) is expected_result
+
+
+def test_parse_timestamp(event_data):
+    timestamp = event_data["event_timestamp"]
+
+    assert parse_timestamp(timestamp) == EventMetadata(**event_data).event_timestamp
+    assert parse_timestamp(timestamp).isoformat().replace("+00:00", "Z") == timestamp
+
+
+@pytest.mark.parametrize(
+    "value", ("2019-11-11T13:26:04Z", "2019-11-11T13:26:04", "2019-11-11T10:26:04-03:00")
+)
+def test_parse_timestamp_normalizes_to_utc(event_data, value):
+    event_data["event_timestamp"] = value
+    expected_timestamp = datetime(2019, 11, 11, 13, 26, 4, tzinfo=timezone.utc)
+
+    assert parse_timestamp(value) == expected_timestamp
+    assert parse_timestamp(value).tzinfo is timezone.utc
+    assert EventMetadata(**event_data).event_timestamp.tzinfo is timezone.utc
+    assert EventMetadata(**event_data).event_timestamp == expected_timestamp
+
+
+class TestTrustedEventMetadata:
+    def test_parse(self, event_data):
+        event = TrustedEventMetadata(**event_data)
+        expected_event = EventMetadata(**event_data)
+
+        assert event.event_id == expected_event.event_id
+        assert event.event_schema == expected_event.event_schema
+        assert event.event_action == expected_event.event_action
+        assert event.event_timestamp == expected_event.event_timestamp
+
+    def test_iter_from_raw_events(self, event_data):
+        raw_event = ",".join(event_data.values())
+        event_data["event_timestamp"] = "2020-01-02T00:00:00Z"
+        other_raw_event = ",".join(event_data.values())
+
+        events = list(
+            TrustedEventMetadata.iter_from_raw_events([raw_event + ",foo", raw_event, other_raw_event])
+        )
+
+        assert [message for message, _ in events] == [["foo"], [], []]
+        for (_, event), expected_raw_event in zip(events, (raw_event, raw_event, other_raw_event)):
+            expected_event = TrustedEventMetadata(*expected_raw_event.split(","))
+            assert event.event_id == expected_event.event_id
+            assert event.event_schema == expected_event.event_schema
+            assert event.event_action == expected_event.event_action
+            assert event.event_timestamp == expected_event.event_timestamp
+
+        # consecutive events share the parsed timestamp
+        assert events[1][1].event_timestamp is events[0][1].event_timestamp
+        # and all of them the interned schema and action
+        assert events[2][1].event_schema is events[0][1].event_schema
+        assert events[2][1].event_action is events[0][1].event_action
+
+    def test_interns_schema_and_action(self, event_data):
+        raw_event = ",".join(event_data.values())
+        event = TrustedEventMetadata(*raw_event.split(","))
+        other_event = TrustedEventMetadata(*raw_event.split(","))
+
+        assert other_event.event_schema is event.event_schema
+        assert other_event.event_action is event.event_action
+
+
+class TestTrustedProponent:
+    def test_build_from_message(self, proponent_data):
+        message = list(proponent_data.values())
+        proponent = TrustedProponent.build_from_message(message)
+        expected_proponent = Proponent.build_from_message(message)
+
+        assert proponent.proposal_id == expected_proponent.proposal_id
+        assert proponent.proponent_id == expected_proponent.proponent_id
+        assert proponent.proponent_name == expected_proponent.proponent_name
+        assert proponent.proponent_age == expected_proponent.proponent_age
+        assert proponent.proponent_monthly_income == expected_proponent.proponent_monthly_income
+        assert proponent.proponent_is_main is expected_proponent.proponent_is_main
+
+    def test_has_no_instance_dict(self, proponent_data):
+        proponent = TrustedProponent.build_from_message(list(proponent_data.values()))
+
+        assert not hasattr(proponent, "__dict__")
+
+
+class TestTrustedWarranty:
+    def test_build_from_message(self, warranty_data):
+        message = list(warranty_data.values())
+        warranty = TrustedWarranty.build_from_message(message)
+        expected_warranty = Warranty.build_from_message(message)
+
+        assert warranty.proposal_id == expected_warranty.proposal_id
+        assert warranty.warranty_id == expected_warranty.warranty_id
+        assert warranty.warranty_value == expected_warranty.warranty_value
+        assert warranty.warranty_province == expected_warranty.warranty_province
+
+
+class TestTrustedProposal:
+    def test_build_from_message(self, proposal_data):
+        message = list(proposal_data.values())
+        proposal = TrustedProposal.build_from_message(message)
+        expected_proposal = Proposal.build_from_message(message)
+
+        assert proposal.proposal_id == expected_proposal.proposal_id
+        assert proposal.proposal_loan_value == expected_proposal.proposal_loan_value
+        assert (
+            proposal.proposal_number_of_monthly_installments
+            == expected_proposal.proposal_number_of_monthly_installments
+        )
+        assert proposal.warranties == {}
+        assert proposal.proponents == {}
+
+    def test_relateds_are_not_shared(self, proposal_data):
+        message = list(proposal_data.values())
+        proposal = TrustedProposal.build_from_message(message)
+        other_proposal = TrustedProposal.build_from_message(message)
+        proposal.proponents[uuid.uuid4()] = None
+
+        assert other_proposal.proponents == {}
+
+    def test_is_valid(self, proposal_data, proponent_data, warranty_data):
+        proposal = TrustedProposal.build_from_message(list(proposal_data.values()))
+        main_proponent = TrustedProponent.build_from_message(list(proponent_data.values()))
+        proponent_data.update(proponent_id=str(uuid.uuid4()), proponent_is_main="false")
+        other_proponent = TrustedProponent.build_from_message(list(proponent_data.values()))
+        warranty = TrustedWarranty.build_from_message(list(warranty_data.values()))
+
+        assert proposal.is_valid() is False
+
+        proposal.put_proponent(main_proponent)
+        proposal.put_proponent(other_proponent)
+        proposal.put_warranty(warranty)
+
+        assert proposal.is_valid() is True
+
+    def test_accepted_warranties_are_updated_in_place(self, proposal_data, warranty_data):
+        proposal = TrustedProposal.build_from_message(list(proposal_data.values()))
+        warranties = []
+        for value in ("0.1", "0.2", "0.3"):
+            warranty_data.update(warranty_id=str(uuid.uuid4()), warranty_value=value)
+            warranties.append(TrustedWarranty.build_from_message(list(warranty_data.values())))
+            proposal.put_warranty(warranties[-1])
+
+        # warranties are summed exactly, unlike 0.1 + 0.2 + 0.3 in floats
+        assert proposal.accepted_warranties_count == 3
+        assert proposal.accepted_warranties_value == 0.6
+
+        warranty_data.update(warranty_id=str(warranties[0].warranty_id), warranty_province="PR")
+        proposal.put_warranty(TrustedWarranty.build_from_message(list(warranty_data.values())))
+        proposal.pop_warranty(warranties[1].warranty_id)
+
+        assert proposal.accepted_warranties_count == 1
+        assert proposal.accepted_warranties_value == 0.3
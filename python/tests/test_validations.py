@@ -1,15 +1,31 @@
+import importlib
 import uuid
 from unittest import mock
 
 import pytest
 
 import solution.validations as validations
+from solution.schemas import Proposal
 
 
 def obj_factory(quantity=1, **kwargs):
     return {uuid.uuid4(): mock.Mock(**kwargs) for _ in range(0, quantity)}
 
 
+def put_proponents(proposal, quantity=1, **kwargs):
+    kwargs.setdefault("proponent_is_main", False)
+    kwargs.setdefault("proponent_age", validations.MIN_PROPONENTS_AGE)
+    for proponent_id, proponent in obj_factory(quantity, **kwargs).items():
+        proponent.proponent_id = proponent_id
+        proposal.put_proponent(proponent)
+
+
+def put_warranties(proposal, quantity=1, **kwargs):
+    for warranty_id, warranty in obj_factory(quantity, **kwargs).items():
+        warranty.warranty_id = warranty_id
+        proposal.put_warranty(warranty)
+
+
 @pytest.mark.parametrize(
     "loan_value, expexted_result",
     (
@@ -42,7 +58,10 @@ def test_has_valid_loan_installments_number(loan_installments_number, expexted_r
 
 @pytest.mark.parametrize(
     "proponents_number, expected_result",
-    ((validations.MIN_PROPONENTS_QUANTITY, True), (validations.MIN_PROPONENTS_QUANTITY - 1, False),),
+    (
+        (validations.MIN_PROPONENTS_QUANTITY, True),
+        (validations.MIN_PROPONENTS_QUANTITY - 1, False),
+    ),
 )
 def test_has_valid_proponents_number(proponents_number, expected_result, proposal):
     proposal.proponents = obj_factory(proponents_number)
@@ -59,25 +78,25 @@ def test_has_valid_proponents_number(proponents_number, expected_result, proposa
     ),
 )
 def test_has_valid_main_proponents_number(main_proponents_number, expected_result, proposal):
-    proposal.proponents = obj_factory(main_proponents_number, proponent_is_main=True)
+    put_proponents(proposal, main_proponents_number, proponent_is_main=True)
 
     assert validations.has_valid_main_proponents_number(proposal) is expected_result
 
 
 def test_has_proponents_with_valid_age(proposal):
-    proposal.proponents = obj_factory(2, proponent_age=validations.MIN_PROPONENTS_AGE)
+    put_proponents(proposal, 2, proponent_age=validations.MIN_PROPONENTS_AGE)
 
     assert validations.has_proponents_with_valid_age(proposal) is True
 
     # add one with smaller age to list of valid ones should invalid all
-    proposal.proponents.update(obj_factory(1, proponent_age=validations.MIN_PROPONENTS_AGE - 1))
+    put_proponents(proposal, 1, proponent_age=validations.MIN_PROPONENTS_AGE - 1)
 
     assert validations.has_proponents_with_valid_age(proposal) is False
 
 
 def test_has_valid_warranties_number_and_valid_warranted_value_success(proposal, warranty):
     proposal.proposal_loan_value = 500
-    proposal.warranties = obj_factory(2, warranty_value=500, warranty_province="SP")
+    put_warranties(proposal, 2, warranty_value=500, warranty_province="SP")
 
     assert validations.has_valid_warranties_number_and_valid_warranted_value(proposal) is True
 
@@ -85,7 +104,7 @@ def test_has_valid_warranties_number_and_valid_warranted_value_success(proposal,
 def test_has_valid_warranties_number_and_valid_warranted_value_with_invalid_provinces(proposal, warranty):
     proposal.proposal_loan_value = 500
     invalid_province = validations.NOT_ACCEPTED_WARRANTIES_PROVINCES[0]
-    proposal.warranties = obj_factory(2, warranty_value=500, warranty_province=invalid_province)
+    put_warranties(proposal, 2, warranty_value=500, warranty_province=invalid_province)
 
     assert validations.has_valid_warranties_number_and_valid_warranted_value(proposal) is False
 
@@ -93,38 +112,147 @@ def test_has_valid_warranties_number_and_valid_warranted_value_with_invalid_prov
 def test_has_valid_warranties_number_and_valid_warranted_value_with_one_invalid_provinces(proposal, warranty):
     proposal.proposal_loan_value = 500
     invalid_province = validations.NOT_ACCEPTED_WARRANTIES_PROVINCES[0]
-    proposal.warranties = obj_factory(1, warranty_value=500, warranty_province=invalid_province)
-    proposal.warranties.update(obj_factory(1, warranty_value=500, warranty_province="SP"))
+    put_warranties(proposal, 1, warranty_value=500, warranty_province=invalid_province)
+    put_warranties(proposal, 1, warranty_value=500, warranty_province="SP")
 
     assert validations.has_valid_warranties_number_and_valid_warranted_value(proposal) is False
 
 
 def test_has_valid_warranties_number_and_valid_warranted_value_with_unsufficient_value(proposal, warranty):
     proposal.proposal_loan_value = 500
-    proposal.warranties = obj_factory(2, warranty_value=499.5, warranty_province="SP")
+    put_warranties(proposal, 2, warranty_value=499.5, warranty_province="SP")
+
+    assert validations.has_valid_warranties_number_and_valid_warranted_value(proposal) is False
+
+
+def test_has_valid_warranties_number_and_valid_warranted_value_with_sub_cent_values(proposal):
+    # 199999.999 in total, rounding each value to cents would give 200000.0
+    proposal.proposal_loan_value = 100000.0
+    put_warranties(proposal, 1, warranty_value=99999.996, warranty_province="ES")
+    put_warranties(proposal, 1, warranty_value=100000.003, warranty_province="ES")
 
     assert validations.has_valid_warranties_number_and_valid_warranted_value(proposal) is False
 
+    put_warranties(proposal, 1, warranty_value=0.002, warranty_province="ES")
+
+    assert validations.has_valid_warranties_number_and_valid_warranted_value(proposal) is True
+
+
+@pytest.mark.parametrize("value", (0.0, 0.1, 99999.996, 1e-320, 2.0**60 + 2.0**8, 1.7976931348623157e308))
+def test_exact_units_conversion(value):
+    assert validations.from_exact_units(validations.to_exact_units(value)) == value
 
-def test_has_main_proponent_with_valid_monthly_income_success(proposal):
+
+@pytest.mark.parametrize(
+    "loan_value, expected_result", ((float("inf"), False), (float("nan"), False), (float("-inf"), True))
+)
+def test_covers_warranted_value_with_non_finite_loan(loan_value, expected_result):
+    assert validations.covers_warranted_value(0, loan_value) is expected_result
+
+
+def test_has_main_proponent_with_valid_monthly_income_success(proposal_data):
     for age, multiplier in validations.MIN_MAIN_PROPONENT_INCOME.items():
         value = 5000 * multiplier
+        proposal = Proposal(**proposal_data)
         proposal.proposal_loan_value = value
         proposal.proposal_number_of_monthly_installments = multiplier
-        proposal.proponents = obj_factory(
-            1, proponent_is_main=True, proponent_monthly_income=value, proponent_age=age
-        )
+        put_proponents(proposal, 1, proponent_is_main=True, proponent_monthly_income=value, proponent_age=age)
 
         assert validations.has_main_proponent_with_valid_monthly_income(proposal) is True
 
 
-def test_has_main_proponent_with_valid_monthly_income_fail(proposal):
+def test_has_main_proponent_with_valid_monthly_income_fail(proposal_data):
     for age, multiplier in validations.MIN_MAIN_PROPONENT_INCOME.items():
         value = 5000 * multiplier
+        proposal = Proposal(**proposal_data)
         proposal.proposal_loan_value = value
         proposal.proposal_number_of_monthly_installments = multiplier
-        proposal.proponents = obj_factory(
-            1, proponent_is_main=True, proponent_monthly_income=value - 1, proponent_age=age
+        put_proponents(
+            proposal, 1, proponent_is_main=True, proponent_monthly_income=value - 1, proponent_age=age
         )
 
         assert validations.has_main_proponent_with_valid_monthly_income(proposal) is False
+
+
+def test_has_valid_warranties_number_and_valid_warranted_value_after_removal(proposal):
+    proposal.proposal_loan_value = 500
+    put_warranties(proposal, 2, warranty_value=500, warranty_province="SP")
+
+    assert validations.has_valid_warranties_number_and_valid_warranted_value(proposal) is True
+
+    proposal.pop_warranty(next(iter(proposal.warranties)))
+
+    assert validations.has_valid_warranties_number_and_valid_warranted_value(proposal) is False
+
+
+def test_has_valid_main_proponents_number_after_removal(proposal):
+    put_proponents(proposal, 2, proponent_is_main=True)
+
+    assert validations.has_valid_main_proponents_number(proposal) is False
+
+    proposal.pop_proponent(next(iter(proposal.proponents)))
+
+    assert validations.has_valid_main_proponents_number(proposal) is True
+
+
+@pytest.mark.parametrize(
+    "age, expected_result",
+    ((validations.MIN_PROPONENTS_AGE - 1, True), (validations.MIN_PROPONENTS_AGE, False)),
+)
+def test_is_underage_proponent(age, expected_result):
+    assert validations.is_underage_proponent(mock.Mock(proponent_age=age)) is expected_result
+
+
+@pytest.mark.parametrize(
+    "province, expected_result",
+    ((validations.NOT_ACCEPTED_WARRANTIES_PROVINCES[0], False), ("SP", True)),
+)
+def test_is_accepted_warranty(province, expected_result):
+    assert validations.is_accepted_warranty(mock.Mock(warranty_province=province)) is expected_result
+
+
+@pytest.mark.parametrize("main_proponents", (0, 2))
+def test_has_main_proponent_with_valid_monthly_income_without_one_main_proponent(main_proponents, proposal):
+    put_proponents(proposal, main_proponents, proponent_is_main=True, proponent_monthly_income=10**9)
+
+    assert validations.has_main_proponent_with_valid_monthly_income(proposal) is False
+
+
+def test_has_main_proponent_with_valid_monthly_income_with_underage_main_proponent(proposal):
+    put_proponents(
+        proposal,
+        1,
+        proponent_is_main=True,
+        proponent_monthly_income=10**9,
+        proponent_age=validations.MIN_PROPONENTS_AGE - 1,
+    )
+
+    assert validations.has_main_proponent_with_valid_monthly_income(proposal) is False
+
+
+def test_has_main_proponent_with_valid_monthly_income_without_installments(proposal):
+    proposal.proposal_number_of_monthly_installments = 0
+    put_proponents(proposal, 1, proponent_is_main=True, proponent_monthly_income=10**9)
+
+    assert validations.has_main_proponent_with_valid_monthly_income(proposal) is False
+
+
+def test_parse_income_multipliers():
+    assert validations.parse_income_multipliers("18:4, 51:2,24:3") == {51: 2, 24: 3, 18: 4}
+
+
+def test_thresholds_loaded_from_environment(monkeypatch):
+    monkeypatch.setenv("MAX_LOAN_VALUE", "1000.5")
+    monkeypatch.setenv("NOT_ACCEPTED_WARRANTIES_PROVINCES", "SP, RJ")
+    monkeypatch.setenv("MIN_MAIN_PROPONENT_INCOME", "30:5")
+    try:
+        importlib.reload(validations)
+
+        assert validations.MAX_LOAN_VALUE == 1000.5
+        assert validations.NOT_ACCEPTED_WARRANTIES_PROVINCES == ("SP", "RJ")
+        assert validations.MIN_MAIN_PROPONENT_INCOME == {30: 5}
+    finally:
+        monkeypatch.undo()
+        importlib.reload(validations)
+
+    assert validations.MAX_LOAN_VALUE == 3000000.0
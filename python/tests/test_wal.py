@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from solution.core import Dispatcher
+from solution.pending import PendingEventsBuffer
+from solution.wal import CHECKPOINT_PATTERN, SEGMENT_PATTERN, WriteAheadLog
+
+from .test_pending import get_proposal_raw_events
+
+
+@pytest.fixture
+def wal_directory(tmp_path):
+    return str(tmp_path / "wal")
+
+
+def dispatch_all(dispatcher, raw_events):
+    for raw_event in raw_events:
+        dispatcher.dispatch(raw_event)
+
+
+def test_append_logs_accepted_events(wal_directory, raw_events):
+    wal = WriteAheadLog(wal_directory, sync_every=10)
+    dispatcher = Dispatcher(wal=wal)
+
+    dispatch_all(dispatcher, raw_events[:20])
+    # repeated events are not accepted again
+    dispatch_all(dispatcher, raw_events[:20])
+    wal.close()
+
+    with open(os.path.join(wal_directory, "segment-00000001.log"), "r") as segment_file:
+        assert segment_file.read().split("\n")[:-1] == raw_events[:20]
+
+
+def test_append_rolls_segments(wal_directory, raw_events):
+    wal = WriteAheadLog(wal_directory, segment_size=1024)
+    dispatch_all(Dispatcher(wal=wal), raw_events)
+    wal.close()
+
+    assert len(wal._list_files(SEGMENT_PATTERN)) > 1
+
+
+def test_checkpoint_prunes_old_files(wal_directory, raw_events):
+    wal = WriteAheadLog(wal_directory, segment_size=1024, checkpoint_every=100)
+    dispatch_all(Dispatcher(wal=wal), raw_events)
+    wal.close()
+
+    checkpoints = wal._list_files(CHECKPOINT_PATTERN)
+    assert len(checkpoints) == 1
+    assert wal._list_files(SEGMENT_PATTERN)[0] == checkpoints[0]
+
+
+def test_recover_without_checkpoint(wal_directory, raw_events):
+    wal = WriteAheadLog(wal_directory, segment_size=1024)
+    dispatcher = Dispatcher(wal=wal)
+    dispatch_all(dispatcher, raw_events)
+    wal.close()
+
+    recovered_wal = WriteAheadLog(wal_directory, segment_size=1024)
+    recovered_dispatcher = Dispatcher(wal=recovered_wal)
+
+    assert recovered_wal.recover(recovered_dispatcher) == len(dispatcher.processed_events)
+    assert recovered_dispatcher.get_valid_proposals() == dispatcher.get_valid_proposals()
+    assert recovered_dispatcher.wal is recovered_wal
+
+
+def test_recover_replays_only_events_after_checkpoint(wal_directory, raw_events):
+    wal = WriteAheadLog(wal_directory, checkpoint_every=100)
+    dispatcher = Dispatcher(wal=wal)
+    dispatch_all(dispatcher, raw_events)
+    wal.close()
+
+    recovered_wal = WriteAheadLog(wal_directory, checkpoint_every=100)
+    recovered_dispatcher = Dispatcher(wal=recovered_wal)
+
+    accepted_events = len(dispatcher.processed_events)
+    assert recovered_wal.recover(recovered_dispatcher) == accepted_events % 100
+    assert recovered_dispatcher.get_valid_proposals() == dispatcher.get_valid_proposals()
+
+    # replayed events are deduplicated and not logged again
+    dispatch_all(recovered_dispatcher, raw_events)
+    assert recovered_wal.events_since_checkpoint == accepted_events % 100
+    recovered_wal.close()
+
+
+def test_recover_keeps_events_parked_at_the_checkpoint(wal_directory):
+    proposal_id = "52f0b3f2-f838-4ce2-96ee-9876dd2c0cf6"
+    raw_events = get_proposal_raw_events(proposal_id)
+    wal = WriteAheadLog(wal_directory, checkpoint_every=2)
+    # children arrive before the proposal, parked while checkpoints are taken
+    dispatch_all(Dispatcher(wal=wal, pending_events=PendingEventsBuffer()), raw_events[1:])
+    wal.close()
+
+    recovered_wal = WriteAheadLog(wal_directory, checkpoint_every=2)
+    recovered_dispatcher = Dispatcher(wal=recovered_wal, pending_events=PendingEventsBuffer())
+    recovered_wal.recover(recovered_dispatcher)
+    recovered_dispatcher.dispatch(raw_events[0])
+    recovered_wal.close()
+
+    assert recovered_dispatcher.get_valid_proposals() == [proposal_id]
+
+
+def test_open_drops_partially_written_event(wal_directory, raw_events):
+    wal = WriteAheadLog(wal_directory)
+    dispatch_all(Dispatcher(wal=wal), raw_events[:5])
+    wal.segment_file.write(raw_events[5][:20].encode("utf-8"))
+    wal.close()
+
+    recovered_wal = WriteAheadLog(wal_directory)
+    recovered_dispatcher = Dispatcher(wal=recovered_wal)
+
+    assert recovered_wal.recover(recovered_dispatcher) == 5
+    recovered_wal.close()
+
+
+def test_get_last_line_end(tmp_path):
+    path = str(tmp_path / "segment")
+    with open(path, "wb") as segment_file:
+        segment_file.write(b"first\nsecond\nthi")
+
+    assert WriteAheadLog._get_last_line_end(path, 17, chunk_size=2) == 13
+    assert WriteAheadLog._get_last_line_end(path, 4, chunk_size=2) == 0